@@ -8,7 +8,6 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import json
 import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
@@ -26,8 +25,9 @@ from src.env.overtaking_env import create_overtaking_env
 from src.baseline.rule_based import RuleBasedPolicy
 from src.rl.safety_shield import SafetyShield
 from src.metrics.evaluator import MetricsEvaluator, evaluate_policy
+from src.metrics.results_store import ResultsStore, load_results_table, new_run_id
 from src.utils.config_loader import load_yaml
-from stable_baselines3 import PPO
+from src.rl.numpy_policy import load_policy
 
 # 配置页面
 st.set_page_config(
@@ -75,25 +75,21 @@ st.markdown("""
 
 @st.cache_data
 def load_all_results():
-    """加载所有评测结果"""
+    """加载所有评测结果（从汇总存储一次读取，每个单元取最近一次运行）"""
     results_dir = Path("outputs/outputs/results")
     if not results_dir.exists():
         return {}
 
-    results = {}
-    for json_file in results_dir.glob("*_metrics_summary.json"):
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            results[json_file.stem] = data
-
-    return results
+    table = load_results_table(results_dir)
+    return {f"{row['method']}_{row['density']}_seed{row['seed']}_metrics_summary": row
+            for row in table.to_dict('records')}
 
 
 @st.cache_resource
 def load_model(model_path):
-    """加载训练好的模型"""
+    """加载训练好的模型（存在由当前模型导出的.npz时使用NumPy推理，不加载torch）"""
     try:
-        model = PPO.load(model_path)
+        model = load_policy(model_path)
         return model
     except Exception as e:
         st.error(f"加载模型失败: {e}")
@@ -313,7 +309,7 @@ def show_evaluation():
                 # 选择策略
                 if method == "规则基线":
                     policy = RuleBasedPolicy()
-                    prefix = f"baseline_{density}_seed{seed}_"
+                    method_key = "baseline"
                 elif method == "RL (PPO)":
                     model_path = "outputs/outputs/models/best/best_model"
                     model = load_model(model_path)
@@ -321,7 +317,7 @@ def show_evaluation():
                         st.error("未找到训练好的模型，请先训练模型！")
                         return
                     policy = model
-                    prefix = f"rl_{density}_seed{seed}_"
+                    method_key = "rl"
                 else:  # RL + Safety Shield
                     model_path = "outputs/outputs/models/best/best_model"
                     model = load_model(model_path)
@@ -341,17 +337,22 @@ def show_evaluation():
                             return safe_action, None
 
                     policy = SafetyWrappedPolicy(model, env)
-                    prefix = f"rl_safety_{density}_seed{seed}_"
+                    method_key = "rl_safety"
+                prefix = f"{method_key}_{density}_seed{seed}_"
 
                 # 运行评测
                 evaluator, episodes_data = evaluate_policy(
                     env, policy, n_episodes=n_episodes,
-                    deterministic=True, seed=seed
+                    deterministic=True, seed=seed,
+                    evaluator=MetricsEvaluator(store_episodes=True),
                 )
 
                 # 保存结果
                 results_dir = Path("outputs/outputs/results")
-                metrics = evaluator.save_results(str(results_dir), prefix)
+                metrics = evaluator.save_results(
+                    str(results_dir), prefix, store=ResultsStore(results_dir / "store"),
+                    tags={'method': method_key, 'density': density, 'seed': seed, 'run_id': new_run_id()},
+                )
 
                 # 显示结果
                 st.success("✅ 评测完成！")
@@ -446,11 +447,14 @@ def show_results():
 
         st.table(pd.DataFrame(metrics_data))
 
-        # CSV详细数据
-        csv_file = Path("outputs/outputs/results") / f"{selected_result.replace('_metrics_summary', '_episodes_detail')}.csv"
-        if csv_file.exists():
+        # Episode详细数据（汇总存储中与该结果同一次运行的记录）
+        episodes = load_results_table(
+            Path("outputs/outputs/results"), 'episodes',
+            method=data['method'], density=data['density'], seed=data['seed'], run_id=data['run_id'],
+        )
+        if not episodes.empty:
             st.subheader("Episode详细数据")
-            df = pd.read_csv(csv_file)
+            df = episodes.drop(columns=['method', 'density', 'seed', 'run_id', 'timestamp'])
             st.dataframe(df, use_container_width=True)
 
             # 下载按钮
@@ -458,7 +462,7 @@ def show_results():
             st.download_button(
                 label="📥 下载CSV数据",
                 data=csv_data,
-                file_name=csv_file.name,
+                file_name=f"{selected_result.replace('_metrics_summary', '_episodes_detail')}.csv",
                 mime="text/csv"
             )
 
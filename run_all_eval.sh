@@ -14,19 +14,11 @@ eval "$(pyenv init --path)"
 eval "$(pyenv init -)"
 source venv/bin/activate
 
-echo "[1/4] 评测基线策略..."
-python -m src.baseline.evaluate_baseline --config-dir configs --output-dir outputs --n-episodes 20
+echo "[1/2] 评测基线、RL、RL+Safety（同一进程，共用模型和环境）..."
+python -m src.evaluate_all --methods baseline rl rl_safety --model outputs/outputs/models/best/best_model --config-dir configs --output-dir outputs --n-episodes 20
 
 echo ""
-echo "[2/4] 评测RL策略..."
-python -m src.rl.evaluate --model outputs/outputs/models/best/best_model --config-dir configs --output-dir outputs --n-episodes 20
-
-echo ""
-echo "[3/4] 评测RL+Safety策略..."
-python -m src.rl.evaluate --model outputs/outputs/models/best/best_model --config-dir configs --output-dir outputs --n-episodes 20 --safety-shield
-
-echo ""
-echo "[4/4] 生成论文图表..."
+echo "[2/2] 生成论文图表..."
 python -m src.utils.visualize --results-dir outputs/outputs/results --output-dir outputs/outputs/figures
 
 echo ""
@@ -37,4 +29,5 @@ echo ""
 echo "查看结果："
 echo "  - 数据: outputs/outputs/results/"
 echo "  - 图表: outputs/outputs/figures/"
+echo "  - 耗时: outputs/outputs/results/eval_timing.json"
 echo ""
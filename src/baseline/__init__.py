@@ -1,5 +1,5 @@
 """基线策略模块"""
 
-from .rule_based import RuleBasedPolicy
+from .rule_based import BatchedRuleBasedPolicy, RuleBasedPolicy
 
-__all__ = ['RuleBasedPolicy']
+__all__ = ['RuleBasedPolicy', 'BatchedRuleBasedPolicy']
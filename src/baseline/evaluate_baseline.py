@@ -7,15 +7,57 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.env.overtaking_env import create_overtaking_env
-from src.baseline import RuleBasedPolicy
-from src.metrics import evaluate_policy
+from src.baseline import BatchedRuleBasedPolicy
+from src.metrics.cache import EvalResultCache, print_cache_report
+from src.metrics.grid import evaluate_cell, grid_cells, run_eval_grid
+from src.metrics.results_store import ResultsStore, new_run_id
 from src.utils.config_loader import load_all_configs
-from src.utils.seed_utils import set_seed
+from src.utils.headless import enable_headless
+
+# 计入缓存键的策略代码
+BASELINE_CODE_FILES = ['src/baseline/rule_based.py']
+
+
+# 评测进程内的状态（由_init_worker设置，每个进程只创建一次策略）
+_worker = {}
+
+
+def _init_worker(env_config, eval_config, n_episodes: int, render: bool, results_dir: str,
+                 force: bool = False, run_id: str = None):
+    """初始化评测进程：创建基线策略"""
+    if env_config.get('headless', False):
+        enable_headless()
+    _worker.update(
+        env_config=env_config,
+        eval_config=eval_config,
+        n_episodes=n_episodes,
+        render=render,
+        results_dir=results_dir,
+        policy=BatchedRuleBasedPolicy(env_config),  # 向量化评测时一次决策所有环境
+        cache=EvalResultCache(Path(results_dir) / '.cache') if eval_config['output'].get('cache', True) else None,
+        force=force,
+        store=ResultsStore(Path(results_dir) / 'store') if eval_config['output'].get('results_store', True) else None,
+        run_id=run_id,
+    )
+
+
+def _evaluate_cell(density: str, seed: int):
+    """评测一个(密度, 种子)单元并保存结果
+
+    Returns:
+        (metrics, {'cached': 是否命中缓存, 'shield': None})
+    """
+    return evaluate_cell(
+        _worker['policy'], 'baseline', density, seed, _worker['env_config'], _worker['eval_config'],
+        _worker['n_episodes'], _worker['results_dir'], render=_worker['render'],
+        cache=_worker['cache'], force=_worker['force'], store=_worker['store'], run_id=_worker['run_id'],
+        code_files=BASELINE_CODE_FILES,
+    )
 
 
 def evaluate_baseline(config_dir: str = "configs", output_dir: str = "outputs",
-                      n_episodes: int = 50, render: bool = False):
+                      n_episodes: int = 50, render: bool = False,
+                      headless: bool = False, n_workers: int = None, force: bool = False):
     """评测基线策略
 
     Args:
@@ -23,6 +65,9 @@ def evaluate_baseline(config_dir: str = "configs", output_dir: str = "outputs",
         output_dir: 输出目录
         n_episodes: 评测轮数
         render: 是否渲染
+        headless: 无界面模式（不创建任何渲染，与render互斥）
+        n_workers: 并行评测的进程数（默认读取eval_config的n_workers；渲染时固定为1）
+        force: 忽略缓存，重新评测所有单元
     """
     print("\n" + "=" * 60)
     print("评测规则基线策略")
@@ -33,59 +78,31 @@ def evaluate_baseline(config_dir: str = "configs", output_dir: str = "outputs",
     env_config = configs['env']
     eval_config = configs['eval']
 
-    # 创建基线策略
-    policy = RuleBasedPolicy(env_config)
-    print()
+    if headless or env_config.get('headless', False):
+        enable_headless()
+        env_config['headless'] = True
+
+    if n_workers is None:
+        n_workers = eval_config.get('n_workers', 1)
+    if render:
+        n_workers = 1
 
     # 创建结果目录
     results_dir = Path(output_dir) / eval_config['output']['results_dir']
     results_dir.mkdir(parents=True, exist_ok=True)
 
-    # 评测不同密度
-    all_results = {}
-
-    for density in eval_config['scenarios']['traffic_densities']:
-        print(f"\n{'=' * 60}")
-        print(f"评测场景: {density.upper()} 密度")
-        print(f"{'=' * 60}\n")
-
-        env_config['traffic_density'] = density
-
-        # 评测不同随机种子
-        for seed in eval_config['scenarios']['seeds']:
-            print(f"\n随机种子: {seed}")
-            print("-" * 40)
-
-            set_seed(seed)
-
-            # 创建环境
-            env = create_overtaking_env(
-                env_config,
-                render_mode='human' if render else None
-            )
-
-            # 评测
-            evaluator, episodes = evaluate_policy(
-                env=env,
-                policy=policy,
-                n_episodes=n_episodes,
-                deterministic=True,
-                render=render,
-                seed=seed,
-            )
-
-            # 保存结果
-            prefix = f"baseline_{density}_seed{seed}_"
-            metrics = evaluator.save_results(str(results_dir), prefix)
-
-            # 打印摘要
-            evaluator.print_summary()
-
-            # 记录结果
-            result_key = f"{density}_seed{seed}"
-            all_results[result_key] = metrics
-
-            env.close()
+    # 评测密度×种子网格（每个进程创建一次基线策略）
+    results = run_eval_grid(
+        grid_cells(eval_config), _evaluate_cell, n_workers,
+        initializer=_init_worker,
+        initargs=(env_config, eval_config, n_episodes, render, str(results_dir), force or render, new_run_id()),
+    )
+    if eval_config['output'].get('results_store', True):
+        # 所有进程写完后合并各分区的小文件
+        ResultsStore(results_dir / 'store').compact()
+    all_results = {key: metrics for key, (metrics, _) in results.items()}
+    if eval_config['output'].get('cache', True):
+        print_cache_report({key: extra['cached'] for key, (_, extra) in results.items()})
 
     print("\n" + "=" * 60)
     print("评测完成")
@@ -102,12 +119,20 @@ if __name__ == "__main__":
     parser.add_argument("--output-dir", type=str, default="outputs", help="输出目录")
     parser.add_argument("--n-episodes", type=int, default=50, help="评测轮数")
     parser.add_argument("--render", action="store_true", help="渲染环境")
+    parser.add_argument("--headless", action="store_true", help="无界面模式（不创建任何渲染）")
+    parser.add_argument("--n-workers", type=int, default=None, help="并行评测进程数（默认读取eval_config）")
+    parser.add_argument("--force", action="store_true", help="忽略缓存，重新评测所有单元")
 
     args = parser.parse_args()
+    if args.render and args.headless:
+        parser.error("--render 与 --headless 不能同时使用")
 
     evaluate_baseline(
         config_dir=args.config_dir,
         output_dir=args.output_dir,
         n_episodes=args.n_episodes,
         render=args.render,
+        headless=args.headless,
+        n_workers=args.n_workers,
+        force=args.force,
     )
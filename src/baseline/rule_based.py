@@ -6,6 +6,8 @@
 import numpy as np
 from typing import Dict, Any
 
+from ..env.neighbourhood import SLOT_INDEX, greater_than, less_than, neighbourhood, safe_lane_change
+
 
 class RuleBasedPolicy:
     """规则基线超车策略
@@ -86,15 +88,13 @@ class RuleBasedPolicy:
             ego_y = ego[2]  # 横向位置（车道）
             ego_vx = ego[3]  # 纵向速度
 
-            # 周围车辆
-            vehicles = obs[1:]
-
-            # 找到各个位置的车辆
-            front_vehicle = self._find_vehicle(vehicles, position='front', lane='same')
-            left_front = self._find_vehicle(vehicles, position='front', lane='left')
-            left_rear = self._find_vehicle(vehicles, position='rear', lane='left')
-            right_front = self._find_vehicle(vehicles, position='front', lane='right')
-            right_rear = self._find_vehicle(vehicles, position='rear', lane='right')
+            # 找到各个位置的车辆（一次求出所有位置，见src/env/neighbourhood.py）
+            neighbours = neighbourhood(obs)
+            front_vehicle = neighbours.get('front')
+            left_front = neighbours.get('left_front')
+            left_rear = neighbours.get('left_rear')
+            right_front = neighbours.get('right_front')
+            right_rear = neighbours.get('right_rear')
 
             # 决策逻辑
 
@@ -134,49 +134,6 @@ class RuleBasedPolicy:
             # 如果解析失败，保持安全
             return self.ACTIONS['IDLE']
 
-    def _find_vehicle(self, vehicles: np.ndarray, position: str, lane: str) -> np.ndarray:
-        """找到指定位置和车道的车辆
-
-        Args:
-            vehicles: 车辆数组
-            position: 'front' or 'rear'
-            lane: 'same', 'left', 'right'
-
-        Returns:
-            车辆向量或None
-        """
-        candidates = []
-
-        for v in vehicles:
-            if v[0] < 0.5:  # presence < 0.5表示不存在
-                continue
-
-            x = v[1]  # 纵向相对位置
-            y = v[2]  # 横向相对位置
-
-            # 检查位置（前/后）
-            if position == 'front' and x < 0:
-                continue
-            if position == 'rear' and x > 0:
-                continue
-
-            # 检查车道
-            if lane == 'same' and abs(y) > 0.1:
-                continue
-            if lane == 'left' and y < 0.1:  # 左车道 y > 0
-                continue
-            if lane == 'right' and y > -0.1:  # 右车道 y < 0
-                continue
-
-            candidates.append((abs(x), v))
-
-        if not candidates:
-            return None
-
-        # 返回最近的
-        candidates.sort(key=lambda x: x[0])
-        return candidates[0][1]
-
     def _is_safe_to_change_lane(self, front: np.ndarray, rear: np.ndarray, ego_vx: float) -> bool:
         """检查换道是否安全
 
@@ -212,3 +169,98 @@ class RuleBasedPolicy:
     def reset(self):
         """重置策略状态"""
         self.lane_change_cooldown = 0
+
+
+class BatchedRuleBasedPolicy(RuleBasedPolicy):
+    """一次处理一批观测的规则基线策略（用于向量化评测）
+
+    决策逻辑与RuleBasedPolicy相同，改为对N个环境的数组运算；每个环境的换道冷却保存在数组中，
+    evaluate_policy_vectorized在槽位领取新episode时调用reset_envs只重置这些槽位。
+    比较阈值时使用与标量写法相同的精度（NumPy标量与Python数比较时的结果类型），
+    每个环境的动作与RuleBasedPolicy逐个决策完全相同。单个观测仍按RuleBasedPolicy计算。
+    """
+
+    batched = True
+
+    def __init__(self, config: Dict[str, Any]):
+        """初始化
+
+        Args:
+            config: 配置字典
+        """
+        super().__init__(config)
+        self.target_speed = config.get('speed', {}).get('ego_target', 30)
+        self.cooldowns = np.zeros(0, dtype=np.int64)  # 每个环境的换道冷却（第一次批量决策时按环境数创建）
+
+    def predict(self, observation, deterministic: bool = True):
+        """预测动作
+
+        Args:
+            observation: 一批观测 (N, vehicles_count, features)，或单个观测
+            deterministic: 是否确定性（基线策略始终确定）
+
+        Returns:
+            (actions, None)，批量输入时actions形状为(N,)
+        """
+        observation = np.asarray(observation)
+        if observation.ndim == 2:
+            return super().predict(observation, deterministic)
+        return self._compute_actions(observation), None
+
+    def _compute_actions(self, obs: np.ndarray) -> np.ndarray:
+        """对一批观测计算动作
+
+        Args:
+            obs: 观测 (N, vehicles_count, features)
+
+        Returns:
+            动作ID (N,)
+        """
+        n = len(obs)
+        if len(self.cooldowns) != n:
+            self.cooldowns = np.zeros(n, dtype=np.int64)
+
+        # 更新冷却时间
+        self.cooldowns = np.where(self.cooldowns > 0, self.cooldowns - 1, self.cooldowns)
+        ready = self.cooldowns == 0
+
+        ego_y, ego_vx = obs[:, 0, 2], obs[:, 0, 3]
+        neighbours = neighbourhood(obs)
+        vehicles, present = neighbours.vehicles, neighbours.present
+        front = vehicles[:, SLOT_INDEX['front']]
+        has_front = present[:, SLOT_INDEX['front']]
+
+        safe_left = safe_lane_change(neighbours, 'left', ego_vx, self.min_safe_distance, self.min_time_headway)
+        safe_right = safe_lane_change(neighbours, 'right', ego_vx, self.min_safe_distance, self.min_time_headway)
+
+        # 1. 前车慢且距离较近：左车道安全且不在冷却中时左换道，否则距离过近时减速
+        slow_front = has_front & less_than(front[:, 3], self.slow_vehicle_threshold) & less_than(front[:, 1], 50)
+        lane_left = slow_front & ready & safe_left
+        slower = slow_front & ~lane_left & less_than(front[:, 1], self.min_safe_distance)
+
+        # 2. 在左车道且右边安全时回到右车道
+        lane_right = ~(lane_left | slower) & greater_than(ego_y, 0.1) & ready & safe_right
+
+        # 3. 低于目标速度时加速，4. 否则保持
+        actions = np.where(less_than(ego_vx, self.target_speed), self.ACTIONS['FASTER'], self.ACTIONS['IDLE'])
+        actions[lane_right] = self.ACTIONS['LANE_RIGHT']
+        actions[slower] = self.ACTIONS['SLOWER']
+        actions[lane_left] = self.ACTIONS['LANE_LEFT']
+
+        self.cooldowns[lane_left | lane_right] = self.cooldown_steps
+        return actions
+
+    def reset(self):
+        """重置所有环境的策略状态"""
+        super().reset()
+        self.cooldowns[:] = 0
+
+    def reset_envs(self, indices):
+        """重置部分环境的策略状态（这些环境开始新的episode）
+
+        Args:
+            indices: 环境编号
+        """
+        if len(self.cooldowns):
+            self.cooldowns[indices] = 0
+
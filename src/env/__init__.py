@@ -1,5 +1,9 @@
 """环境模块"""
 
-from .overtaking_env import create_overtaking_env
+from .crn import CommonRandomNumbersEnv
+from .overtaking_env import create_overtaking_env, create_vector_overtaking_env
+from .scenario_pool import ScenarioPool
+from .vector_highway import VectorHighwayEnv
 
-__all__ = ['create_overtaking_env']
+__all__ = ['create_overtaking_env', 'create_vector_overtaking_env', 'CommonRandomNumbersEnv', 'ScenarioPool',
+           'VectorHighwayEnv']
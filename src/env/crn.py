@@ -0,0 +1,52 @@
+"""公共随机数（CRN）场景回放
+
+配对评测时，每个方法在相同的场景上运行：第i个场景用种子seed + i生成初始交通。
+highway-env只在reset生成车辆时消耗随机数（之后的IDM/MOBIL交通是确定性的），
+因此reset种子相同时各方法的初始交通完全相同，之后的差异只来自自车动作引起的交互。
+本模块不改变随机流，只记录初始交通指纹，用于检查各方法的场景确实一致。
+"""
+
+import hashlib
+
+import gymnasium as gym
+import numpy as np
+
+
+def scenario_fingerprint(road) -> str:
+    """当前交通状态的指纹（所有车辆的位置、朝向、速度）
+
+    Args:
+        road: highway-env的Road
+
+    Returns:
+        十六进制指纹
+    """
+    states = np.array([(*v.position, v.heading, v.speed) for v in road.vehicles], dtype=np.float64)
+    return hashlib.sha1(states.tobytes()).hexdigest()[:16]
+
+
+class CommonRandomNumbersEnv(gym.Wrapper):
+    """场景指纹检查包装器
+
+    reset必须指定种子（相同种子生成相同的初始交通），并在info['scenario_id']中返回初始交通指纹
+    （同时追加到scenario_ids，供检查各方法的场景是否一致）。
+    """
+
+    def __init__(self, env: gym.Env):
+        """初始化
+
+        Args:
+            env: create_overtaking_env创建的环境
+        """
+        super().__init__(env)
+        self.scenario_ids = []
+
+    def reset(self, *, seed=None, options=None):
+        """按场景种子重置"""
+        if seed is None:
+            raise ValueError("公共随机数评测需要为每个episode指定种子")
+        obs, info = self.env.reset(seed=seed, options=options)
+
+        info['scenario_id'] = scenario_fingerprint(self.env.unwrapped.road)
+        self.scenario_ids.append(info['scenario_id'])
+        return obs, info
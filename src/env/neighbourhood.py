@@ -0,0 +1,176 @@
+"""自车邻域描述（Kinematics观测中各相对位置最近的车辆）
+
+规则基线（RuleBasedPolicy）和Safety Shield都要找出本车道/左车道/右车道前后最近的车辆。
+这里用一次NumPy运算同时求出全部六个位置：按存在、前后、车道得到(6, 车辆数)的候选掩码，
+再对|x|取argmin。判定条件与原先逐行查找的写法相同（presence >= 0.5；前方x >= 0、后方x <= 0；
+本车道|y| <= 0.1、左车道y >= 0.1、右车道y <= -0.1；距离相同时取观测中靠前的一行）。
+
+支持一批观测（形状(N, 车辆数, 特征数)），结果按观测内容缓存最近的若干个，
+同一观测被策略和Shield分别检查时只计算一次。safe_lane_change是两者共用的批量换道安全检查。
+"""
+
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+# 邻域位置（顺序即Neighbourhood.vehicles的第-2维）
+SLOTS = ('front', 'rear', 'left_front', 'left_rear', 'right_front', 'right_rear')
+SLOT_INDEX = {slot: i for i, slot in enumerate(SLOTS)}
+
+# 缓存的观测数
+_MEMO_SIZE = 64
+_memo: 'OrderedDict[bytes, Neighbourhood]' = OrderedDict()
+
+
+class Neighbourhood:
+    """邻域描述
+
+    数组都是观测的副本（不引用调用方的观测缓冲区，VecEnv原地覆盖观测后缓存结果仍然有效）。
+
+    Attributes:
+        vehicles: 各位置最近车辆的特征，形状(..., 6, 特征数)（不存在的位置为该观测的第一辆他车，需配合present使用）
+        present: 各位置是否有车，形状(..., 6)
+    """
+
+    __slots__ = ('vehicles', 'present')
+
+    def __init__(self, vehicles: np.ndarray, present: np.ndarray):
+        self.vehicles = vehicles
+        self.present = present
+
+    def get(self, slot: str) -> Optional[np.ndarray]:
+        """单个观测中某个位置的车辆
+
+        Args:
+            slot: SLOTS中的位置名
+
+        Returns:
+            车辆特征向量，该位置没有车时为None
+        """
+        i = SLOT_INDEX[slot]
+        return self.vehicles[i] if self.present[i] else None
+
+
+def neighbourhood(obs) -> Neighbourhood:
+    """计算观测的邻域描述（按观测内容缓存）
+
+    Args:
+        obs: Kinematics观测 [presence, x, y, vx, vy, ...] × 车辆数（第0行为自车），
+            或一批观测(N, 车辆数, 特征数)
+
+    Returns:
+        Neighbourhood（缓存对象，不要修改其中的数组）
+    """
+    obs = np.asarray(obs)
+    key = f"{obs.dtype.str}{obs.shape}".encode() + obs.tobytes()
+    result = _memo.get(key)
+    if result is not None:
+        _memo.move_to_end(key)
+        return result
+
+    result = _compute_single(obs) if obs.ndim == 2 else _compute(obs)
+    _memo[key] = result
+    if len(_memo) > _MEMO_SIZE:
+        _memo.popitem(last=False)
+    return result
+
+
+def _compute_single(obs: np.ndarray) -> Neighbourhood:
+    """单个观测：对他车逐行扫描一次，同时更新六个位置
+
+    单个5×5观测上逐个NumPy运算的固定开销比计算本身大，这里只把前三列转成Python浮点数扫描一遍，
+    返回的车辆仍是观测中的原始行（后续的距离/速度计算与原先相同）。
+    """
+    others = obs[1:]
+    nearest = [-1] * len(SLOTS)
+    best = [np.inf] * len(SLOTS)
+    for i, (presence, x, y) in enumerate(others[:, :3].tolist()):
+        if presence < 0.5:
+            continue
+        distance = abs(x)
+        front, rear = not x < 0, not x > 0
+        for k, in_lane in ((0, not abs(y) > 0.1), (2, not y < 0.1), (4, not y > -0.1)):
+            if not in_lane:
+                continue
+            # 严格小于：距离相同时保留靠前的一行
+            if front and distance < best[k]:
+                best[k], nearest[k] = distance, i
+            if rear and distance < best[k + 1]:
+                best[k + 1], nearest[k + 1] = distance, i
+    present = np.array([i >= 0 for i in nearest])
+    vehicles = others[[max(i, 0) for i in nearest]] if len(others) else np.zeros((len(SLOTS), obs.shape[-1]), obs.dtype)
+    return Neighbourhood(vehicles, present)
+
+
+def _compute(obs: np.ndarray) -> Neighbourhood:
+    """一批观测：一次NumPy运算求出六个位置的最近车辆"""
+    others = obs[..., 1:, :]
+    if others.shape[-2] == 0:
+        shape = (*obs.shape[:-2], len(SLOTS))
+        return Neighbourhood(np.zeros((*shape, obs.shape[-1]), dtype=obs.dtype), np.zeros(shape, dtype=bool))
+    # 阈值比较在float64下进行（与逐行比较NumPy标量和Python浮点数的结果一致）
+    kinematics = others[..., :3].astype(np.float64)
+    presence, x, y = kinematics[..., 0], kinematics[..., 1], kinematics[..., 2]
+
+    # 前/后 (..., 2, 车辆数) 与 本/左/右车道 (..., 3, 车辆数) 组合为 (..., 6, 车辆数)，顺序与SLOTS相同
+    position = np.stack([x, -x], axis=-2) >= 0
+    lane = np.stack([0.1 - np.abs(y), y - 0.1, -0.1 - y], axis=-2) >= 0
+    candidates = (lane[..., :, None, :] & position[..., None, :, :]).reshape(*lane.shape[:-2], len(SLOTS), -1)
+    candidates &= (presence >= 0.5)[..., None, :]
+
+    distance = np.where(candidates, np.abs(x)[..., None, :], np.inf)
+    nearest = np.argmin(distance, axis=-1)
+    vehicles = np.take_along_axis(others, nearest[..., None], axis=-2)
+    return Neighbourhood(vehicles, candidates.any(axis=-1))
+
+
+def less_than(values, threshold) -> np.ndarray:
+    """values < threshold，按NumPy标量与Python数比较时的结果类型（与逐个观测判断的精度相同）"""
+    values = np.asarray(values)
+    dtype = np.result_type(values.dtype.type(0), threshold)
+    return values.astype(dtype) < dtype.type(threshold)
+
+
+def greater_than(values, threshold) -> np.ndarray:
+    """values > threshold（精度同less_than）"""
+    values = np.asarray(values)
+    dtype = np.result_type(values.dtype.type(0), threshold)
+    return values.astype(dtype) > dtype.type(threshold)
+
+
+def safe_lane_change(neighbours: Neighbourhood, direction: str, ego_vx, min_safe_distance: float,
+                     min_time_headway: float) -> np.ndarray:
+    """换道是否安全（单个观测或一批观测）
+
+    目标车道前车距离不小于min_safe_distance，且前车更慢时时间头距不小于min_time_headway；
+    后车距离不小于min_safe_distance。与RuleBasedPolicy / SafetyShield逐个检查的结果相同。
+
+    Args:
+        neighbours: 邻域描述
+        direction: 'left' or 'right'
+        ego_vx: 自车速度（形状与观测批次相同）
+        min_safe_distance: 最小安全距离
+        min_time_headway: 最小时间头距
+
+    Returns:
+        是否安全（单个观测为0维数组，一批观测为(N,)）
+    """
+    front = neighbours.vehicles[..., SLOT_INDEX[f'{direction}_front'], :]
+    rear = neighbours.vehicles[..., SLOT_INDEX[f'{direction}_rear'], :]
+    has_front = neighbours.present[..., SLOT_INDEX[f'{direction}_front']]
+    has_rear = neighbours.present[..., SLOT_INDEX[f'{direction}_rear']]
+
+    # 前车：距离过近，或前车更慢且时间头距过小
+    distance = front[..., 1]
+    relative_speed = front[..., 3] - ego_vx
+    closing = np.abs(relative_speed)
+    time_headway = np.full_like(distance, np.inf)
+    np.divide(distance, closing, out=time_headway, where=greater_than(closing, 0.1))
+    unsafe_front = less_than(distance, min_safe_distance) | \
+        ((relative_speed < 0) & less_than(time_headway, min_time_headway))
+
+    # 后车：距离过近
+    unsafe_rear = less_than(np.abs(rear[..., 1]), min_safe_distance)
+
+    return ~(has_front & unsafe_front) & ~(has_rear & unsafe_rear)
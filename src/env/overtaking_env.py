@@ -4,30 +4,68 @@
 """
 
 import gymnasium as gym
-import highway_env
 import numpy as np
-from typing import Dict, Any, Tuple
+from time import perf_counter
+from typing import Dict, Any, Optional, Tuple
+
+from ..utils.profiler import StepProfiler
+from .scenario_pool import ScenarioPool, load_scenario_pool, restore_scenario
+from .vector_highway import VectorHighwayEnv
+
+
+# 奖励分量的固定下标布局（与_compute_custom_reward中的求和顺序一致）
+REWARD_COMPONENTS = (
+    'collision',
+    'high_speed',
+    'right_lane',
+    'on_road',
+    'dangerous_distance',
+    'overtaking_success',
+)
+
+# 分阶段计时的阶段名（step与reset）
+PROFILE_PHASES = (
+    'env_step', 'snapshot', 'reward', 'violation', 'overtaking', 'step',
+    'env_reset', 'find_target', 'reset',
+)
 
 
 class OvertakingEnvWrapper(gym.Wrapper):
     """超车环境包装器，用于自定义奖励和终止条件"""
 
-    def __init__(self, env, config: Dict[str, Any]):
+    def __init__(self, env, config: Dict[str, Any], scenario_pool: Optional[ScenarioPool] = None):
         """初始化环境包装器
 
         Args:
             env: highway-env环境实例
             config: 环境配置字典
+            scenario_pool: 初始场景池（None表示每次reset都重新生成场景）
         """
         super().__init__(env)
         self.config = config
         self.safety_config = config.get('safety', {})
         self.reward_weights = config.get('reward_weights', {})
+        self.headless = config.get('headless', False)
+
+        # 精简模式：每步只写预分配的奖励分量数组，完整info仅在episode结束时构建
+        self.lean_info = config.get('lean_info', False)
+        self.reward_components = np.zeros(len(REWARD_COMPONENTS), dtype=np.float32)
+        self.episode_reward_components = np.zeros(len(REWARD_COMPONENTS), dtype=np.float64)
+
+        # 分阶段计时（未启用时为None，step中只多一次判空）
+        self.profiler = StepProfiler(PROFILE_PHASES) if config.get('profiling', False) else None
+
+        # 初始场景池
+        self.scenario_pool = scenario_pool
+        self.density_name = _resolve_vehicles_count(config)[1]
+        self.sample_unseeded = (config.get('scenario_pool') or {}).get('sample_unseeded', False)
+        self._env_reset_done = False
 
         # 超车追踪
         self.target_vehicle = None
         self.overtaking_started = False
         self.overtaking_complete = False
+        self.overtaking_rewarded = False
         self.steps_ahead = 0
 
         # 统计信息
@@ -38,22 +76,41 @@ class OvertakingEnvWrapper(gym.Wrapper):
 
     def reset(self, **kwargs):
         """重置环境"""
-        obs, info = self.env.reset(**kwargs)
+        profiler = self.profiler
+        if profiler is not None:
+            start = t = perf_counter()
+
+        restored = self._restore_from_pool(kwargs.get('seed'), kwargs.get('options'))
+        if restored is None:
+            obs, info = self.env.reset(**kwargs)
+            self._env_reset_done = True
+        else:
+            obs, info = restored
+
+        if profiler is not None:
+            t = profiler.lap('env_reset', t)
 
         # 重置追踪变量
         self.target_vehicle = None
         self.overtaking_started = False
         self.overtaking_complete = False
+        self.overtaking_rewarded = False
         self.steps_ahead = 0
 
         self.episode_length = 0
         self.total_reward = 0
         self.collision_occurred = False
         self.violation_count = 0
+        self.reward_components.fill(0)
+        self.episode_reward_components.fill(0)
 
         # 找到目标超车车辆（前方最近的慢车）
         self._find_target_vehicle()
 
+        if profiler is not None:
+            profiler.lap('find_target', t)
+            profiler.lap('reset', start)
+
         return obs, info
 
     def step(self, action):
@@ -65,29 +122,43 @@ class OvertakingEnvWrapper(gym.Wrapper):
         Returns:
             observation, reward, terminated, truncated, info
         """
+        profiler = self.profiler
+        if profiler is not None:
+            start = t = perf_counter()
+
         obs, reward, terminated, truncated, info = self.env.step(action)
 
+        if profiler is not None:
+            t = profiler.lap('env_step', t)
+
         self.episode_length += 1
 
+        # 单次快照：ego与周围车辆位置只读取一次，后续计算共用
+        snapshot = self._snapshot_traffic()
+        dangerous = self._check_dangerous_distance(obs, snapshot)
+
+        if profiler is not None:
+            t = profiler.lap('snapshot', t)
+
         # 自定义奖励计算
-        custom_reward, reward_info = self._compute_custom_reward(obs, action, info)
+        custom_reward, reward_values = self._compute_custom_reward(obs, action, info, dangerous)
+
+        if profiler is not None:
+            t = profiler.lap('reward', t)
 
         # 检查违规
-        violation = self._check_violation(obs)
+        violation = self._check_violation(obs, dangerous)
         if violation:
             self.violation_count += 1
 
+        if profiler is not None:
+            t = profiler.lap('violation', t)
+
         # 检查超车状态
-        self._update_overtaking_status(obs)
+        self._update_overtaking_status(obs, snapshot)
 
-        # 更新info
-        info.update({
-            'reward_components': reward_info,
-            'violation': violation,
-            'overtaking_complete': self.overtaking_complete,
-            'episode_length': self.episode_length,
-            'violation_count': self.violation_count,
-        })
+        if profiler is not None:
+            profiler.lap('overtaking', t)
 
         # 检查碰撞
         if info.get('crashed', False):
@@ -95,8 +166,102 @@ class OvertakingEnvWrapper(gym.Wrapper):
 
         self.total_reward += custom_reward
 
+        # 更新info
+        if self.lean_info:
+            info['violation'] = violation
+            if terminated or truncated:
+                info.update(self.get_episode_info())
+        else:
+            info.update({
+                'reward_components': dict(zip(REWARD_COMPONENTS, reward_values)),
+                'violation': violation,
+                'overtaking_complete': self.overtaking_complete,
+                'episode_length': self.episode_length,
+                'violation_count': self.violation_count,
+            })
+            if terminated or truncated:
+                info['episode_reward_components'] = self.get_episode_reward_components()
+
+        if profiler is not None:
+            profiler.lap('step', start)
+            if terminated or truncated:
+                info['profile'] = self.get_profile()
+
         return obs, custom_reward, terminated, truncated, info
 
+    def render(self):
+        """渲染当前画面
+
+        headless模式下环境以render_mode=None创建，首次调用时才切换到离屏渲染，
+        渲染器由highway-env在此时按需创建。
+        """
+        base_env = self.env.unwrapped
+        if self.headless and base_env.render_mode is None:
+            base_env.render_mode = 'rgb_array'
+        return self.env.render()
+
+    def get_profile(self) -> Dict[str, Dict[str, float]]:
+        """各阶段耗时统计（本环境自创建以来累计，毫秒）
+
+        Returns:
+            {阶段名: {'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}}，
+            未启用profiling时返回空字典
+        """
+        if self.profiler is None:
+            return {}
+        return self.profiler.summary()
+
+    def get_reward_components(self) -> Dict[str, float]:
+        """最近一步的奖励分量"""
+        return dict(zip(REWARD_COMPONENTS, self.reward_components.tolist()))
+
+    def get_episode_reward_components(self) -> Dict[str, float]:
+        """当前episode累计的奖励分量"""
+        return dict(zip(REWARD_COMPONENTS, self.episode_reward_components.tolist()))
+
+    def get_episode_info(self) -> Dict[str, Any]:
+        """构建完整的episode统计info（精简模式下在episode结束时调用）"""
+        return {
+            'reward_components': self.get_reward_components(),
+            'episode_reward_components': self.get_episode_reward_components(),
+            'overtaking_complete': self.overtaking_complete,
+            'episode_length': self.episode_length,
+            'violation_count': self.violation_count,
+        }
+
+    def _restore_from_pool(self, seed: Optional[int], options) -> Optional[Tuple]:
+        """从场景池恢复初始交通状态
+
+        只在外层包装器已经完整reset过且场景车辆数与现有车辆对象一致时恢复，
+        否则返回None，由调用方走highway-env的完整reset。
+
+        Args:
+            seed: reset种子（None时按sample_unseeded决定是否从池中抽取）
+            options: reset选项（非空时不使用场景池）
+
+        Returns:
+            (obs, info)，未命中时返回None
+        """
+        if self.scenario_pool is None or options or not self._env_reset_done:
+            return None
+
+        base_env = self.env.unwrapped
+
+        if seed is None:
+            if not self.sample_unseeded:
+                return None
+            seeds = self.scenario_pool.seeds(self.density_name)
+            if not seeds:
+                return None
+            seed = seeds[base_env.np_random.integers(len(seeds))]
+
+        scenario = self.scenario_pool.get(self.density_name, seed)
+        if scenario is None or len(scenario[0]) != len(base_env.road.vehicles):
+            return None
+
+        states, rng = scenario
+        return restore_scenario(base_env, states, rng, seed)
+
     def _find_target_vehicle(self):
         """寻找目标超车车辆"""
         try:
@@ -126,106 +291,143 @@ class OvertakingEnvWrapper(gym.Wrapper):
             # 如果环境还没准备好，稍后再找
             pass
 
-    def _compute_custom_reward(self, obs, action, info) -> Tuple[float, Dict]:
+    def _snapshot_traffic(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """快照ego与周围车辆位置
+
+        一次遍历road.vehicles，将位置打包为NumPy数组，供距离、违规和超车状态共用
+
+        Returns:
+            (ego_position, other_positions)，环境未就绪时返回None
+        """
+        try:
+            ego = self.env.unwrapped.vehicle
+            vehicles = self.env.unwrapped.road.vehicles
+            ego_position = np.asarray(ego.position, dtype=float)
+        except AttributeError:
+            return None
+
+        others = [v.position for v in vehicles if v is not ego]
+        if others:
+            positions = np.asarray(others, dtype=float)
+        else:
+            positions = np.empty((0, 2), dtype=float)
+
+        return ego_position, positions
+
+    def _compute_custom_reward(self, obs, action, info, dangerous: bool = None) -> Tuple[float, Tuple[float, ...]]:
         """计算自定义奖励
 
+        各分量按REWARD_COMPONENTS的顺序写入预分配的reward_components数组，
+        并累加到episode_reward_components。
+
         Args:
             obs: 观测
             action: 动作
             info: 信息字典
+            dangerous: 是否处于危险距离（None时重新计算）
 
         Returns:
-            (total_reward, reward_components)
+            (total_reward, 按REWARD_COMPONENTS顺序的分量值)
         """
         weights = self.reward_weights
-        components = {}
 
         # 基础奖励（来自原始环境）
         base_reward = info.get('rewards', {})
 
         # 碰撞惩罚
         if info.get('crashed', False):
-            components['collision'] = weights.get('collision', -100)
+            collision = weights.get('collision', -100)
         else:
-            components['collision'] = 0
+            collision = 0
 
         # 速度奖励
-        components['high_speed'] = base_reward.get('high_speed_reward', 0) * weights.get('high_speed_reward', 0.4)
+        high_speed = base_reward.get('high_speed_reward', 0) * weights.get('high_speed_reward', 0.4)
 
         # 保持车道奖励
-        components['right_lane'] = base_reward.get('right_lane_reward', 0) * weights.get('right_lane_reward', 0.1)
+        right_lane = base_reward.get('right_lane_reward', 0) * weights.get('right_lane_reward', 0.1)
 
         # 在路上奖励
-        components['on_road'] = base_reward.get('on_road_reward', 0) * weights.get('on_road_reward', 1.0)
+        on_road = base_reward.get('on_road_reward', 0) * weights.get('on_road_reward', 1.0)
 
         # 危险距离惩罚
-        dangerous = self._check_dangerous_distance(obs)
+        if dangerous is None:
+            dangerous = self._check_dangerous_distance(obs)
         if dangerous:
-            components['dangerous_distance'] = weights.get('dangerous_distance', -10)
+            dangerous_distance = weights.get('dangerous_distance', -10)
         else:
-            components['dangerous_distance'] = 0
+            dangerous_distance = 0
 
         # 超车成功奖励
-        if self.overtaking_complete and not hasattr(self, '_overtaking_rewarded'):
-            components['overtaking_success'] = 50.0
-            self._overtaking_rewarded = True
+        if self.overtaking_complete and not self.overtaking_rewarded:
+            overtaking_success = 50.0
+            self.overtaking_rewarded = True
         else:
-            components['overtaking_success'] = 0
+            overtaking_success = 0
 
-        total = sum(components.values())
+        values = (collision, high_speed, right_lane, on_road, dangerous_distance, overtaking_success)
+        self.reward_components[:] = values
+        self.episode_reward_components += self.reward_components
 
-        return total, components
+        total = collision + high_speed + right_lane + on_road + dangerous_distance + overtaking_success
 
-    def _check_dangerous_distance(self, obs) -> bool:
+        return total, values
+
+    def _check_dangerous_distance(self, obs, snapshot=None) -> bool:
         """检查是否距离过近
 
         Args:
             obs: 观测向量
+            snapshot: _snapshot_traffic的结果（None时重新快照）
 
         Returns:
             是否危险
         """
-        try:
-            ego = self.env.unwrapped.vehicle
-            vehicles = self.env.unwrapped.road.vehicles
+        if snapshot is None:
+            snapshot = self._snapshot_traffic()
+        if snapshot is None:
+            return False
 
-            min_distance = self.safety_config.get('min_safe_distance', 15.0)
+        ego_position, positions = snapshot
+        if len(positions) == 0:
+            return False
 
-            for v in vehicles:
-                if v is not ego:
-                    distance = np.linalg.norm(v.position - ego.position)
-                    if distance < min_distance:
-                        return True
+        min_distance = self.safety_config.get('min_safe_distance', 15.0)
+        distances = np.linalg.norm(positions - ego_position, axis=1)
 
-            return False
-        except:
-            return False
+        return bool(distances.min() < min_distance)
 
-    def _check_violation(self, obs) -> bool:
+    def _check_violation(self, obs, dangerous: bool = None) -> bool:
         """检查是否违规（危险距离、换道等）
 
         Args:
             obs: 观测
+            dangerous: 是否处于危险距离（None时重新计算）
 
         Returns:
             是否违规
         """
-        return self._check_dangerous_distance(obs)
+        if dangerous is None:
+            dangerous = self._check_dangerous_distance(obs)
+        return dangerous
 
-    def _update_overtaking_status(self, obs):
+    def _update_overtaking_status(self, obs, snapshot=None):
         """更新超车状态
 
         Args:
             obs: 观测
+            snapshot: _snapshot_traffic的结果（None时直接读取ego）
         """
         if self.target_vehicle is None or self.overtaking_complete:
             return
 
         try:
-            ego = self.env.unwrapped.vehicle
+            if snapshot is not None:
+                ego_x = snapshot[0][0]
+            else:
+                ego_x = self.env.unwrapped.vehicle.position[0]
 
             # 检查是否超过目标车辆
-            if ego.position[0] > self.target_vehicle.position[0]:
+            if ego_x > self.target_vehicle.position[0]:
                 self.steps_ahead += 1
 
                 # 保持领先一定步数则认为超车成功
@@ -239,15 +441,14 @@ class OvertakingEnvWrapper(gym.Wrapper):
             pass
 
 
-def create_overtaking_env(config: Dict[str, Any], render_mode: str = None):
-    """创建超车环境
+def _resolve_vehicles_count(config: Dict[str, Any]) -> Tuple[int, str]:
+    """解析交通密度配置
 
     Args:
         config: 环境配置
-        render_mode: 渲染模式 ('human', 'rgb_array', None)
 
     Returns:
-        配置好的环境实例
+        (车辆数量, 密度名称)
     """
     # 获取交通密度
     # 支持三种输入方式：
@@ -275,6 +476,35 @@ def create_overtaking_env(config: Dict[str, Any], render_mode: str = None):
         # 默认值
         vehicles_count = 20
 
+    # 确定密度名称（用于打印）
+    density_name = 'custom'
+    if isinstance(traffic_density, dict):
+        density_name = 'medium (default)'
+    elif isinstance(traffic_density, str):
+        density_name = traffic_density
+
+    return vehicles_count, density_name
+
+
+def create_overtaking_env(config: Dict[str, Any], render_mode: str = None):
+    """创建超车环境
+
+    Args:
+        config: 环境配置（headless为True时忽略配置中的render_mode）
+        render_mode: 渲染模式 ('human', 'rgb_array', None)
+
+    Returns:
+        配置好的环境实例
+    """
+    # 延迟导入：highway-env在导入时会加载pygame和matplotlib，
+    # 只使用向量化后端的进程完全不需要它
+    import highway_env  # noqa: F401  注册highway-v0等环境
+
+    if render_mode is None and not config.get('headless', False):
+        render_mode = config.get('render_mode', 'rgb_array')
+
+    vehicles_count, density_name = _resolve_vehicles_count(config)
+
     # 创建highway-env环境
     env_config = {
         "observation": {
@@ -299,20 +529,52 @@ def create_overtaking_env(config: Dict[str, Any], render_mode: str = None):
     # 创建环境
     env = gym.make(
         config.get('env_name', 'highway-v0'),
-        render_mode=render_mode or config.get('render_mode', 'rgb_array'),
+        render_mode=render_mode,
         config=env_config
     )
 
     # 包装环境
-    env = OvertakingEnvWrapper(env, config)
-
-    # 确定密度名称（用于打印）
-    density_name = 'custom'
-    if isinstance(traffic_density, dict):
-        density_name = 'medium (default)'
-    elif isinstance(traffic_density, str):
-        density_name = traffic_density
+    env = OvertakingEnvWrapper(env, config, scenario_pool=load_scenario_pool(config))
 
     print(f"✓ 创建环境: {density_name} 密度 ({vehicles_count} 辆车)")
 
     return env
+
+
+def create_vector_overtaking_env(config: Dict[str, Any], num_envs: int,
+                                 autoreset_mode=None, asynchronous: bool = False):
+    """创建批量超车环境（gymnasium VectorEnv）
+
+    根据配置中的backend选择实现：
+    - 'highway_env': 多个create_overtaking_env组成的SyncVectorEnv
+    - 'vectorized': NumPy批量仿真后端VectorHighwayEnv
+
+    默认使用SAME_STEP自动重置；两种实现都支持reset的options['reset_mask']只重置部分子环境。
+
+    Args:
+        config: 环境配置
+        num_envs: 并行环境数量
+        autoreset_mode: highway_env后端的自动重置方式（默认SAME_STEP；vectorized后端固定为SAME_STEP）
+        asynchronous: highway_env后端是否每个子环境一个进程（AsyncVectorEnv）
+
+    Returns:
+        VectorEnv实例
+    """
+    backend = config.get('backend', 'highway_env')
+
+    if backend == 'vectorized':
+        vehicles_count, density_name = _resolve_vehicles_count(config)
+        env = VectorHighwayEnv(config, num_envs, vehicles_count)
+        print(f"✓ 创建向量化环境: {density_name} 密度 ({vehicles_count} 辆车) × {num_envs}")
+        return env
+
+    if backend != 'highway_env':
+        raise ValueError(f"未知的仿真后端: {backend}")
+
+    if autoreset_mode is None:
+        autoreset_mode = gym.vector.AutoresetMode.SAME_STEP
+    vector_env_class = gym.vector.AsyncVectorEnv if asynchronous else gym.vector.SyncVectorEnv
+    return vector_env_class(
+        [lambda: create_overtaking_env(config) for _ in range(num_envs)],
+        autoreset_mode=autoreset_mode,
+    )
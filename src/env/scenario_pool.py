@@ -0,0 +1,303 @@
+"""初始场景池
+
+按(密度, 种子)预生成highway-env的初始交通状态并存为可内存映射的数组文件，
+reset时把数组直接写回已有的车辆对象，跳过道路重建和车辆随机生成。
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+import numpy as np
+from gymnasium.utils import seeding
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+
+# 每辆车的状态列
+FEATURES = (
+    'x', 'y', 'heading', 'speed',
+    'lane', 'target_lane', 'target_speed',
+    'delta', 'timer', 'speed_index',
+)
+_COL = {name: i for i, name in enumerate(FEATURES)}
+
+KEY_DTYPE = np.dtype([('density', 'U16'), ('seed', 'i8'), ('count', 'i4')])
+
+_MASK64 = (1 << 64) - 1
+
+
+def _pack_rng(bit_generator) -> np.ndarray:
+    """PCG64状态 -> 6个uint64"""
+    state = bit_generator.state
+    s, inc = state['state']['state'], state['state']['inc']
+    return np.array([
+        s >> 64, s & _MASK64, inc >> 64, inc & _MASK64,
+        state['has_uint32'], state['uinteger'],
+    ], dtype=np.uint64)
+
+
+def _unpack_rng(packed: np.ndarray) -> Dict[str, Any]:
+    """6个uint64 -> PCG64状态"""
+    p = [int(v) for v in packed]
+    return {
+        'bit_generator': 'PCG64',
+        'state': {'state': (p[0] << 64) | p[1], 'inc': (p[2] << 64) | p[3]},
+        'has_uint32': p[4],
+        'uinteger': p[5],
+    }
+
+
+def capture_scenario(env) -> Tuple[np.ndarray, np.ndarray]:
+    """读取highway-env当前交通状态
+
+    Args:
+        env: reset后的highway-env环境（unwrapped）
+
+    Returns:
+        (states, rng)：states形状为 (车辆数, len(FEATURES))，按road.vehicles顺序
+    """
+    vehicles = env.road.vehicles
+    states = np.full((len(vehicles), len(FEATURES)), np.nan)
+
+    for i, v in enumerate(vehicles):
+        row = states[i]
+        row[_COL['x']], row[_COL['y']] = v.position
+        row[_COL['heading']] = v.heading
+        row[_COL['speed']] = v.speed
+        row[_COL['lane']] = v.lane_index[2]
+        row[_COL['target_lane']] = v.target_lane_index[2]
+        row[_COL['target_speed']] = v.target_speed
+        if hasattr(v, 'timer'):
+            # IDM车辆：随机化的DELTA和换道计时器
+            row[_COL['delta']] = v.DELTA
+            row[_COL['timer']] = v.timer
+        if hasattr(v, 'speed_index'):
+            row[_COL['speed_index']] = v.speed_index
+
+    return states, _pack_rng(env.np_random.bit_generator)
+
+
+def restore_scenario(env, states: np.ndarray, rng: np.ndarray, seed: int):
+    """把场景数组写回highway-env已有的车辆对象
+
+    等价于env.reset(seed=seed)，但不经过外层gym包装器，
+    调用方需保证车辆数量与场景一致。
+
+    Args:
+        env: 已reset过的highway-env环境（unwrapped）
+        states: capture_scenario得到的车辆状态
+        rng: capture_scenario得到的随机数生成器状态
+        seed: 场景种子
+
+    Returns:
+        (obs, info)
+    """
+    # 与gymnasium的reset(seed)一致：重建随机数生成器，再恢复到生成场景后的状态
+    env._np_random, env._np_random_seed = seeding.np_random(seed)
+    env._np_random.bit_generator.state = _unpack_rng(rng)
+    env.road.np_random = env._np_random
+
+    env.time = env.steps = 0
+    env.done = False
+
+    network = env.road.network
+    for v, row in zip(env.road.vehicles, states):
+        v.position = np.array((row[_COL['x']], row[_COL['y']]), dtype=np.float64)
+        v.heading = float(row[_COL['heading']])
+        v.speed = float(row[_COL['speed']])
+        v.lane_index = v.lane_index[:2] + (int(row[_COL['lane']]),)
+        v.lane = network.get_lane(v.lane_index)
+        v.target_lane_index = v.lane_index[:2] + (int(row[_COL['target_lane']]),)
+        v.target_speed = float(row[_COL['target_speed']])
+        v.route = None
+
+        v.action = {'steering': 0, 'acceleration': 0}
+        v.crashed = False
+        v.hit = False
+        v.impact = None
+        v.log = []
+        v.history.clear()
+
+        if hasattr(v, 'timer'):
+            v.DELTA = float(row[_COL['delta']])
+            v.timer = float(row[_COL['timer']])
+        if hasattr(v, 'speed_index'):
+            v.speed_index = int(row[_COL['speed_index']])
+
+    obs = env.observation_type.observe()
+    info = env._info(obs, action=env.action_space.sample())
+    if env.render_mode == 'human':
+        env.render()
+
+    return obs, info
+
+
+class ScenarioPool:
+    """按(密度, 种子)索引的初始场景池
+
+    磁盘格式（目录）：
+    - states.npy: float64 (场景数, 最大车辆数, len(FEATURES))，不足的车辆行填NaN
+    - rng.npy: uint64 (场景数, 6)，生成场景后的随机数生成器状态
+    - keys.npy: KEY_DTYPE (场景数,)
+
+    加载时使用内存映射，只有被用到的场景才会读入内存。
+    """
+
+    def __init__(self, states: np.ndarray, rng: np.ndarray, keys: np.ndarray):
+        """初始化场景池
+
+        Args:
+            states: 车辆状态数组
+            rng: 随机数生成器状态数组
+            keys: 场景键数组
+        """
+        self.states = states
+        self.rng = rng
+        self.keys = keys
+        self._index = {
+            (str(k['density']), int(k['seed'])): i for i, k in enumerate(keys)
+        }
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key: Tuple[str, int]) -> bool:
+        return key in self._index
+
+    def seeds(self, density: str) -> List[int]:
+        """某密度下池中的所有种子"""
+        return sorted(seed for d, seed in self._index if d == density)
+
+    def get(self, density: str, seed: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """查询场景
+
+        Args:
+            density: 密度名称
+            seed: 种子
+
+        Returns:
+            (states, rng)，不在池中时返回None
+        """
+        i = self._index.get((density, int(seed)))
+        if i is None:
+            return None
+        count = int(self.keys[i]['count'])
+        return self.states[i, :count], self.rng[i]
+
+    @classmethod
+    def load(cls, path: str) -> 'ScenarioPool':
+        """以内存映射方式加载场景池
+
+        Args:
+            path: 场景池目录
+
+        Returns:
+            ScenarioPool实例
+        """
+        path = Path(path)
+        return cls(
+            np.load(path / 'states.npy', mmap_mode='r'),
+            np.load(path / 'rng.npy', mmap_mode='r'),
+            np.load(path / 'keys.npy'),
+        )
+
+    def save(self, path: str):
+        """保存场景池
+
+        Args:
+            path: 场景池目录
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / 'states.npy', np.asarray(self.states))
+        np.save(path / 'rng.npy', np.asarray(self.rng))
+        np.save(path / 'keys.npy', np.asarray(self.keys))
+
+    @classmethod
+    def build(cls, config: Dict[str, Any], densities: Iterable[str],
+              seeds: Iterable[int]) -> 'ScenarioPool':
+        """用highway-env生成场景池
+
+        Args:
+            config: 环境配置
+            densities: 密度名称列表
+            seeds: 种子列表
+
+        Returns:
+            ScenarioPool实例
+        """
+        from .overtaking_env import create_overtaking_env, _resolve_vehicles_count
+
+        seeds = [int(s) for s in seeds]
+        captured = []
+        keys = []
+
+        for density in densities:
+            env_config = dict(config)
+            env_config['traffic_density'] = density
+            env_config['scenario_pool'] = None
+            vehicles_count, density_name = _resolve_vehicles_count(env_config)
+
+            env = create_overtaking_env(env_config, render_mode=None)
+            for seed in seeds:
+                env.reset(seed=seed)
+                states, rng = capture_scenario(env.unwrapped)
+                captured.append((states, rng))
+                keys.append((density_name, seed, len(states)))
+            env.close()
+
+        max_vehicles = max(len(states) for states, _ in captured)
+        all_states = np.full((len(captured), max_vehicles, len(FEATURES)), np.nan)
+        all_rng = np.zeros((len(captured), 6), dtype=np.uint64)
+        for i, (states, rng) in enumerate(captured):
+            all_states[i, :len(states)] = states
+            all_rng[i] = rng
+
+        return cls(all_states, all_rng, np.array(keys, dtype=KEY_DTYPE))
+
+
+def load_scenario_pool(config: Dict[str, Any]) -> Optional[ScenarioPool]:
+    """根据环境配置加载场景池
+
+    Args:
+        config: 环境配置（scenario_pool.path为空或目录不存在时返回None）
+
+    Returns:
+        ScenarioPool实例或None
+    """
+    pool_config = config.get('scenario_pool') or {}
+    path = pool_config.get('path')
+    if not path or not os.path.exists(os.path.join(path, 'keys.npy')):
+        return None
+    return ScenarioPool.load(path)
+
+
+def _expand_seeds(seeds: List[int], episodes: int) -> List[int]:
+    """evaluate_policy中每个episode使用seed + episode_idx"""
+    return sorted({seed + k for seed in seeds for k in range(episodes)})
+
+
+if __name__ == "__main__":
+    project_root = Path(__file__).parent.parent.parent
+    sys.path.insert(0, str(project_root))
+
+    from src.utils.config_loader import load_all_configs
+
+    parser = argparse.ArgumentParser(description="生成初始场景池")
+    parser.add_argument("--config-dir", type=str, default="configs", help="配置文件目录")
+    parser.add_argument("--output", type=str, default=None, help="场景池目录（默认使用env_config中的scenario_pool.path）")
+    parser.add_argument("--n-episodes", type=int, default=50, help="每个评测种子覆盖的episode数")
+
+    args = parser.parse_args()
+
+    configs = load_all_configs(args.config_dir)
+    env_config = configs['env']
+    eval_config = configs['eval']
+
+    output = args.output or (env_config.get('scenario_pool') or {}).get('path') or 'outputs/scenario_pool'
+    densities = eval_config['scenarios']['traffic_densities']
+    seeds = _expand_seeds(eval_config['scenarios']['seeds'], args.n_episodes)
+
+    pool = ScenarioPool.build(env_config, densities, seeds)
+    pool.save(output)
+    print(f"✓ 场景池已保存: {output} ({len(pool)} 个场景)")
@@ -0,0 +1,684 @@
+"""NumPy批量高速公路仿真后端
+
+以struct-of-arrays形式同时仿真N个独立episode，作为gymnasium VectorEnv使用。
+动力学与highway-v0保持一致：
+- 其他车辆：IDM纵向控制 + MOBIL换道
+- 自车：DiscreteMetaAction（目标车道 + 离散目标速度）
+- 所有车辆：highway-env的转向控制器与自行车模型
+观测（Kinematics）、奖励与info语义与OvertakingEnvWrapper相同。
+
+与highway-env的差异：车辆决策在同一仿真帧内同时进行（highway-env按车辆顺序执行），
+碰撞只判定矩形相交（不计算碰撞冲量），随机数序列也不同，
+因此同一seed下轨迹不逐位一致，但统计意义上等价。
+"""
+
+import numpy as np
+from gymnasium import spaces
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space
+from typing import Dict, Any, List, Optional, Tuple
+
+
+def _not_zero(x: np.ndarray, eps: float = 1e-2) -> np.ndarray:
+    """与highway_env.utils.not_zero一致的向量化版本"""
+    return np.where(np.abs(x) > eps, x, np.where(x >= 0, eps, -eps))
+
+
+def _lmap(v: np.ndarray, x: List[float], y: List[float]) -> np.ndarray:
+    """线性映射 [x0, x1] -> [y0, y1]"""
+    return y[0] + (v - x[0]) * (y[1] - y[0]) / (x[1] - x[0])
+
+
+def _wrap_to_pi(x: np.ndarray) -> np.ndarray:
+    return ((x + np.pi) % (2 * np.pi)) - np.pi
+
+
+class VectorHighwayEnv(VectorEnv):
+    """批量高速公路超车环境
+
+    状态以 (num_envs, n_vehicles) 数组保存，第0列为自车。
+    自动重置采用SAME_STEP模式：episode结束的子环境在同一步内重置，
+    终止观测和info放在infos['final_obs'] / infos['final_info']中。
+    """
+
+    metadata = {'autoreset_mode': AutoresetMode.SAME_STEP}
+
+    # 车辆几何与道路（与highway-env一致）
+    LENGTH = 5.0
+    WIDTH = 2.0
+    LANE_WIDTH = 4.0
+    MAX_SPEED = 40.0
+    MIN_SPEED = -40.0
+    SPEED_LIMIT = 30.0
+    PERCEPTION_DISTANCE = 5.0 * MAX_SPEED
+
+    # 转向/速度控制器
+    TAU_ACC = 0.6
+    TAU_HEADING = 0.2
+    TAU_LATERAL = 0.6
+    KP_A = 1 / TAU_ACC
+    KP_HEADING = 1 / TAU_HEADING
+    KP_LATERAL = 1 / TAU_LATERAL
+    MAX_STEERING_ANGLE = np.pi / 3
+
+    # IDM纵向模型
+    ACC_MAX = 6.0
+    COMFORT_ACC_MAX = 3.0
+    COMFORT_ACC_MIN = -5.0
+    DISTANCE_WANTED = 5.0 + LENGTH
+    TIME_WANTED = 1.5
+    DELTA_RANGE = (3.5, 4.5)
+
+    # MOBIL换道模型
+    POLITENESS = 0.0
+    LANE_CHANGE_MIN_ACC_GAIN = 0.2
+    LANE_CHANGE_MAX_BRAKING_IMPOSED = 2.0
+    LANE_CHANGE_DELAY = 1.0
+
+    # 自车（MDPVehicle）与车辆生成
+    TARGET_SPEEDS = np.linspace(20, 30, 3)
+    EGO_INITIAL_SPEED = 25.0
+    EGO_SPACING = 2.0
+    VEHICLES_DENSITY = 1.0
+
+    # 动作映射（DiscreteMetaAction）
+    ACTIONS = {
+        'LANE_LEFT': 0,
+        'IDLE': 1,
+        'LANE_RIGHT': 2,
+        'FASTER': 3,
+        'SLOWER': 4,
+    }
+
+    FEATURES = ['presence', 'x', 'y', 'vx', 'vy', 'heading', 'cos_h', 'sin_h']
+
+    def __init__(self, config: Dict[str, Any], num_envs: int, vehicles_count: int = 20):
+        """初始化批量环境
+
+        Args:
+            config: 环境配置（env_config.yaml）
+            num_envs: 并行episode数量
+            vehicles_count: 每个episode中的其他车辆数量
+        """
+        self.config = config
+        self.num_envs = num_envs
+        self.n_vehicles = vehicles_count + 1
+
+        self.lanes_count = config.get('lanes_count', 3)
+        episode = config['episode']
+        self.duration = episode['duration']
+        self.policy_frequency = episode['policy_frequency']
+        self.frames = int(episode['simulation_frequency'] // episode['policy_frequency'])
+        self.dt = 1.0 / episode['simulation_frequency']
+        self.reward_speed_range = [config['speed']['min'], config['speed']['max']]
+
+        # 观测配置
+        obs_config = config['observation']
+        self.features = list(obs_config['features'])
+        unknown = set(self.features) - set(self.FEATURES)
+        if unknown:
+            raise ValueError(f"向量化后端不支持的观测特征: {sorted(unknown)}")
+        self.obs_vehicles = obs_config['vehicles_count']
+        self.normalize = obs_config.get('normalize', True)
+        self.features_range = {
+            'x': [-5.0 * self.MAX_SPEED, 5.0 * self.MAX_SPEED],
+            'y': [-self.LANE_WIDTH * self.lanes_count, self.LANE_WIDTH * self.lanes_count],
+            'vx': [-2 * self.MAX_SPEED, 2 * self.MAX_SPEED],
+            'vy': [-2 * self.MAX_SPEED, 2 * self.MAX_SPEED],
+        }
+
+        # 奖励与超车判定（与OvertakingEnvWrapper一致）
+        self.min_safe_distance = config.get('safety', {}).get('min_safe_distance', 15.0)
+        self.reward_weights = config.get('reward_weights', {})
+        overtaking = config.get('overtaking_success', {})
+        self.reference_speed_threshold = overtaking.get('reference_speed_threshold', 25)
+        self.maintain_steps = overtaking.get('maintain_steps', 30)
+
+        # 空间
+        self.single_observation_space = spaces.Box(
+            low=-np.inf, high=np.inf,
+            shape=(self.obs_vehicles, len(self.features)), dtype=np.float32
+        )
+        self.single_action_space = spaces.Discrete(len(self.ACTIONS))
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        self.render_mode = None
+
+        # 车辆状态（struct-of-arrays）
+        shape = (num_envs, self.n_vehicles)
+        self.x = np.zeros(shape)
+        self.y = np.zeros(shape)
+        self.heading = np.zeros(shape)
+        self.speed = np.zeros(shape)
+        self.target_speed = np.zeros(shape)
+        self.lane = np.zeros(shape, dtype=np.int64)
+        self.target_lane = np.zeros(shape, dtype=np.int64)
+        self.delta = np.full(shape, 4.0)
+        self.timer = np.zeros(shape)
+        self.crashed = np.zeros(shape, dtype=bool)
+        self.speed_index = np.zeros(num_envs, dtype=np.int64)
+
+        # episode状态
+        self.time = np.zeros(num_envs)
+        self.episode_length = np.zeros(num_envs, dtype=np.int64)
+        self.violation_count = np.zeros(num_envs, dtype=np.int64)
+        self.target_vehicle = np.full(num_envs, -1, dtype=np.int64)
+        self.steps_ahead = np.zeros(num_envs, dtype=np.int64)
+        self.overtaking_complete = np.zeros(num_envs, dtype=bool)
+        self.overtaking_rewarded = np.zeros(num_envs, dtype=bool)
+
+        self._rows = np.arange(num_envs)[:, None]
+        self._self_idx = np.broadcast_to(np.arange(self.n_vehicles), shape)
+        self._not_self = ~np.eye(self.n_vehicles, dtype=bool)[None]
+        self._rngs = [np.random.default_rng() for _ in range(num_envs)]
+
+    # ------------------------------------------------------------------
+    # gymnasium VectorEnv 接口
+    # ------------------------------------------------------------------
+
+    def reset(self, *, seed=None, options: Optional[Dict] = None):
+        """重置子环境
+
+        Args:
+            seed: int（子环境i使用seed+i）、每个子环境一个seed的列表，或None
+            options: 可选 {'reset_mask': bool数组}，只重置掩码为True的子环境
+
+        Returns:
+            (observations, infos)
+        """
+        if seed is None:
+            seeds = [None] * self.num_envs
+        elif isinstance(seed, (int, np.integer)):
+            seeds = [int(seed) + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+
+        reset_mask = None if options is None else options.get('reset_mask')
+        if reset_mask is None:
+            reset_mask = np.ones(self.num_envs, dtype=bool)
+
+        for i in np.flatnonzero(reset_mask):
+            if seeds[i] is not None:
+                self._rngs[i] = np.random.default_rng(seeds[i])
+            self._spawn(i)
+
+        return self._observe(), {}
+
+    def step(self, actions):
+        """所有子环境执行一步
+
+        Args:
+            actions: 形状为 (num_envs,) 的离散动作
+
+        Returns:
+            observations, rewards, terminations, truncations, infos
+        """
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+        self.time += 1.0 / self.policy_frequency
+        self._act_ego(actions)
+        for _ in range(self.frames):
+            self._simulate_frame()
+
+        self.episode_length += 1
+        obs = self._observe()
+
+        # 基础奖励（与HighwayEnv._rewards一致）
+        crashed = self.crashed[:, 0].copy()
+        forward_speed = self.speed[:, 0] * np.cos(self.heading[:, 0])
+        rewards = {
+            'collision_reward': crashed.astype(np.float64),
+            'right_lane_reward': self.target_lane[:, 0] / max(self.lanes_count - 1, 1),
+            'high_speed_reward': np.clip(_lmap(forward_speed, self.reward_speed_range, [0, 1]), 0, 1),
+            'on_road_reward': self._on_road().astype(np.float64),
+        }
+
+        # 危险距离 / 违规
+        distances = np.hypot(self.x[:, 1:] - self.x[:, :1], self.y[:, 1:] - self.y[:, :1])
+        dangerous = (distances < self.min_safe_distance).any(axis=1)
+
+        # 自定义奖励（与OvertakingEnvWrapper._compute_custom_reward一致）
+        weights = self.reward_weights
+        overtaking_bonus = self.overtaking_complete & ~self.overtaking_rewarded
+        self.overtaking_rewarded |= overtaking_bonus
+        components = {
+            'collision': np.where(crashed, weights.get('collision', -100), 0.0),
+            'high_speed': rewards['high_speed_reward'] * weights.get('high_speed_reward', 0.4),
+            'right_lane': rewards['right_lane_reward'] * weights.get('right_lane_reward', 0.1),
+            'on_road': rewards['on_road_reward'] * weights.get('on_road_reward', 1.0),
+            'dangerous_distance': np.where(dangerous, weights.get('dangerous_distance', -10), 0.0),
+            'overtaking_success': np.where(overtaking_bonus, 50.0, 0.0),
+        }
+        reward = sum(components.values())
+
+        violation = dangerous
+        self.violation_count += violation
+
+        self._update_overtaking_status()
+
+        terminated = crashed
+        truncated = self.time >= self.duration
+
+        infos = {
+            'speed': self.speed[:, 0].copy(),
+            'crashed': crashed,
+            'action': actions,
+            'rewards': rewards,
+            'reward_components': components,
+            'violation': violation,
+            'overtaking_complete': self.overtaking_complete.copy(),
+            'episode_length': self.episode_length.copy(),
+            'violation_count': self.violation_count.copy(),
+        }
+
+        done = terminated | truncated
+        if done.any():
+            final_obs = np.empty(self.num_envs, dtype=object)
+            for i in np.flatnonzero(done):
+                final_obs[i] = obs[i].copy()
+            final_info = self._batch_info(infos, done)
+
+            for i in np.flatnonzero(done):
+                self._spawn(i)
+            obs = self._observe()
+
+            infos = self._batch_info(infos, ~done)
+            infos['final_obs'] = final_obs
+            infos['_final_obs'] = done
+            infos['final_info'] = final_info
+            infos['_final_info'] = done
+        else:
+            infos = self._batch_info(infos, np.ones(self.num_envs, dtype=bool))
+
+        return obs, reward, terminated, truncated, infos
+
+    def close_extras(self, **kwargs):
+        """无外部资源需要释放"""
+        pass
+
+    # ------------------------------------------------------------------
+    # 车辆生成
+    # ------------------------------------------------------------------
+
+    def _spawn(self, i: int):
+        """按highway-v0的create_random规则重新生成第i个子环境的交通
+
+        Args:
+            i: 子环境编号
+        """
+        rng = self._rngs[i]
+        n = self.n_vehicles
+        lanes_count = self.lanes_count
+
+        lanes = rng.integers(lanes_count, size=n)
+        speeds = np.empty(n)
+        speeds[0] = self.EGO_INITIAL_SPEED
+        speeds[1:] = rng.uniform(0.7 * self.SPEED_LIMIT, 0.8 * self.SPEED_LIMIT, size=n - 1)
+
+        # 每辆车位于前一辆车之后的随机间距处
+        spacing = np.full(n, 1.0 / self.VEHICLES_DENSITY)
+        spacing[0] = self.EGO_SPACING
+        offsets = spacing * (12 + speeds) * np.exp(-5 / 40 * lanes_count)
+        gaps = offsets * rng.uniform(0.9, 1.1, size=n)
+        gaps[0] += 3 * offsets[0]
+        x = np.cumsum(gaps)
+        y = lanes * self.LANE_WIDTH
+
+        self.x[i] = x
+        self.y[i] = y
+        self.heading[i] = 0.0
+        self.speed[i] = speeds
+        self.target_speed[i] = speeds
+        self.lane[i] = lanes
+        self.target_lane[i] = lanes
+        self.delta[i] = rng.uniform(*self.DELTA_RANGE, size=n)
+        self.timer[i] = ((x + y) * np.pi) % self.LANE_CHANGE_DELAY
+        self.crashed[i] = False
+
+        self.speed_index[i] = self._speed_to_index(speeds[0])
+        self.target_speed[i, 0] = self.TARGET_SPEEDS[self.speed_index[i]]
+
+        self.time[i] = 0.0
+        self.episode_length[i] = 0
+        self.violation_count[i] = 0
+        self.steps_ahead[i] = 0
+        self.overtaking_complete[i] = False
+        self.overtaking_rewarded[i] = False
+
+        # 目标超车车辆：前方最近的慢车
+        vx = self.speed[i] * np.cos(self.heading[i])
+        candidates = np.flatnonzero((x > x[0]) & (vx < self.reference_speed_threshold))
+        if len(candidates):
+            self.target_vehicle[i] = candidates[np.argmin(x[candidates])]
+        else:
+            self.target_vehicle[i] = -1
+
+    # ------------------------------------------------------------------
+    # 仿真
+    # ------------------------------------------------------------------
+
+    def _speed_to_index(self, speed):
+        speeds = self.TARGET_SPEEDS
+        x = (speed - speeds[0]) / (speeds[-1] - speeds[0])
+        return np.clip(np.round(x * (speeds.size - 1)), 0, speeds.size - 1).astype(np.int64)
+
+    def _closest_lane(self, y: np.ndarray) -> np.ndarray:
+        return np.clip(np.round(y / self.LANE_WIDTH), 0, self.lanes_count - 1).astype(np.int64)
+
+    def _on_road(self) -> np.ndarray:
+        lane = self._closest_lane(self.y[:, 0])
+        return np.abs(self.y[:, 0] - lane * self.LANE_WIDTH) <= self.LANE_WIDTH / 2
+
+    def _act_ego(self, actions: np.ndarray):
+        """将高层动作转换为自车的目标速度和目标车道（MDPVehicle.act）"""
+        faster = actions == self.ACTIONS['FASTER']
+        slower = actions == self.ACTIONS['SLOWER']
+        if faster.any() or slower.any():
+            current = self._speed_to_index(self.speed[:, 0])
+            index = np.where(faster, current + 1, np.where(slower, current - 1, self.speed_index))
+            self.speed_index = np.clip(index, 0, self.TARGET_SPEEDS.size - 1)
+            self.target_speed[:, 0] = self.TARGET_SPEEDS[self.speed_index]
+
+        left = actions == self.ACTIONS['LANE_LEFT']
+        right = actions == self.ACTIONS['LANE_RIGHT']
+        if left.any() or right.any():
+            lane = self.target_lane[:, 0]
+            candidate = np.clip(np.where(left, lane - 1, lane + 1), 0, self.lanes_count - 1)
+            reachable = np.abs(self.y[:, 0] - candidate * self.LANE_WIDTH) <= 2 * self.LANE_WIDTH
+            self.target_lane[:, 0] = np.where((left | right) & reachable, candidate, lane)
+
+    def _simulate_frame(self):
+        """推进一个仿真帧（1 / simulation_frequency 秒）"""
+        self.lane = self._closest_lane(self.y)
+        self._cos = np.cos(self.heading)
+        self._sin = np.sin(self.heading)
+        self._vx = self.speed * self._cos
+        self._vy = self.speed * self._sin
+        neighbours = self._neighbours(self._rows, self._self_idx, self.lane)
+
+        self._change_lane_policy(neighbours)
+
+        steering = self._steering_control()
+
+        # IDM纵向控制；换道过程中同时考虑当前车道与目标车道的前车
+        front, has_front, _, _ = neighbours
+        acceleration = self._idm(self._rows, self._self_idx, True, front, has_front, self.delta)
+        changing = self.lane != self.target_lane
+        if changing.any():
+            front_t, has_front_t, _, _ = self._neighbours(self._rows, self._self_idx, self.target_lane)
+            target_acc = self._idm(self._rows, self._self_idx, True, front_t, has_front_t, self.delta)
+            acceleration = np.where(changing, np.minimum(acceleration, target_acc), acceleration)
+        acceleration = np.clip(acceleration, -self.ACC_MAX, self.ACC_MAX)
+
+        # 自车：比例速度控制
+        acceleration[:, 0] = self.KP_A * (self.target_speed[:, 0] - self.speed[:, 0])
+
+        # 碰撞车辆：方向回正并制动至停车；速度限幅
+        steering = np.where(self.crashed, 0.0, steering)
+        acceleration = np.where(self.crashed, -self.speed, acceleration)
+        acceleration = np.where(self.speed > self.MAX_SPEED,
+                                np.minimum(acceleration, self.MAX_SPEED - self.speed), acceleration)
+        acceleration = np.where(self.speed < self.MIN_SPEED,
+                                np.maximum(acceleration, self.MIN_SPEED - self.speed), acceleration)
+
+        # 自行车模型积分
+        beta = np.arctan(0.5 * np.tan(steering))
+        self.x += self.speed * np.cos(self.heading + beta) * self.dt
+        self.y += self.speed * np.sin(self.heading + beta) * self.dt
+        self.heading += self.speed * np.sin(beta) / (self.LENGTH / 2) * self.dt
+        self.speed += acceleration * self.dt
+        self.timer[:, 1:] += self.dt
+
+        self.lane = self._closest_lane(self.y)
+        self.crashed |= self._collisions()
+
+    def _neighbours(self, env, vehicle, query_lane) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """在指定车道上查找车辆的前车和后车（Road.neighbour_vehicles）
+
+        env/vehicle/query_lane为可广播的下标数组：全部车辆时为
+        (num_envs, 1) / (num_envs, n_vehicles)，只查询部分车辆时为一维数组。
+
+        Args:
+            env: 子环境下标
+            vehicle: 车辆下标
+            query_lane: 每辆车要查询的车道
+
+        Returns:
+            (front_idx, has_front, rear_idx, has_rear)
+        """
+        lane_y = (query_lane * self.LANE_WIDTH)[..., None]
+        on_lane = np.abs(self.y[env] - lane_y) <= self.LANE_WIDTH / 2 + 1
+        on_lane &= np.arange(self.n_vehicles) != vehicle[..., None]
+        dx = self.x[env] - self.x[env, vehicle][..., None]
+
+        front_d = np.where(on_lane & (dx >= 0), dx, np.inf)
+        front_idx = front_d.argmin(axis=-1)
+        has_front = np.isfinite(front_d.min(axis=-1))
+
+        rear_d = np.where(on_lane & (dx < 0), dx, -np.inf)
+        rear_idx = rear_d.argmax(axis=-1)
+        has_rear = np.isfinite(rear_d.max(axis=-1))
+
+        return front_idx, has_front, rear_idx, has_rear
+
+    def _desired_gap(self, speed, cos_h, sin_h, front_vx, front_vy) -> np.ndarray:
+        """IDM期望间距 d* = d0 + v·T + v·Δv / (2√(ab))
+
+        参数均为可广播的数组：后车速度、朝向余弦/正弦，前车速度分量
+        """
+        dv = (speed * cos_h - front_vx) * cos_h + (speed * sin_h - front_vy) * sin_h
+        ab = -self.COMFORT_ACC_MAX * self.COMFORT_ACC_MIN
+        return self.DISTANCE_WANTED + speed * self.TIME_WANTED + speed * dv / (2 * np.sqrt(ab))
+
+    def _idm(self, env, ego_idx, has_ego, front_idx, has_front, delta) -> np.ndarray:
+        """IDM加速度（IDMVehicle.acceleration）
+
+        Args:
+            env: 子环境下标
+            ego_idx: 被计算车辆的下标
+            has_ego: 被计算车辆是否存在（不存在时加速度为0）
+            front_idx: 前车下标
+            has_front: 前车是否存在
+            delta: 速度项指数（取决策车辆的DELTA）
+
+        Returns:
+            加速度数组
+        """
+        speed = self.speed[env, ego_idx]
+        target_speed = np.clip(self.target_speed[env, ego_idx], 0, self.SPEED_LIMIT)
+        acceleration = self.COMFORT_ACC_MAX * (
+            1 - np.power(np.maximum(speed, 0) / np.abs(_not_zero(target_speed)), delta)
+        )
+
+        gap = self.x[env, front_idx] - self.x[env, ego_idx]
+        d_star = self._desired_gap(
+            speed, self._cos[env, ego_idx], self._sin[env, ego_idx],
+            self._vx[env, front_idx], self._vy[env, front_idx],
+        )
+        interaction = self.COMFORT_ACC_MAX * np.power(d_star / _not_zero(gap), 2)
+        acceleration = np.where(has_front, acceleration - interaction, acceleration)
+
+        return np.where(has_ego, acceleration, 0.0)
+
+    def _change_lane_policy(self, neighbours):
+        """其他车辆的换道决策（IDMVehicle.change_lane_policy）"""
+        active = ~self.crashed
+        active[:, 0] = False
+        changing = active & (self.lane != self.target_lane)
+
+        # 进行中的换道：若他车正在并入同一车道且距离过近，则放弃换道
+        if changing.any():
+            target_i = self.target_lane[:, :, None]
+            merging = (self.lane[:, None, :] != target_i) \
+                & (self.target_lane[:, None, :] == target_i) & self._not_self
+            d = (self.x[:, None, :] - self.x[:, :, None])
+            d_star = self._desired_gap(
+                self.speed[:, :, None], self._cos[:, :, None], self._sin[:, :, None],
+                self._vx[:, None, :], self._vy[:, None, :],
+            )
+            abort = changing & (merging & (d > 0) & (d < d_star)).any(axis=2)
+            self.target_lane = np.where(abort, self.lane, self.target_lane)
+
+        # 按LANE_CHANGE_DELAY周期用MOBIL评估左右相邻车道（只计算到期的车辆）
+        decide = active & ~changing & (self.timer > self.LANE_CHANGE_DELAY)
+        if not decide.any():
+            return
+        self.timer = np.where(decide, 0.0, self.timer)
+        env, vehicle = np.nonzero(decide & (np.abs(self.speed) >= 1))
+        if len(env) == 0:
+            return
+
+        old = tuple(values[env, vehicle] for values in neighbours)
+        lane = self.lane[env, vehicle]
+        target = self.target_lane[env, vehicle]
+        for offset in (-1, 1):
+            candidate = lane + offset
+            valid = (candidate >= 0) & (candidate < self.lanes_count)
+            if not valid.any():
+                continue
+            candidate = np.clip(candidate, 0, self.lanes_count - 1)
+            accept = self._mobil(env, vehicle, candidate, *old)
+            target = np.where(valid & accept, candidate, target)
+        self.target_lane[env, vehicle] = target
+
+    def _mobil(self, env, vehicle, candidate, old_front, has_old_front, old_rear, has_old_rear) -> np.ndarray:
+        """MOBIL换道判定（IDMVehicle.mobil）"""
+        delta = self.delta[env, vehicle]
+        new_front, has_new_front, new_rear, has_new_rear = self._neighbours(env, vehicle, candidate)
+
+        # 换道是否迫使新后车过度制动
+        new_following_a = self._idm(env, new_rear, has_new_rear, new_front, has_new_front, delta)
+        new_following_pred_a = self._idm(env, new_rear, has_new_rear, vehicle, True, delta)
+        safe = new_following_pred_a >= -self.LANE_CHANGE_MAX_BRAKING_IMPOSED
+
+        # 自身及后车的加速度收益
+        self_pred_a = self._idm(env, vehicle, True, new_front, has_new_front, delta)
+        self_a = self._idm(env, vehicle, True, old_front, has_old_front, delta)
+        old_following_a = self._idm(env, old_rear, has_old_rear, vehicle, True, delta)
+        old_following_pred_a = self._idm(env, old_rear, has_old_rear, old_front, has_old_front, delta)
+        jerk = self_pred_a - self_a + self.POLITENESS * (
+            new_following_pred_a - new_following_a + old_following_pred_a - old_following_a
+        )
+
+        return safe & (jerk >= self.LANE_CHANGE_MIN_ACC_GAIN)
+
+    def _steering_control(self) -> np.ndarray:
+        """跟随目标车道中心线的转向控制（ControlledVehicle.steering_control）"""
+        lateral = self.y - self.target_lane * self.LANE_WIDTH
+        speed = _not_zero(self.speed)
+
+        lateral_speed_command = -self.KP_LATERAL * lateral
+        heading_command = np.arcsin(np.clip(lateral_speed_command / speed, -1, 1))
+        heading_ref = np.clip(heading_command, -np.pi / 4, np.pi / 4)
+        heading_rate_command = self.KP_HEADING * _wrap_to_pi(heading_ref - self.heading)
+        slip_angle = np.arcsin(np.clip(self.LENGTH / 2 / speed * heading_rate_command, -1, 1))
+        steering = np.arctan(2 * np.tan(slip_angle))
+
+        return np.clip(steering, -self.MAX_STEERING_ANGLE, self.MAX_STEERING_ANGLE)
+
+    def _collisions(self) -> np.ndarray:
+        """矩形车身相交检测（分离轴定理）
+
+        Returns:
+            (num_envs, n_vehicles) 本帧发生碰撞的车辆
+        """
+        crashed = np.zeros_like(self.crashed)
+
+        # 快速预筛：中心距离超过车身对角线则不可能相交，只对候选车对做精确判定
+        diagonal = np.hypot(self.LENGTH, self.WIDTH)
+        dx = self.x[:, None, :] - self.x[:, :, None]
+        close = (np.abs(dx) < diagonal) & self._not_self
+        env, i, j = np.nonzero(close)
+        if len(env) == 0:
+            return crashed
+
+        dx = dx[env, i, j]
+        dy = self.y[env, j] - self.y[env, i]
+        cos_i, sin_i = np.cos(self.heading[env, i]), np.sin(self.heading[env, i])
+        cos_j, sin_j = np.cos(self.heading[env, j]), np.sin(self.heading[env, j])
+        half_l, half_w = self.LENGTH / 2, self.WIDTH / 2
+
+        intersecting = np.abs(dy) < diagonal
+        for ux, uy in ((cos_i, sin_i), (-sin_i, cos_i), (cos_j, sin_j), (-sin_j, cos_j)):
+            distance = np.abs(dx * ux + dy * uy)
+            r_i = half_l * np.abs(cos_i * ux + sin_i * uy) + half_w * np.abs(-sin_i * ux + cos_i * uy)
+            r_j = half_l * np.abs(cos_j * ux + sin_j * uy) + half_w * np.abs(-sin_j * ux + cos_j * uy)
+            intersecting &= distance <= r_i + r_j  # 与highway-env一致：接触即碰撞
+
+        crashed[env[intersecting], i[intersecting]] = True
+        return crashed
+
+    def _update_overtaking_status(self):
+        """更新超车进度（OvertakingEnvWrapper._update_overtaking_status）"""
+        active = (self.target_vehicle >= 0) & ~self.overtaking_complete
+        target = np.maximum(self.target_vehicle, 0)
+        target_x = self.x[np.arange(self.num_envs), target]
+        ahead = self.x[:, 0] > target_x
+
+        self.steps_ahead = np.where(active, np.where(ahead, self.steps_ahead + 1, 0), self.steps_ahead)
+        self.overtaking_complete |= active & (self.steps_ahead >= self.maintain_steps)
+
+    # ------------------------------------------------------------------
+    # 观测与info
+    # ------------------------------------------------------------------
+
+    def _observe(self) -> np.ndarray:
+        """Kinematics观测（与highway-env KinematicObservation一致）"""
+        n_envs = self.num_envs
+        count = self.obs_vehicles - 1
+
+        vx = self.speed * np.cos(self.heading)
+        vy = self.speed * np.sin(self.heading)
+        dx = self.x - self.x[:, :1]
+        dy = self.y - self.y[:, :1]
+
+        # 感知范围内、不在自车后方两个车长以外的车辆，按纵向距离排序
+        visible = (np.hypot(dx, dy) < self.PERCEPTION_DISTANCE) & (dx > -2 * self.LENGTH)
+        visible[:, 0] = False
+        key = np.where(visible, np.abs(dx), np.inf)
+        order = np.argsort(key, axis=1, kind='stable')[:, :count]
+        present = np.isfinite(np.take_along_axis(key, order, axis=1))
+
+        rows = np.concatenate([np.zeros((n_envs, 1), dtype=np.int64), order], axis=1)
+        mask = np.concatenate([np.ones((n_envs, 1), dtype=bool), present], axis=1)
+
+        def pick(values):
+            return np.take_along_axis(values, rows, axis=1)
+
+        columns = {
+            'presence': np.ones(rows.shape),
+            'x': pick(dx),
+            'y': pick(dy),
+            'vx': pick(vx - vx[:, :1]),
+            'vy': pick(vy - vy[:, :1]),
+            'heading': pick(self.heading),
+            'cos_h': pick(np.cos(self.heading)),
+            'sin_h': pick(np.sin(self.heading)),
+        }
+        # 自车使用绝对量
+        columns['x'][:, 0] = self.x[:, 0]
+        columns['y'][:, 0] = self.y[:, 0]
+        columns['vx'][:, 0] = vx[:, 0]
+        columns['vy'][:, 0] = vy[:, 0]
+
+        obs = np.zeros((n_envs, self.obs_vehicles, len(self.features)), dtype=np.float32)
+        width = rows.shape[1]
+        for f, feature in enumerate(self.features):
+            values = columns[feature]
+            if self.normalize and feature in self.features_range:
+                values = np.clip(_lmap(values, self.features_range[feature], [-1, 1]), -1, 1)
+            obs[:, :width, f] = np.where(mask, values, 0.0)
+
+        return obs
+
+    @classmethod
+    def _batch_info(cls, infos: Dict[str, Any], mask: np.ndarray) -> Dict[str, Any]:
+        """按gymnasium向量环境约定为每个info键添加 `_key` 掩码"""
+        batched = {}
+        for key, value in infos.items():
+            if isinstance(value, dict):
+                batched[key] = cls._batch_info(value, mask)
+            else:
+                batched[key] = value
+            batched[f'_{key}'] = mask.copy()
+        return batched
@@ -0,0 +1,270 @@
+"""统一评测入口：在一个进程中评测多个方法
+
+代替run_all_eval.sh中依次启动的三个评测进程（每个进程都要重新导入依赖、加载配置和模型、创建环境）：
+依赖和配置只加载一次，需要模型的方法共用同一个模型，所有方法通过同一个环境池运行
+（同一密度的环境在方法、种子之间复用）。结果文件名与各评测脚本相同
+（{method}_{density}_seed{seed}_*，缓存键也相同，可以互相复用缓存）。
+
+结束时打印并保存（results_dir/eval_timing.json）端到端耗时和启动开销
+（导入、配置、模型加载、环境创建时间）；--compare-legacy再按旧方式逐个启动评测进程计时，
+用于前后对比。
+"""
+
+import time
+
+_PROCESS_START = time.perf_counter()  # 导入依赖之前（计入启动开销）
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Sequence, Tuple
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.baseline import BatchedRuleBasedPolicy
+from src.baseline.evaluate_baseline import BASELINE_CODE_FILES
+from src.metrics.cache import EvalResultCache, print_cache_report
+from src.metrics.grid import EnvPool, evaluate_cell, grid_cells, run_eval_grid
+from src.metrics.results_store import ResultsStore, new_run_id
+from src.rl.action_mask import MaskedShieldPolicy
+from src.rl.evaluate import SafetyShieldWrapper
+from src.rl.numpy_policy import load_policy, resolve_policy_file
+from src.rl.safety_shield import SafetyShield
+from src.utils.config_loader import load_all_configs
+from src.utils.headless import enable_headless
+
+_IMPORTS_DONE = time.perf_counter()
+
+# 已注册的评测方法 {方法名: {'factory', 'code_files', 'needs_model'}}
+POLICIES: Dict[str, Dict] = {}
+
+
+def register_policy(name: str, factory: Callable, code_files: Sequence[str] = (), needs_model: bool = False):
+    """注册评测方法
+
+    Args:
+        name: 方法名（结果文件前缀）
+        factory: factory(env_config, model) -> 策略；model为共用的已加载模型（needs_model为False时可能为None）。
+            策略带有shield属性（SafetyShield）时，每个单元统计Safety Shield干预
+        code_files: 计入缓存键的策略代码文件（需要模型且模型为.npz时自动加入numpy_policy.py）
+        needs_model: 是否需要--model
+    """
+    POLICIES[name] = {'factory': factory, 'code_files': list(code_files), 'needs_model': needs_model}
+
+
+register_policy('baseline', lambda env_config, model: BatchedRuleBasedPolicy(env_config), BASELINE_CODE_FILES)
+register_policy('rl', lambda env_config, model: model, needs_model=True)
+register_policy('rl_safety', lambda env_config, model: SafetyShieldWrapper(model, SafetyShield(env_config)),
+                ['src/rl/safety_shield.py'], needs_model=True)
+register_policy('rl_masked', lambda env_config, model: MaskedShieldPolicy(model, SafetyShield(env_config)),
+                ['src/rl/safety_shield.py', 'src/rl/action_mask.py'], needs_model=True)
+
+# 旧方式（run_all_eval.sh）下各方法的评测命令
+LEGACY_COMMANDS = {
+    'baseline': ['-m', 'src.baseline.evaluate_baseline'],
+    'rl': ['-m', 'src.rl.evaluate', '--model', '{model}'],
+    'rl_safety': ['-m', 'src.rl.evaluate', '--model', '{model}', '--safety-shield'],
+}
+
+
+def evaluate_all(methods: Sequence[str], model_path: str = None, config_dir: str = "configs",
+                 output_dir: str = "outputs", n_episodes: int = 50, headless: bool = False,
+                 force: bool = False) -> Tuple[Dict[str, Dict[str, Dict[str, float]]], Dict]:
+    """在一个进程中依次评测多个方法
+
+    Args:
+        methods: 方法列表（已注册的方法名，默认有baseline / rl / rl_safety / rl_masked）
+        model_path: 模型路径（.zip或导出的.npz；只评测不需要模型的方法时可为None）
+        config_dir: 配置文件目录
+        output_dir: 输出目录
+        n_episodes: 评测轮数
+        headless: 无界面模式
+        force: 忽略缓存，重新评测所有单元
+
+    Returns:
+        ({方法名: {"{密度}_seed{种子}": metrics}}, 耗时报告)
+    """
+    unknown = [m for m in methods if m not in POLICIES]
+    if unknown:
+        raise ValueError(f"未知的方法: {unknown}（已注册: {list(POLICIES)}）")
+    needs_model = any(POLICIES[m]['needs_model'] for m in methods)
+    if needs_model and model_path is None:
+        raise ValueError(f"评测 {[m for m in methods if POLICIES[m]['needs_model']]} 需要模型路径")
+
+    timings = {'imports': _IMPORTS_DONE - _PROCESS_START}
+    start = time.perf_counter()
+
+    # 加载配置
+    configs = load_all_configs(config_dir)
+    env_config = configs['env']
+    eval_config = configs['eval']
+    if headless or env_config.get('headless', False):
+        enable_headless()
+        env_config['headless'] = True
+    results_dir = Path(output_dir) / eval_config['output']['results_dir']
+    results_dir.mkdir(parents=True, exist_ok=True)
+    timings['configs'] = time.perf_counter() - start
+
+    # 加载模型（所有方法共用）并创建策略
+    start = time.perf_counter()
+    model, model_file = None, None
+    if needs_model:
+        print(f"加载模型: {model_path}")
+        model = load_policy(model_path)
+        model_file = str(resolve_policy_file(model_path))
+    policies = {m: POLICIES[m]['factory'](env_config, model) for m in methods}
+    timings['models'] = time.perf_counter() - start
+
+    cache = EvalResultCache(results_dir / '.cache') if eval_config['output'].get('cache', True) else None
+    store = ResultsStore(results_dir / 'store') if eval_config['output'].get('results_store', True) else None
+    run_id = new_run_id()
+    env_pool = EnvPool()
+
+    all_results, cached, method_seconds = {}, {}, {}
+    try:
+        for method in methods:
+            print("\n" + "=" * 60)
+            print(f"评测方法: {method}")
+            print("=" * 60)
+
+            policy = policies[method]
+            shield = getattr(policy, 'shield', None)
+            code_files = list(POLICIES[method]['code_files'])
+            if POLICIES[method]['needs_model'] and model_file.endswith('.npz'):
+                code_files.append('src/rl/numpy_policy.py')
+
+            def run_cell(density: str, seed: int):
+                return evaluate_cell(
+                    policy, method, density, seed, env_config, eval_config, n_episodes, str(results_dir),
+                    cache=cache, force=force, store=store, run_id=run_id,
+                    model_file=model_file if POLICIES[method]['needs_model'] else None,
+                    code_files=code_files, shield=shield, env_pool=env_pool,
+                )
+
+            method_start, env_seconds = time.perf_counter(), env_pool.create_seconds
+            results = run_eval_grid(grid_cells(eval_config), run_cell, n_workers=1)
+            # 环境在第一次使用时创建，创建时间计入启动开销而不是方法的评测时间
+            method_seconds[method] = time.perf_counter() - method_start - (env_pool.create_seconds - env_seconds)
+
+            all_results[method] = {key: metrics for key, (metrics, _) in results.items()}
+            cached.update({f"{method}_{key}": extra['cached'] for key, (_, extra) in results.items()})
+            if shield is not None:
+                # Safety Shield统计（合并各单元）
+                merged = SafetyShield(env_config)
+                for _, extra in results.values():
+                    merged.merge_statistics(extra['shield'])
+                merged.print_statistics()
+    finally:
+        env_pool.close()
+
+    if store is not None:
+        store.compact()
+    if cache is not None:
+        print_cache_report(cached)
+
+    timings['envs'] = env_pool.create_seconds
+    timings['startup'] = timings['imports'] + timings['configs'] + timings['models'] + timings['envs']
+    timings['methods'] = method_seconds
+    timings['total'] = time.perf_counter() - _PROCESS_START
+    report = {'methods': list(methods), 'n_episodes': n_episodes, 'run_id': run_id,
+              'results_dir': str(results_dir), 'unified': timings}
+    save_timing_report(report)
+    print_timing_report(report)
+    return all_results, report
+
+
+def time_legacy(methods: Sequence[str], model_path: str = None, config_dir: str = "configs",
+                output_dir: str = "outputs", n_episodes: int = 50, headless: bool = False) -> Dict:
+    """按旧方式（每个方法一个评测进程）计时，所有单元重新评测（结果文件与统一评测相同，会被覆盖）
+
+    Args:
+        同evaluate_all（只支持baseline / rl / rl_safety）
+
+    Returns:
+        {'methods': {方法名: 进程耗时(秒)}, 'total': 总耗时(秒)}
+    """
+    unsupported = [m for m in methods if m not in LEGACY_COMMANDS]
+    if unsupported:
+        raise ValueError(f"旧评测脚本不支持: {unsupported}")
+
+    seconds = {}
+    for method in methods:
+        command = [sys.executable, *[arg.format(model=model_path) for arg in LEGACY_COMMANDS[method]],
+                   '--config-dir', config_dir, '--output-dir', output_dir,
+                   '--n-episodes', str(n_episodes), '--force']
+        if headless:
+            command.append('--headless')
+        print(f"[旧方式] {' '.join(command[1:])}")
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, cwd=project_root)
+        seconds[method] = time.perf_counter() - start
+        print(f"[旧方式] {method}: {seconds[method]:.1f}s")
+    return {'methods': seconds, 'total': sum(seconds.values())}
+
+
+def save_timing_report(report: Dict):
+    """保存耗时报告到 results_dir/eval_timing.json
+
+    Args:
+        report: evaluate_all生成的耗时报告
+    """
+    path = Path(report['results_dir']) / 'eval_timing.json'
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✓ 保存耗时报告: {path}")
+
+
+def print_timing_report(report: Dict):
+    """打印耗时报告
+
+    Args:
+        report: evaluate_all生成的报告（含legacy时同时打印对比）
+    """
+    unified = report['unified']
+    print("\n" + "=" * 60)
+    print("评测耗时")
+    print("=" * 60)
+    print(f"启动开销:       {unified['startup']:.1f}s（导入 {unified['imports']:.1f}s, 配置 {unified['configs']:.1f}s, "
+          f"模型 {unified['models']:.1f}s, 环境 {unified['envs']:.1f}s）")
+    for method, seconds in unified['methods'].items():
+        print(f"  {method:<14}{seconds:.1f}s")
+    print(f"端到端耗时:     {unified['total']:.1f}s")
+
+    legacy = report.get('legacy')
+    if legacy is not None:
+        print(f"\n旧方式（每个方法一个进程）: {legacy['total']:.1f}s")
+        for method, seconds in legacy['methods'].items():
+            print(f"  {method:<14}{seconds:.1f}s")
+        print(f"加速: {legacy['total'] / unified['total']:.2f}x（节省 {legacy['total'] - unified['total']:.1f}s）")
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="统一评测入口（一个进程评测多个方法）")
+    parser.add_argument("--methods", type=str, nargs="+", default=['baseline', 'rl', 'rl_safety'],
+                        help=f"评测的方法（已注册: {list(POLICIES)}）")
+    parser.add_argument("--model", type=str, default=None, help="模型路径（.zip或导出的.npz）")
+    parser.add_argument("--config-dir", type=str, default="configs", help="配置文件目录")
+    parser.add_argument("--output-dir", type=str, default="outputs", help="输出目录")
+    parser.add_argument("--n-episodes", type=int, default=50, help="评测轮数")
+    parser.add_argument("--headless", action="store_true", help="无界面模式（不创建任何渲染）")
+    parser.add_argument("--force", action="store_true", help="忽略缓存，重新评测所有单元")
+    parser.add_argument("--compare-legacy", action="store_true",
+                        help="统一评测后再按旧方式逐个启动评测进程计时（两者都重新评测所有单元）")
+    args = parser.parse_args()
+    if args.model is None and any(POLICIES.get(m, {}).get('needs_model') for m in args.methods):
+        parser.error("评测RL方法需要 --model")
+
+    # 统一评测先运行：端到端耗时从本进程启动算起，不包含旧方式的计时
+    _, report = evaluate_all(args.methods, args.model, args.config_dir, args.output_dir, args.n_episodes,
+                             args.headless, force=args.force or args.compare_legacy)
+    if args.compare_legacy:
+        report['legacy'] = time_legacy(args.methods, args.model, args.config_dir, args.output_dir,
+                                       args.n_episodes, args.headless)
+        save_timing_report(report)
+        print_timing_report(report)
@@ -1,5 +1,5 @@
 """指标评估模块"""
 
-from .evaluator import MetricsEvaluator, evaluate_policy
+from .evaluator import AdaptiveStopping, MetricsEvaluator, evaluate_policy, evaluate_policy_vectorized
 
-__all__ = ['MetricsEvaluator', 'evaluate_policy']
+__all__ = ['AdaptiveStopping', 'MetricsEvaluator', 'evaluate_policy', 'evaluate_policy_vectorized']
@@ -0,0 +1,192 @@
+"""评测结果缓存
+
+每个评测单元的缓存键由影响结果的全部输入计算：模型文件哈希、相关环境/评测配置、
+密度、种子、episode数、策略类型，以及策略代码和环境/指标包全部代码文件的哈希。
+键相同时直接复用之前的metrics_summary.json和episodes_detail.csv（按内容寻址存放，
+切换回旧模型时同样命中）。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# 不影响评测结果的环境配置项
+_ENV_KEYS_IGNORED = ('headless', 'render_mode', 'profiling', 'lean_info')
+
+# 评测结果依赖的代码：环境和指标包下的全部模块（新增模块自动计入），以及评测前设置随机种子的代码；
+# 策略相关文件由调用方追加
+_CODE_PACKAGES = ('src/env', 'src/metrics')
+_CODE_FILES = ('src/utils/seed_utils.py',)
+
+_PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+_hash_memo: Dict[Path, tuple] = {}
+
+
+def file_sha256(path) -> str:
+    """文件内容的SHA-256（按路径、修改时间和大小缓存，大模型文件只读一次）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        十六进制哈希
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    memo = _hash_memo.get(path)
+    if memo is not None and memo[:2] == (stat.st_mtime_ns, stat.st_size):
+        return memo[2]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    _hash_memo[path] = (stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def evaluation_code_files() -> List[str]:
+    """所有评测单元共同依赖的代码文件（相对项目根目录）"""
+    files = [path.relative_to(_PROJECT_ROOT).as_posix()
+             for package in _CODE_PACKAGES for path in sorted((_PROJECT_ROOT / package).glob('*.py'))]
+    return files + list(_CODE_FILES)
+
+
+def cell_cache_key(policy_type: str, env_config: Dict[str, Any], eval_config: Dict[str, Any],
+                   density: str, seed: int, n_episodes: int, model_file: Optional[str] = None,
+                   code_files: Iterable[str] = ()) -> str:
+    """计算评测单元的缓存键
+
+    Args:
+        policy_type: 策略类型（如 baseline / rl / rl_safety）
+        env_config: 环境配置
+        eval_config: 评测配置
+        density: 交通密度
+        seed: 随机种子
+        n_episodes: 评测轮数
+        model_file: 模型文件（可选，取其内容哈希）
+        code_files: 额外的代码文件（相对项目根目录，取其内容哈希）
+
+    Returns:
+        十六进制缓存键
+    """
+    env_part = {k: v for k, v in env_config.items() if k not in _ENV_KEYS_IGNORED}
+    env_part['traffic_density'] = density
+    code = {name: file_sha256(_PROJECT_ROOT / name) for name in (*evaluation_code_files(), *code_files)}
+
+    content = {
+        'policy_type': policy_type,
+        'model': file_sha256(model_file) if model_file is not None else None,
+        'env_config': env_part,
+        'deterministic': eval_config.get('deterministic', True),
+        'adaptive': eval_config.get('adaptive') if eval_config.get('adaptive', {}).get('enabled') else None,
+        'density': density,
+        'seed': seed,
+        'n_episodes': n_episodes,
+        'code': code,
+    }
+    encoded = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class EvalResultCache:
+    """按缓存键存放评测单元结果的目录
+
+    布局：{cache_dir}/{key[:2]}/{key}/ 下保存 metrics_summary.json、episodes_detail.csv
+    以及 extra.json（如Safety Shield统计）。
+    """
+
+    RESULT_FILES = ('metrics_summary.json', 'episodes_detail.csv')
+
+    def __init__(self, cache_dir):
+        """初始化
+
+        Args:
+            cache_dir: 缓存目录
+        """
+        self.cache_dir = Path(cache_dir)
+
+    def _entry(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def restore(self, key: str, output_dir, prefix: str, episodes: bool = True) -> Optional[Dict[str, Any]]:
+        """命中时把缓存结果复制到输出目录（与save_results相同的文件名）
+
+        Args:
+            key: 缓存键
+            output_dir: 结果目录
+            prefix: 文件名前缀
+            episodes: 是否需要episodes_detail.csv（需要但缓存中没有时视为未命中）
+
+        Returns:
+            {'metrics': 汇总指标, 'extra': 附加信息}，未命中时返回None
+        """
+        entry = self._entry(key)
+        if not (entry / 'metrics_summary.json').exists():
+            return None
+        if episodes and not (entry / 'episodes_detail.csv').exists():
+            return None
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for name in self.RESULT_FILES:
+            if (entry / name).exists():
+                _atomic_copy(entry / name, output_dir / f"{prefix}{name}")
+            else:
+                # 未保存episode明细的评测：删除之前运行留下的明细
+                (output_dir / f"{prefix}{name}").unlink(missing_ok=True)
+
+        with open(entry / 'metrics_summary.json', 'r', encoding='utf-8') as f:
+            metrics = json.load(f)
+        extra = None
+        if (entry / 'extra.json').exists():
+            with open(entry / 'extra.json', 'r', encoding='utf-8') as f:
+                extra = json.load(f)
+        return {'metrics': metrics, 'extra': extra}
+
+    def store(self, key: str, output_dir, prefix: str, extra: Any = None):
+        """把save_results写出的结果存入缓存
+
+        Args:
+            key: 缓存键
+            output_dir: 结果目录
+            prefix: 文件名前缀
+            extra: 附加信息（可JSON序列化）
+        """
+        entry = self._entry(key)
+        entry.mkdir(parents=True, exist_ok=True)
+        if extra is not None:
+            with open(entry / 'extra.json', 'w', encoding='utf-8') as f:
+                json.dump(extra, f, indent=2, ensure_ascii=False)
+        # 结果文件最后写入，汇总指标在最后：restore只在汇总指标存在时命中
+        # （episodes_detail.csv可能不存在，如save_episodes关闭时）
+        for name in reversed(self.RESULT_FILES):
+            source = Path(output_dir) / f"{prefix}{name}"
+            if source.exists():
+                _atomic_copy(source, entry / name)
+
+
+def _atomic_copy(src: Path, dst: Path):
+    """复制到临时文件后重命名"""
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def print_cache_report(cache_status: Dict[str, bool]):
+    """打印缓存命中情况
+
+    Args:
+        cache_status: {单元名: 是否命中}
+    """
+    hits = [key for key, hit in cache_status.items() if hit]
+    misses = [key for key, hit in cache_status.items() if not hit]
+    print(f"\n评测缓存: 命中 {len(hits)} / 未命中 {len(misses)}")
+    if hits:
+        print(f"  命中:   {', '.join(hits)}")
+    if misses:
+        print(f"  未命中: {', '.join(misses)}")
@@ -3,19 +3,74 @@
 计算和统计各类评测指标
 """
 
+import copy
+import csv
+import os
+import shutil
+from contextlib import contextmanager
+
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Any, Tuple
 from pathlib import Path
 import json
 
+from gymnasium.vector import AutoresetMode
+
+from ..env.overtaking_env import REWARD_COMPONENTS
+from .streaming import QuantileSketch, RunningStats, wilson_interval
+
+
+@contextmanager
+def _atomic_open(path: Path, mode: str = 'w', **kwargs):
+    """原子写文件：写入同目录下的临时文件，成功后用os.replace替换目标文件"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
 
 class MetricsEvaluator:
-    """指标评估器"""
+    """指标评估器
+
+    流式聚合：每个episode只更新计数器、Welford均值/方差和分位数草图，
+    compute_metrics为O(1)，内存与episode数无关；多个评估器（如并行worker）可以merge。
+    原始episode记录默认不保存；需要episodes_detail.csv时逐行写入磁盘（spill_file），
+    需要在内存中使用记录时（如配对比较）打开store_episodes。
+    """
+
+    def __init__(self, store_episodes: bool = False, spill_file: str = None):
+        """初始化评估器
 
-    def __init__(self):
-        """初始化评估器"""
+        Args:
+            store_episodes: 是否在内存中保存每个episode的记录
+            spill_file: 逐行追加episode记录的CSV文件（可选）
+        """
+        self.store_episodes = store_episodes
         self.episodes = []
+        self.spill_file = Path(spill_file) if spill_file is not None else None
+        self._spill_handle = None
+        self._spill_writer = None
+
+        self.n_episodes = 0
+        self.n_success = 0
+        self.n_collision = 0
+        self.n_violation = 0
+        self.rewards = RunningStats()
+        self.speeds = RunningStats()
+        self.lengths = RunningStats()
+        self.violations = RunningStats()
+        self.success_times = RunningStats()
+        self.reward_sketch = QuantileSketch()
+        self.length_sketch = QuantileSketch()
+
+        # 附加到汇总指标中的信息（如自适应评测的停止状态）
+        self.info: Dict[str, float] = {}
 
     def add_episode(self, episode_data: Dict[str, Any]):
         """添加一个episode的数据
@@ -23,60 +78,146 @@ class MetricsEvaluator:
         Args:
             episode_data: episode数据字典
         """
-        self.episodes.append(episode_data)
+        self.n_episodes += 1
+        self.n_success += bool(episode_data['overtaking_complete'])
+        self.n_collision += bool(episode_data['collision_occurred'])
+        self.n_violation += episode_data['total_violations'] > 0
+        self.rewards.add(episode_data['total_reward'])
+        self.speeds.add(episode_data['avg_speed'])
+        self.lengths.add(episode_data['episode_length'])
+        self.violations.add(episode_data['total_violations'])
+        if episode_data['overtaking_complete']:
+            self.success_times.add(episode_data['episode_length'])
+        self.reward_sketch.add(episode_data['total_reward'])
+        self.length_sketch.add(episode_data['episode_length'])
+
+        if self.store_episodes:
+            self.episodes.append(episode_data)
+        if self.spill_file is not None:
+            self._spill(episode_data)
+
+    def _spill(self, episode_data: Dict[str, Any]):
+        """把一条episode记录追加到spill_file"""
+        if self._spill_writer is None:
+            self.spill_file.parent.mkdir(parents=True, exist_ok=True)
+            self._spill_handle = open(self.spill_file, 'w', newline='', encoding='utf-8-sig')
+            self._spill_writer = csv.DictWriter(self._spill_handle, fieldnames=list(episode_data.keys()))
+            self._spill_writer.writeheader()
+        self._spill_writer.writerow(episode_data)
+
+    def close(self):
+        """关闭spill_file"""
+        if self._spill_handle is not None:
+            self._spill_handle.close()
+            self._spill_handle = None
+            self._spill_writer = None
+
+    def __getstate__(self):
+        # 跨进程传递时不包含打开的文件
+        self.close()
+        return self.__dict__.copy()
+
+    def merge(self, other: 'MetricsEvaluator'):
+        """合并另一个评估器的统计（如并行worker的部分结果）
+
+        Args:
+            other: 另一个MetricsEvaluator
+        """
+        self.n_episodes += other.n_episodes
+        self.n_success += other.n_success
+        self.n_collision += other.n_collision
+        self.n_violation += other.n_violation
+        for name in ('rewards', 'speeds', 'lengths', 'violations', 'success_times',
+                     'reward_sketch', 'length_sketch'):
+            getattr(self, name).merge(getattr(other, name))
+        if self.store_episodes:
+            self.episodes.extend(other.episodes)
 
     def compute_metrics(self) -> Dict[str, float]:
         """计算汇总指标
 
         Returns:
-            指标字典
+            指标字典（比率为百分比，*_ci_low/*_ci_high为95%置信区间）
         """
-        if not self.episodes:
+        n = self.n_episodes
+        if n == 0:
             return {}
 
-        # 提取各项数据
-        successes = [ep['overtaking_complete'] for ep in self.episodes]
-        collisions = [ep['collision_occurred'] for ep in self.episodes]
-        violations = [ep['total_violations'] for ep in self.episodes]
-        rewards = [ep['total_reward'] for ep in self.episodes]
-        speeds = [ep['avg_speed'] for ep in self.episodes]
-        lengths = [ep['episode_length'] for ep in self.episodes]
-
         # 计算指标
         metrics = {
-            'success_rate': np.mean(successes) * 100,  # 百分比
-            'collision_rate': np.mean(collisions) * 100,
-            'violation_rate': np.mean([v > 0 for v in violations]) * 100,
-            'avg_violations_per_episode': np.mean(violations),
-            'avg_reward': np.mean(rewards),
-            'avg_speed': np.mean(speeds),
-            'avg_episode_length': np.mean(lengths),
-            'total_episodes': len(self.episodes),
+            'success_rate': self.n_success / n * 100,  # 百分比
+            'collision_rate': self.n_collision / n * 100,
+            'violation_rate': self.n_violation / n * 100,
+            'avg_violations_per_episode': self.violations.mean,
+            'avg_reward': self.rewards.mean,
+            'avg_speed': self.speeds.mean,
+            'avg_episode_length': self.lengths.mean,
+            'total_episodes': n,
         }
 
         # 成功案例的平均时间
-        success_times = [ep['episode_length'] for ep in self.episodes if ep['overtaking_complete']]
-        if success_times:
-            metrics['avg_success_time'] = np.mean(success_times)
-        else:
-            metrics['avg_success_time'] = 0
-
+        metrics['avg_success_time'] = self.success_times.mean if self.success_times.count else 0
+
+        # 置信区间（比率用Wilson区间，平均奖励用正态近似）
+        for name, count in (('success_rate', self.n_success), ('collision_rate', self.n_collision),
+                            ('violation_rate', self.n_violation)):
+            low, high = wilson_interval(count, n)
+            metrics[f'{name}_ci_low'] = low * 100
+            metrics[f'{name}_ci_high'] = high * 100
+        metrics['avg_reward_ci_low'], metrics['avg_reward_ci_high'] = self.rewards.mean_interval()
+        metrics['reward_std'] = self.rewards.std
+
+        # 分位数（相对误差1%）
+        metrics['reward_p05'] = self.reward_sketch.quantile(0.05)
+        metrics['reward_p50'] = self.reward_sketch.quantile(0.5)
+        metrics['reward_p95'] = self.reward_sketch.quantile(0.95)
+        metrics['episode_length_p50'] = self.length_sketch.quantile(0.5)
+        metrics['episode_length_p95'] = self.length_sketch.quantile(0.95)
+
+        metrics.update(self.info)
         return metrics
 
+    def ci_width(self, metric: str) -> float:
+        """指标95%置信区间的宽度
+
+        Args:
+            metric: success_rate / collision_rate / violation_rate（百分点）或 avg_reward
+
+        Returns:
+            区间宽度，无数据时为inf
+        """
+        n = self.n_episodes
+        if n == 0:
+            return float('inf')
+        if metric == 'avg_reward':
+            low, high = self.rewards.mean_interval()
+            return high - low
+        counts = {'success_rate': self.n_success, 'collision_rate': self.n_collision,
+                  'violation_rate': self.n_violation}
+        if metric not in counts:
+            raise ValueError(f"不支持置信区间的指标: {metric}")
+        low, high = wilson_interval(counts[metric], n)
+        return (high - low) * 100
+
     def get_detailed_results(self) -> pd.DataFrame:
         """获取详细结果DataFrame
 
         Returns:
-            包含所有episode详细数据的DataFrame
+            包含所有episode详细数据的DataFrame（未保存记录时从spill_file读取）
         """
+        if not self.store_episodes and self.spill_file is not None and self.spill_file.exists():
+            self.close()
+            return pd.read_csv(self.spill_file, encoding='utf-8-sig')
         return pd.DataFrame(self.episodes)
 
-    def save_results(self, output_dir: str, prefix: str = ""):
+    def save_results(self, output_dir: str, prefix: str = "", store=None, tags: Dict[str, Any] = None):
         """保存评测结果
 
         Args:
             output_dir: 输出目录
             prefix: 文件名前缀
+            store: 汇总结果存储（可选，ResultsStore），同时追加汇总指标和episode明细
+            tags: 追加到store时的标识 {'method', 'density', 'seed', 'run_id'}
         """
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -94,42 +235,137 @@ class MetricsEvaluator:
             else:
                 metrics_serializable[key] = value
 
+        # 先写临时文件再重命名：并行评测时其他进程不会读到写了一半的文件
         metrics_file = output_dir / f"{prefix}metrics_summary.json"
-        with open(metrics_file, 'w', encoding='utf-8') as f:
+        with _atomic_open(metrics_file, 'w', encoding='utf-8') as f:
             json.dump(metrics_serializable, f, indent=2, ensure_ascii=False)
 
         print(f"✓ 保存汇总指标: {metrics_file}")
 
         # 保存详细数据
-        df = self.get_detailed_results()
         csv_file = output_dir / f"{prefix}episodes_detail.csv"
-        df.to_csv(csv_file, index=False, encoding='utf-8-sig')
+        df = None
+        if self.store_episodes:
+            df = self.get_detailed_results()
+            with _atomic_open(csv_file, 'w', encoding='utf-8-sig', newline='') as f:
+                df.to_csv(f, index=False)
+        elif self.spill_file is not None:
+            # 已逐行写入磁盘：直接复制，不读入内存
+            self.close()
+            with _atomic_open(csv_file, 'wb') as f, open(self.spill_file, 'rb') as src:
+                shutil.copyfileobj(src, f)
+        else:
+            print("  未保存episode记录，跳过详细数据")
+            # 删除之前运行留下的明细，避免与本次汇总指标不一致
+            csv_file.unlink(missing_ok=True)
+            csv_file = None
+
+        if csv_file is not None:
+            print(f"✓ 保存详细数据: {csv_file}")
 
-        print(f"✓ 保存详细数据: {csv_file}")
+        # 追加到汇总存储
+        if store is not None:
+            if df is None and csv_file is not None:
+                df = self.get_detailed_results()
+            store.append(metrics_serializable, df, **tags)
 
         return metrics
 
-    def print_summary(self):
-        """打印指标摘要"""
-        metrics = self.compute_metrics()
+    def print_summary(self, metrics: Dict[str, float] = None):
+        """打印指标摘要
+
+        Args:
+            metrics: 已计算的指标（可选，如save_results的返回值）
+        """
+        if metrics is None:
+            metrics = self.compute_metrics()
 
         print("\n" + "=" * 60)
         print("评测结果摘要")
         print("=" * 60)
         print(f"总Episodes数:        {metrics['total_episodes']}")
-        print(f"超车成功率:          {metrics['success_rate']:.2f}%")
-        print(f"碰撞率:              {metrics['collision_rate']:.2f}%")
-        print(f"违规率:              {metrics['violation_rate']:.2f}%")
-        print(f"平均奖励:            {metrics['avg_reward']:.2f}")
+        print(f"超车成功率:          {metrics['success_rate']:.2f}%"
+              f"  [95% CI {metrics['success_rate_ci_low']:.1f}, {metrics['success_rate_ci_high']:.1f}]")
+        print(f"碰撞率:              {metrics['collision_rate']:.2f}%"
+              f"  [95% CI {metrics['collision_rate_ci_low']:.1f}, {metrics['collision_rate_ci_high']:.1f}]")
+        print(f"违规率:              {metrics['violation_rate']:.2f}%"
+              f"  [95% CI {metrics['violation_rate_ci_low']:.1f}, {metrics['violation_rate_ci_high']:.1f}]")
+        print(f"平均奖励:            {metrics['avg_reward']:.2f}"
+              f"  [95% CI {metrics['avg_reward_ci_low']:.2f}, {metrics['avg_reward_ci_high']:.2f}]")
         print(f"平均速度:            {metrics['avg_speed']:.2f} km/h")
         print(f"平均Episode长度:     {metrics['avg_episode_length']:.1f} 步")
         if metrics['avg_success_time'] > 0:
             print(f"成功超车平均时间:    {metrics['avg_success_time']:.1f} 步")
+        if 'adaptive_converged' in metrics:
+            status = '已收敛' if metrics['adaptive_converged'] else f"达到预算 {metrics['adaptive_max_episodes']}"
+            widths = ', '.join(f"{key[:-len('_ci_width')]} {value:.1f}" for key, value in metrics.items()
+                               if key.endswith('_ci_width'))
+            print(f"自适应评测:          {status}（CI宽度: {widths}）")
         print("=" * 60 + "\n")
 
 
+class AdaptiveStopping:
+    """自适应评测的停止规则
+
+    所选指标的95%置信区间宽度都不超过目标（且至少min_episodes个episode）时停止，
+    最多运行max_episodes个episode。episode仍使用seed + episode_idx，
+    因此结果是固定轮数评测的前缀，可复现。
+    """
+
+    def __init__(self, metrics=('collision_rate', 'success_rate'), ci_width=10.0,
+                 min_episodes: int = 20, max_episodes: int = 200):
+        """初始化
+
+        Args:
+            metrics: 需要收敛的指标
+            ci_width: 置信区间宽度目标（比率为百分点），可以是单个值或{指标: 宽度}
+            min_episodes: 最少episode数
+            max_episodes: 最多episode数（预算）
+        """
+        self.metrics = list(metrics)
+        if isinstance(ci_width, dict):
+            self.targets = {m: float(ci_width[m]) for m in self.metrics}
+        else:
+            self.targets = {m: float(ci_width) for m in self.metrics}
+        self.min_episodes = min_episodes
+        self.max_episodes = max_episodes
+
+    @classmethod
+    def from_config(cls, eval_config: Dict[str, Any]) -> 'AdaptiveStopping':
+        """从eval_config的adaptive段创建（未启用时返回None）"""
+        adaptive = eval_config.get('adaptive', {})
+        if not adaptive.get('enabled', False):
+            return None
+        return cls(
+            metrics=adaptive.get('metrics', ['collision_rate', 'success_rate']),
+            ci_width=adaptive.get('ci_width', 10.0),
+            min_episodes=adaptive.get('min_episodes', 20),
+            max_episodes=adaptive.get('max_episodes', 200),
+        )
+
+    def converged(self, evaluator: MetricsEvaluator) -> bool:
+        """所有指标的区间宽度是否都已达到目标"""
+        return all(evaluator.ci_width(m) <= self.targets[m] for m in self.metrics)
+
+    def should_stop(self, evaluator: MetricsEvaluator) -> bool:
+        """是否停止评测"""
+        n = evaluator.n_episodes
+        if n >= self.max_episodes:
+            return True
+        return n >= self.min_episodes and self.converged(evaluator)
+
+    def record(self, evaluator: MetricsEvaluator):
+        """把停止状态写入评估器的汇总指标"""
+        evaluator.info['adaptive_converged'] = float(self.converged(evaluator))
+        evaluator.info['adaptive_max_episodes'] = self.max_episodes
+        for m in self.metrics:
+            evaluator.info[f'{m}_ci_width'] = evaluator.ci_width(m)
+            evaluator.info[f'{m}_ci_target'] = self.targets[m]
+
+
 def evaluate_policy(env, policy, n_episodes: int = 10, deterministic: bool = True,
-                   render: bool = False, seed: int = None) -> Tuple[MetricsEvaluator, List[Dict]]:
+                   render: bool = False, seed: int = None, evaluator: MetricsEvaluator = None,
+                   adaptive: AdaptiveStopping = None, recorder=None) -> Tuple[MetricsEvaluator, List[Dict]]:
     """评估策略性能
 
     Args:
@@ -139,15 +375,22 @@ def evaluate_policy(env, policy, n_episodes: int = 10, deterministic: bool = Tru
         deterministic: 是否使用确定性策略
         render: 是否渲染
         seed: 随机种子
+        evaluator: 累加结果的评估器（可选，默认不保存episode记录；需要记录时传入store_episodes=True或spill_file的评估器）
+        adaptive: 自适应停止规则（可选，启用时忽略n_episodes，最多运行adaptive.max_episodes个）
+        recorder: 逐步轨迹记录器（可选，TrajectoryRecorder）
 
     Returns:
-        (evaluator, episodes_data)
+        (evaluator, episodes_data)，评估器不保存记录时episodes_data为空
     """
-    evaluator = MetricsEvaluator()
+    if evaluator is None:
+        evaluator = MetricsEvaluator()
     episodes_data = []
+    if adaptive is not None:
+        n_episodes = adaptive.max_episodes
 
     for episode_idx in range(n_episodes):
         # 设置种子（如果提供）
+        episode_seed = None
         if seed is not None:
             episode_seed = seed + episode_idx
             obs, info = env.reset(seed=episode_seed)
@@ -170,14 +413,26 @@ def evaluate_policy(env, policy, n_episodes: int = 10, deterministic: bool = Tru
 
         done = False
         truncated = False
+        if recorder is not None:
+            recorder.begin_episode(0)
 
         while not (done or truncated):
             # 预测动作
             action, _ = policy.predict(obs, deterministic=deterministic)
 
             # 执行动作
+            step_obs = obs
             obs, reward, done, truncated, info = env.step(action)
 
+            # 记录轨迹（动作前的观测）
+            if recorder is not None:
+                components = info.get('reward_components')
+                recorder.record_step(
+                    0, step_obs, action, getattr(policy, 'last_policy_action', None), reward,
+                    list(components.values()) if components is not None else None,
+                    info.get('violation', False), info.get('crashed', False),
+                )
+
             # 记录数据
             episode_data['total_reward'] += reward
             episode_data['episode_length'] += 1
@@ -199,15 +454,220 @@ def evaluate_policy(env, policy, n_episodes: int = 10, deterministic: bool = Tru
         episode_data['overtaking_complete'] = info.get('overtaking_complete', False)
         episode_data['avg_speed'] = np.mean(episode_data['speeds']) if episode_data['speeds'] else 0
 
-        # 移除speeds列表（太大）
+        # 移除speeds列表（太大；逐步数据由recorder记录）
         del episode_data['speeds']
 
+        if recorder is not None:
+            recorder.end_episode(0, episode_idx, episode_seed, episode_data['total_reward'],
+                                 episode_data['collision_occurred'], episode_data['overtaking_complete'])
+
         # 添加到评估器
         evaluator.add_episode(episode_data)
-        episodes_data.append(episode_data)
+        if evaluator.store_episodes:
+            episodes_data.append(episode_data)
 
         # 打印进度
         if (episode_idx + 1) % 10 == 0:
             print(f"  评测进度: {episode_idx + 1}/{n_episodes}")
 
+        if adaptive is not None and adaptive.should_stop(evaluator):
+            break
+
+    if adaptive is not None:
+        adaptive.record(evaluator)
+
+    return evaluator, episodes_data
+
+
+def _supports_batch(policy) -> bool:
+    """策略能否一次处理一批观测（SB3模型，或声明了batched = True的策略）"""
+    batched = getattr(policy, 'batched', None)
+    if batched is not None:
+        return bool(batched)
+    return type(policy).__module__.startswith('stable_baselines3')
+
+
+def _vector_info(infos: Dict[str, Any], key: str, i: int, default=None):
+    """从gymnasium VectorEnv的批量info中取子环境i的值"""
+    if key not in infos:
+        return default
+    mask = infos.get('_' + key)
+    if mask is not None and not mask[i]:
+        return default
+    return infos[key][i]
+
+
+def _vector_reward_components(infos: Dict[str, Any], i: int):
+    """子环境i的奖励分量（按REWARD_COMPONENTS顺序，info中没有时返回None）"""
+    components = infos.get('reward_components')
+    if components is None:
+        return None
+    mask = infos.get('_reward_components')
+    if mask is not None and not mask[i]:
+        return None
+    return [components[name][i] for name in REWARD_COMPONENTS]
+
+
+def evaluate_policy_vectorized(venv, policy, n_episodes: int = 10, deterministic: bool = True,
+                               seed: int = None, evaluator: MetricsEvaluator = None,
+                               adaptive: AdaptiveStopping = None, recorder=None) -> Tuple[MetricsEvaluator, List[Dict]]:
+    """在VectorEnv中并发运行多个episode评估策略
+
+    每个子环境（槽位）依次领取episode编号，第episode_idx个episode使用seed + episode_idx重置，
+    因此每个episode的记录与evaluate_policy逐个运行时相同（同一仿真后端下）。
+    每一步对所有槽位的观测只调用一次predict；不支持批量输入的策略按槽位各复制一份，
+    保证每个episode的策略状态（如换道冷却）互不影响；批量策略有reset_envs(indices)时，
+    槽位开始新episode时只重置该槽位的状态。
+
+    Args:
+        venv: gymnasium VectorEnv（create_vector_overtaking_env创建；SAME_STEP或DISABLED自动重置，
+            reset支持options['reset_mask']）
+        policy: 策略（可以是SB3模型或自定义策略）
+        n_episodes: 评测轮数
+        deterministic: 是否使用确定性策略
+        seed: 随机种子
+        evaluator: 累加结果的评估器（可选，默认不保存episode记录；需要记录时传入store_episodes=True或spill_file的评估器）
+        adaptive: 自适应停止规则（可选）。按episode编号顺序判断是否停止，停止后丢弃仍在运行的episode，
+            结果与evaluate_policy的自适应评测相同
+        recorder: 逐步轨迹记录器（可选，TrajectoryRecorder，每个槽位一个缓冲；
+            提前停止时丢弃仍在运行的episode，已结束但超出停止点的episode仍会保留在轨迹中）
+
+    Returns:
+        (evaluator, episodes_data)，episodes_data按episode编号排序（评估器不保存记录时为空）
+    """
+    if adaptive is not None:
+        n_episodes = adaptive.max_episodes
+
+    num_envs = venv.num_envs
+    batched = _supports_batch(policy)
+    slot_policies = None if batched else [copy.deepcopy(policy) for _ in range(num_envs)]
+    autoreset_disabled = venv.metadata.get('autoreset_mode') == AutoresetMode.DISABLED
+
+    slot_episode = np.full(num_envs, -1, dtype=np.int64)  # -1：槽位空闲
+    slot_data: List[Dict[str, Any]] = [None] * num_envs
+    slot_speeds: List[List[float]] = [None] * num_envs
+    if evaluator is None:
+        evaluator = MetricsEvaluator()
+    episodes_data: List[Dict[str, Any]] = []
+    # 按episode编号顺序加入评估器（乱序完成的episode暂存，最多num_envs个）
+    pending: Dict[int, Dict[str, Any]] = {}
+    next_episode = 0
+
+    def assign(mask: np.ndarray) -> List:
+        """给掩码中的槽位分配下一个episode，返回各槽位的reset种子"""
+        nonlocal next_episode
+        seeds = [None] * num_envs
+        for i in np.flatnonzero(mask):
+            if next_episode >= n_episodes:
+                slot_episode[i] = -1
+                continue
+            slot_episode[i] = next_episode
+            if seed is not None:
+                seeds[i] = seed + next_episode
+            slot_data[i] = {
+                'episode': next_episode,
+                'total_reward': 0,
+                'episode_length': 0,
+                'collision_occurred': False,
+                'overtaking_complete': False,
+                'total_violations': 0,
+            }
+            slot_speeds[i] = []
+            if recorder is not None:
+                recorder.begin_episode(i)
+            if slot_policies is not None and hasattr(slot_policies[i], 'reset'):
+                slot_policies[i].reset()
+            elif batched and hasattr(policy, 'reset_envs'):
+                # 批量策略的每环境状态（如BatchedRuleBasedPolicy的换道冷却）按槽位重置
+                policy.reset_envs([i])
+            next_episode += 1
+        return seeds
+
+    if batched and hasattr(policy, 'reset'):
+        policy.reset()
+
+    obs, _ = venv.reset(seed=assign(np.ones(num_envs, dtype=bool)))
+    n_finished = 0   # 已按顺序加入评估器的episode数
+    n_completed = 0  # 已结束的episode数
+    stopped = False
+
+    while n_finished < n_episodes and not stopped:
+        # 预测动作（空闲槽位的动作会被忽略）
+        if batched:
+            actions, _ = policy.predict(obs, deterministic=deterministic)
+        else:
+            actions = np.zeros(num_envs, dtype=np.int64)
+            for i in np.flatnonzero(slot_episode >= 0):
+                actions[i], _ = slot_policies[i].predict(obs[i], deterministic=deterministic)
+
+        step_obs_batch = obs
+        obs, rewards, terminations, truncations, infos = venv.step(actions)
+        dones = terminations | truncations
+        if recorder is not None:
+            policy_actions = getattr(policy, 'last_policy_action', None) if batched else None
+        final_info = infos.get('final_info', {})
+
+        for i in np.flatnonzero(slot_episode >= 0):
+            # SAME_STEP自动重置时，结束的槽位的最后一步观测/info在final_obs/final_info中
+            step_info = final_info if dones[i] and 'final_info' in infos else infos
+            step_obs = infos['final_obs'][i] if dones[i] and 'final_obs' in infos else obs[i]
+
+            episode_data = slot_data[i]
+            episode_data['total_reward'] += float(rewards[i])
+            episode_data['episode_length'] += 1
+            episode_data['total_violations'] += (1 if _vector_info(step_info, 'violation', i, False) else 0)
+            slot_speeds[i].append(step_obs[0][3])
+
+            if recorder is not None:
+                if batched:
+                    policy_action = policy_actions[i] if policy_actions is not None else None
+                else:
+                    policy_action = getattr(slot_policies[i], 'last_policy_action', None)
+                recorder.record_step(
+                    i, step_obs_batch[i], actions[i], policy_action, rewards[i],
+                    _vector_reward_components(step_info, i),
+                    _vector_info(step_info, 'violation', i, False), _vector_info(step_info, 'crashed', i, False),
+                )
+
+            if dones[i]:
+                episode_data['collision_occurred'] = _vector_info(step_info, 'crashed', i, False)
+                episode_data['overtaking_complete'] = _vector_info(step_info, 'overtaking_complete', i, False)
+                episode_data['avg_speed'] = np.mean(slot_speeds[i]) if slot_speeds[i] else 0
+                pending[episode_data['episode']] = episode_data
+                if recorder is not None:
+                    recorder.end_episode(i, episode_data['episode'],
+                                         None if seed is None else seed + episode_data['episode'],
+                                         episode_data['total_reward'], episode_data['collision_occurred'],
+                                         episode_data['overtaking_complete'])
+                n_completed += 1
+                while n_finished in pending and not stopped:
+                    finished_data = pending.pop(n_finished)
+                    evaluator.add_episode(finished_data)
+                    if evaluator.store_episodes:
+                        episodes_data.append(finished_data)
+                    n_finished += 1
+                    stopped = adaptive is not None and adaptive.should_stop(evaluator)
+
+                # 打印进度
+                if n_completed % 10 == 0:
+                    print(f"  评测进度: {n_completed}/{n_episodes}")
+
+        # 结束的槽位领取新episode并按其种子重置（DISABLED模式下所有结束的子环境都需要重置）
+        finished = dones & (slot_episode >= 0)
+        if n_finished < n_episodes and not stopped and dones.any():
+            seeds = assign(finished)
+            reset_mask = finished & (slot_episode >= 0)
+            if autoreset_disabled:
+                reset_mask |= dones
+            if reset_mask.any():
+                obs, _ = venv.reset(seed=seeds, options={'reset_mask': reset_mask})
+
+    if recorder is not None:
+        # 提前停止时丢弃仍在运行的episode已记录的步
+        for i in np.flatnonzero(slot_episode >= 0):
+            recorder.discard_episode(i)
+
+    if adaptive is not None:
+        adaptive.record(evaluator)
+
     return evaluator, episodes_data
@@ -0,0 +1,253 @@
+"""密度×种子评测网格的并行执行
+
+每个(密度, 种子)组合是一个独立的评测单元：单元内使用set_seed(seed)和seed + episode_idx重置，
+结果只取决于单元本身，因此串行和进程池并行得到相同的指标。
+进程池中每个worker只执行一次initializer（加载模型/创建策略），之后复用于分到的所有单元。
+evaluate_cell是各评测入口共用的单元评测流程（缓存、自适应停止、轨迹、汇总存储）。
+"""
+
+import json
+import multiprocessing as mp
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from gymnasium.vector import AutoresetMode
+
+from ..env.overtaking_env import create_overtaking_env, create_vector_overtaking_env
+from ..utils.seed_utils import set_seed
+from .cache import cell_cache_key
+from .evaluator import AdaptiveStopping, MetricsEvaluator, evaluate_policy, evaluate_policy_vectorized
+from .trajectory import TrajectoryRecorder, read_trajectory_metadata
+
+
+def grid_cells(eval_config: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """按配置顺序列出评测单元
+
+    Args:
+        eval_config: 评测配置
+
+    Returns:
+        [(密度, 种子), ...]
+    """
+    scenarios = eval_config['scenarios']
+    return [(density, seed) for density in scenarios['traffic_densities'] for seed in scenarios['seeds']]
+
+
+def run_eval_grid(cells: Sequence[Tuple[str, int]], run_cell: Callable, n_workers: int = 1,
+                  initializer: Callable = None, initargs: Tuple = ()) -> Dict[str, Any]:
+    """执行评测网格
+
+    Args:
+        cells: 评测单元列表 [(密度, 种子), ...]
+        run_cell: 模块级函数 run_cell(density, seed) -> (metrics, extra)，
+            metrics为该单元的汇总指标字典
+        n_workers: 进程数（1表示在当前进程中串行执行）
+        initializer: 每个进程执行一次的初始化函数（串行时在当前进程中执行）
+        initargs: initializer的参数
+
+    Returns:
+        {"{密度}_seed{种子}": (metrics, extra)}，按cells顺序排列
+    """
+    n_cells = len(cells)
+    n_workers = max(1, min(n_workers, n_cells))
+    results = {}
+    start = time.perf_counter()
+
+    def report(done: int, density: str, seed: int, metrics: Dict[str, float]):
+        print(f"[{done}/{n_cells}] {density} / seed {seed} 完成（已用 {time.perf_counter() - start:.1f}s）: "
+              f"成功率 {metrics['success_rate']:.1f}%, 碰撞率 {metrics['collision_rate']:.1f}%")
+
+    if n_workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for i, (density, seed) in enumerate(cells):
+            results[f"{density}_seed{seed}"] = run_cell(density, seed)
+            report(i + 1, density, seed, results[f"{density}_seed{seed}"][0])
+    else:
+        print(f"并行评测: {n_cells} 个单元, {n_workers} 个进程")
+        start_method = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context(start_method),
+                                 initializer=initializer, initargs=initargs) as pool:
+            futures = {pool.submit(run_cell, density, seed): (density, seed) for density, seed in cells}
+            for done, future in enumerate(as_completed(futures), start=1):
+                density, seed = futures[future]
+                results[f"{density}_seed{seed}"] = future.result()
+                report(done, density, seed, results[f"{density}_seed{seed}"][0])
+
+    print(f"评测网格完成: {n_cells} 个单元，总耗时 {time.perf_counter() - start:.1f}s")
+    return {f"{density}_seed{seed}": results[f"{density}_seed{seed}"] for density, seed in cells}
+
+
+class EnvPool:
+    """按(环境配置, 环境数)复用的评测环境
+
+    每个episode都按种子重置，环境可以在不同方法、不同种子的单元之间复用，
+    同一进程内每种配置只创建一次。
+    """
+
+    def __init__(self):
+        """初始化空环境池"""
+        self._envs: Dict[Tuple, Any] = {}
+        self.create_seconds = 0.0
+
+    def get(self, env_config: Dict[str, Any], num_envs: int = 1, asynchronous: bool = False):
+        """取出（必要时创建）环境
+
+        Args:
+            env_config: 环境配置（含traffic_density）
+            num_envs: 环境数（1为单个环境，否则为DISABLED自动重置的向量环境）
+            asynchronous: 向量环境是否每个子环境一个进程
+
+        Returns:
+            环境
+        """
+        key = (json.dumps(env_config, sort_keys=True, default=str), num_envs, asynchronous and num_envs > 1)
+        if key not in self._envs:
+            start = time.perf_counter()
+            if num_envs <= 1:
+                self._envs[key] = create_overtaking_env(env_config)
+            else:
+                self._envs[key] = create_vector_overtaking_env(
+                    env_config, num_envs,
+                    autoreset_mode=AutoresetMode.DISABLED,  # 由评估器按episode种子重置，避免重复reset
+                    asynchronous=asynchronous,
+                )
+            self.create_seconds += time.perf_counter() - start
+        return self._envs[key]
+
+    def close(self):
+        """关闭所有环境"""
+        for env in self._envs.values():
+            env.close()
+        self._envs.clear()
+
+
+def evaluate_cell(policy, method: str, density: str, seed: int, env_config: Dict[str, Any],
+                  eval_config: Dict[str, Any], n_episodes: int, results_dir: str, render: bool = False,
+                  cache=None, force: bool = False, store=None, run_id: str = None,
+                  model_file: str = None, code_files: Sequence[str] = (), shield=None,
+                  env_pool: EnvPool = None) -> Tuple[Dict[str, float], Dict[str, Any]]:
+    """评测一个(方法, 密度, 种子)单元并保存结果
+
+    结果文件为 results_dir/{method}_{density}_seed{seed}_*，与各评测脚本相同。
+
+    Args:
+        policy: 策略
+        method: 方法名（结果文件前缀与缓存键的策略类型）
+        density: 交通密度
+        seed: 随机种子
+        env_config: 环境配置
+        eval_config: 评测配置
+        n_episodes: 评测轮数（启用自适应评测时由adaptive.max_episodes代替）
+        results_dir: 结果目录
+        render: 是否渲染（渲染时逐个运行且不使用环境池）
+        cache: 评测结果缓存（可选，EvalResultCache）
+        force: 忽略缓存
+        store: 汇总结果存储（可选，ResultsStore）
+        run_id: 运行ID
+        model_file: 模型文件（计入缓存键）
+        code_files: 计入缓存键的策略代码文件
+        shield: Safety Shield（可选，单元开始前重置，统计随结果返回并缓存）
+        env_pool: 环境池（可选，不提供时每个单元创建并关闭自己的环境）
+
+    Returns:
+        (metrics, {'cached': 是否命中缓存, 'shield': 该单元的Safety Shield统计或None})
+    """
+    env_config = {**env_config, 'traffic_density': density}
+    n_envs = eval_config.get('n_envs', 1)
+    # 自适应评测：置信区间足够窄时提前停止（未启用时为None，固定运行n_episodes个）
+    adaptive = AdaptiveStopping.from_config(eval_config)
+
+    print(f"\n{'=' * 60}")
+    print(f"评测场景: {density.upper()} 密度, 随机种子: {seed}")
+    print(f"{'=' * 60}\n")
+
+    prefix = f"{method}_{density}_seed{seed}_"
+    tags = {'method': method, 'density': density, 'seed': seed, 'run_id': run_id}
+    save_episodes = eval_config.get('output', {}).get('save_episodes', True)
+    # 逐步轨迹（results_dir/trajectories/{单元}）
+    save_trajectory = eval_config.get('visualization', {}).get('save_trajectory', False)
+    trajectory_dir = Path(results_dir) / 'trajectories' / prefix.rstrip('_')
+
+    # 缓存：模型、配置、代码都未变化时直接复用之前的结果
+    cache_key = None
+    if cache is not None:
+        cache_key = cell_cache_key(method, env_config, eval_config, density, seed, n_episodes,
+                                   model_file=model_file, code_files=code_files)
+        # 需要轨迹时，只有轨迹来自同一缓存键的评测才复用
+        stale_trajectory = save_trajectory and \
+            (read_trajectory_metadata(trajectory_dir) or {}).get('cache_key') != cache_key
+        cached = None if force or stale_trajectory else \
+            cache.restore(cache_key, results_dir, prefix, episodes=save_episodes)
+        if cached is not None:
+            print(f"✓ 使用缓存结果: {prefix}*")
+            if store is not None:
+                store.append_saved(results_dir, prefix, **tags)
+            return cached['metrics'], {'cached': True, 'shield': cached['extra']}
+
+    set_seed(seed)
+    recorder = None
+    if save_trajectory:
+        recorder = TrajectoryRecorder(trajectory_dir, metadata={**tags, 'cache_key': cache_key})
+    if shield is not None:
+        shield.reset()
+
+    own_env = env_pool is None or render
+    num_envs = 1 if render else min(n_envs, adaptive.max_episodes if adaptive is not None else n_episodes)
+    if render:
+        env = create_overtaking_env(env_config, render_mode='human')
+    elif env_pool is not None:
+        env = env_pool.get(env_config, num_envs, eval_config.get('async_envs', False))
+    else:
+        env = EnvPool().get(env_config, num_envs, eval_config.get('async_envs', False))
+
+    # 流式评估：episode记录只逐行写入磁盘（save_episodes关闭时不保存），内存与episode数无关
+    spill_file = None
+    if save_episodes:
+        spill_file = Path(results_dir) / f".{prefix}episodes.spill.csv"
+    evaluator = MetricsEvaluator(spill_file=spill_file)
+
+    if num_envs <= 1:
+        evaluate_policy(
+            env=env,
+            policy=policy,
+            n_episodes=n_episodes,
+            deterministic=True,
+            render=render,
+            seed=seed,
+            evaluator=evaluator,
+            adaptive=adaptive,
+            recorder=recorder,
+        )
+    else:
+        # 向量化评测：同时运行num_envs个episode，每个episode的记录与逐个运行相同
+        evaluate_policy_vectorized(
+            venv=env,
+            policy=policy,
+            n_episodes=n_episodes,
+            deterministic=True,
+            seed=seed,
+            evaluator=evaluator,
+            adaptive=adaptive,
+            recorder=recorder,
+        )
+
+    # 保存结果
+    if recorder is not None:
+        recorder.close()
+        print(f"✓ 保存逐步轨迹: {trajectory_dir}")
+    metrics = evaluator.save_results(results_dir, prefix, store=store, tags=tags)
+    if spill_file is not None:
+        spill_file.unlink(missing_ok=True)
+    shield_stats = shield.get_statistics() if shield is not None else None
+    if cache is not None:
+        cache.store(cache_key, results_dir, prefix, extra=shield_stats)
+
+    # 打印摘要
+    evaluator.print_summary(metrics)
+
+    if own_env:
+        env.close()
+    return metrics, {'cached': False, 'shield': shield_stats}
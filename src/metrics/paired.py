@@ -0,0 +1,80 @@
+"""配对比较统计
+
+各方法在相同场景上运行（公共随机数，见src/env/crn.py）时，逐episode求方法间的差值，
+差值均值的置信区间只包含场景内的差异，不包含场景之间的差异，
+同样的episode数下区间比独立样本窄得多。
+"""
+
+from itertools import combinations
+from typing import Callable, Dict, List, Sequence
+
+import pandas as pd
+
+from .streaming import RunningStats
+
+# 逐episode的指标（比率为0/100，与MetricsEvaluator的百分比一致）
+EPISODE_METRICS: Dict[str, Callable[[Dict], float]] = {
+    'success_rate': lambda e: 100.0 * bool(e['overtaking_complete']),
+    'collision_rate': lambda e: 100.0 * bool(e['collision_occurred']),
+    'violation_rate': lambda e: 100.0 * (e['total_violations'] > 0),
+    'avg_reward': lambda e: float(e['total_reward']),
+    'avg_speed': lambda e: float(e['avg_speed']),
+    'avg_episode_length': lambda e: float(e['episode_length']),
+}
+
+
+def paired_comparison(episodes: Dict[str, List[Dict]], metrics: Sequence[str] = None,
+                      z: float = 1.96) -> pd.DataFrame:
+    """计算方法两两之间的配对差值及置信区间
+
+    Args:
+        episodes: {方法名: episode记录列表}，各方法的第k条记录必须来自同一场景
+        metrics: 比较的指标（默认EPISODE_METRICS全部）
+        z: 正态分位数（1.96对应95%）
+
+    Returns:
+        每个(方法A, 方法B, 指标)一行：均值、差值(B - A)及配对/独立样本置信区间，
+        variance_reduction为独立样本差值方差与配对差值方差之比（达到同样区间宽度时独立评测需要的episode倍数）
+    """
+    methods = list(episodes)
+    n = len(episodes[methods[0]])
+    for method in methods:
+        if len(episodes[method]) != n:
+            raise ValueError(f"配对比较要求各方法的episode数相同: {method} 有 {len(episodes[method])} 个，应为 {n}")
+    metrics = list(metrics or EPISODE_METRICS)
+
+    values = {method: {m: [EPISODE_METRICS[m](e) for e in episodes[method]] for m in metrics}
+              for method in methods}
+
+    rows = []
+    for a, b in combinations(methods, 2):
+        for metric in metrics:
+            stats_a, stats_b, diff = RunningStats(), RunningStats(), RunningStats()
+            for x, y in zip(values[a][metric], values[b][metric]):
+                stats_a.add(x)
+                stats_b.add(y)
+                diff.add(y - x)
+
+            low, high = diff.mean_interval(z)
+            unpaired_half = z * ((stats_a.variance + stats_b.variance) / n) ** 0.5 if n else 0.0
+            if diff.variance > 0:
+                reduction = (stats_a.variance + stats_b.variance) / diff.variance
+            else:
+                reduction = float('inf') if stats_a.variance + stats_b.variance > 0 else 1.0
+
+            rows.append({
+                'method_a': a,
+                'method_b': b,
+                'metric': metric,
+                'n_episodes': n,
+                'mean_a': stats_a.mean,
+                'mean_b': stats_b.mean,
+                'diff': diff.mean,
+                'ci_low': low,
+                'ci_high': high,
+                'unpaired_ci_low': diff.mean - unpaired_half,
+                'unpaired_ci_high': diff.mean + unpaired_half,
+                'variance_reduction': reduction,
+                'significant': low > 0 or high < 0,
+            })
+    return pd.DataFrame(rows)
@@ -0,0 +1,271 @@
+"""评测结果的列式汇总存储
+
+所有评测单元的结果追加到同一个存储中，代替逐个读取的
+{method}_{density}_seed{seed}_metrics_summary.json / *_episodes_detail.csv：
+
+    {root}/metrics/method=rl/density=low/{run_id}_seed42.parquet   （每个单元一行汇总指标）
+    {root}/episodes/method=rl/density=low/{run_id}_seed42.parquet  （每个episode一行）
+
+每行带有 method / density / seed / run_id / timestamp 列。按method、density分区，
+过滤读取时只打开匹配的分区；安装pyarrow时整个数据集一次扫描读出（列裁剪+谓词下推），
+否则使用NumPy的.npz列式文件（每列一个数组）。compact()把每个分区的小文件合并为一个。
+"""
+
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.dataset as pa_dataset
+    import pyarrow.parquet as pa_parquet
+except ImportError:  # 可选依赖：没有pyarrow时使用.npz列式文件
+    pa_dataset = None
+
+# 存储表
+TABLES = ('metrics', 'episodes')
+
+# 分区列（目录）与标识一个评测单元的列
+PARTITION_KEYS = ('method', 'density')
+CELL_KEYS = ('method', 'density', 'seed')
+
+# 旧版逐单元结果文件名：{method}_{density}_seed{seed}_metrics_summary.json
+_LEGACY_PATTERN = re.compile(r'^(?P<method>.+)_(?P<density>[^_]+)_seed(?P<seed>\d+)_metrics_summary\.json$')
+
+
+def new_run_id() -> str:
+    """生成一次评测运行的ID（时间 + 进程号）"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+
+class ResultsStore:
+    """分区列式结果存储"""
+
+    def __init__(self, root):
+        """初始化
+
+        Args:
+            root: 存储目录（一般为 results_dir/store）
+        """
+        self.root = Path(root)
+        self.suffix = '.parquet' if pa_dataset is not None else '.npz'
+
+    def _partition(self, table: str, method: str, density: str) -> Path:
+        return self.root / table / f"method={method}" / f"density={density}"
+
+    def append(self, metrics: Dict[str, Any], episodes: Optional[pd.DataFrame], method: str,
+               density: str, seed: int, run_id: str, timestamp: float = None):
+        """追加一个评测单元的结果
+
+        Args:
+            metrics: 汇总指标
+            episodes: episode明细（可选）
+            method: 方法（baseline / rl / rl_safety）
+            density: 交通密度
+            seed: 随机种子
+            run_id: 运行ID（同一次评测的所有单元相同）
+            timestamp: Unix时间戳（默认当前时间）
+        """
+        tags = {'method': method, 'density': density, 'seed': int(seed), 'run_id': run_id,
+                'timestamp': time.time() if timestamp is None else float(timestamp)}
+        name = f"{run_id}_seed{seed}{self.suffix}"
+
+        # 指标统一为浮点（total_episodes为整数），各单元文件的列类型一致
+        row = {key: value if key == 'total_episodes' or not isinstance(value, (int, float)) else float(value)
+               for key, value in metrics.items()}
+        metrics_df = pd.DataFrame([{**tags, **row}])
+        _write_table(metrics_df, self._partition('metrics', method, density) / name)
+        if episodes is not None:
+            episodes_df = episodes.copy()
+            for col, value in reversed(list(tags.items())):
+                episodes_df.insert(0, col, value)
+            _write_table(episodes_df, self._partition('episodes', method, density) / name)
+
+    def append_saved(self, output_dir, prefix: str, method: str, density: str, seed: int,
+                     run_id: str, timestamp: float = None):
+        """追加save_results写出的结果文件（如缓存命中时恢复的文件）
+
+        Args:
+            output_dir: 结果目录
+            prefix: 文件名前缀
+            其余参数同append
+        """
+        output_dir = Path(output_dir)
+        with open(output_dir / f"{prefix}metrics_summary.json", 'r', encoding='utf-8') as f:
+            metrics = json.load(f)
+        csv_file = output_dir / f"{prefix}episodes_detail.csv"
+        episodes = pd.read_csv(csv_file, encoding='utf-8-sig') if csv_file.exists() else None
+        self.append(metrics, episodes, method, density, seed, run_id, timestamp)
+
+    def _files(self, table: str, filters: Dict[str, Any]) -> List[Path]:
+        """列出表文件（按分区过滤条件裁剪目录）"""
+        if table not in TABLES:
+            raise ValueError(f"未知的结果表: {table}（可选: {TABLES}）")
+        files = []
+        for method_dir in sorted((self.root / table).glob('method=*')):
+            if not _matches(method_dir.name.split('=', 1)[1], filters.get('method')):
+                continue
+            for density_dir in sorted(method_dir.glob('density=*')):
+                if not _matches(density_dir.name.split('=', 1)[1], filters.get('density')):
+                    continue
+                files.extend(sorted(p for p in density_dir.iterdir()
+                                    if p.suffix in ('.parquet', '.npz') and not p.name.startswith('.')))
+        return files
+
+    def read(self, table: str = 'metrics', columns: List[str] = None, latest: bool = True,
+             **filters) -> pd.DataFrame:
+        """读取结果
+
+        Args:
+            table: 'metrics' 或 'episodes'
+            columns: 需要的列（默认全部；标识列总是包含）
+            latest: 每个(method, density, seed)只保留最近一次运行的结果
+            **filters: 列过滤条件，值为单个值或列表，如 method='rl', density=['low', 'high']
+
+        Returns:
+            结果DataFrame（无数据时为空）
+        """
+        files = self._files(table, filters)
+        if not files:
+            return pd.DataFrame()
+
+        if columns is not None:
+            columns = list(dict.fromkeys([*CELL_KEYS, 'run_id', 'timestamp', *columns]))
+
+        if pa_dataset is not None and all(p.suffix == '.parquet' for p in files):
+            # 一次扫描所有分区文件（只读取需要的列，非分区条件下推到扫描）
+            schema = pyarrow.unify_schemas([pa_parquet.read_schema(p) for p in files])
+            dataset = pa_dataset.dataset([str(p) for p in files], schema=schema, format='parquet')
+            expression = None
+            for key, value in filters.items():
+                if key in PARTITION_KEYS:
+                    continue
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                condition = pa_dataset.field(key).isin(list(values))
+                expression = condition if expression is None else expression & condition
+            if columns is not None:
+                columns = [c for c in columns if c in dataset.schema.names]
+            df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+        else:
+            df = pd.concat([_read_table(p, columns) for p in files], ignore_index=True)
+            for key, value in filters.items():
+                if key not in PARTITION_KEYS:
+                    values = value if isinstance(value, (list, tuple, set)) else [value]
+                    df = df[df[key].isin(list(values))]
+
+        if latest and not df.empty:
+            newest = df.groupby(list(CELL_KEYS))['timestamp'].transform('max')
+            df = df[df['timestamp'] == newest]
+        return df.reset_index(drop=True)
+
+    def compact(self):
+        """把每个分区的小文件合并为一个（只在没有其他进程写入同一分区时调用）"""
+        for table in TABLES:
+            for method_dir in sorted((self.root / table).glob('method=*')):
+                for density_dir in sorted(method_dir.glob('density=*')):
+                    files = sorted(p for p in density_dir.iterdir()
+                                   if p.suffix in ('.parquet', '.npz') and not p.name.startswith('.'))
+                    if len(files) <= 1:
+                        continue
+                    df = pd.concat([_read_table(p) for p in files], ignore_index=True)
+                    _write_table(df, density_dir / f"compacted-{time.time_ns()}{self.suffix}")
+                    for p in files:
+                        p.unlink()
+
+    def import_legacy(self, results_dir) -> int:
+        """导入逐单元的JSON/CSV结果文件（run_id为'legacy'，时间戳取文件修改时间）
+
+        只导入比存储中该单元最近结果更新的文件：旧版结果、以及未写入存储的评测
+        （如results_store关闭）生成的文件。与存储同时写出的文件早于存储中的记录，不会重复导入。
+
+        Args:
+            results_dir: 结果目录
+
+        Returns:
+            导入的单元数
+        """
+        stored = self.read('metrics', columns=[])
+        newest = {} if stored.empty else \
+            stored.groupby(list(CELL_KEYS))['timestamp'].max().to_dict()
+        n = 0
+        for json_file in sorted(Path(results_dir).glob('*_metrics_summary.json')):
+            match = _LEGACY_PATTERN.match(json_file.name)
+            if match is None:
+                continue
+            mtime = json_file.stat().st_mtime
+            if mtime <= newest.get((match['method'], match['density'], int(match['seed'])), -np.inf):
+                continue
+            prefix = json_file.name[:-len('metrics_summary.json')]
+            self.append_saved(json_file.parent, prefix, match['method'], match['density'],
+                              int(match['seed']), 'legacy', mtime)
+            n += 1
+        if n:
+            self.compact()
+        return n
+
+
+def load_results_table(results_dir, table: str = 'metrics', columns: List[str] = None,
+                       latest: bool = True, **filters) -> pd.DataFrame:
+    """读取结果目录下的汇总存储（results_dir/store）
+
+    读取前先导入比存储更新的逐单元文件（第一次读取时导入全部旧版文件）。
+
+    Args:
+        results_dir: 结果目录
+        table: 'metrics' 或 'episodes'
+        columns: 需要的列
+        latest: 每个(method, density, seed)只保留最近一次运行
+        **filters: 列过滤条件
+
+    Returns:
+        结果DataFrame
+    """
+    store = ResultsStore(Path(results_dir) / 'store')
+    if Path(results_dir).exists():
+        n = store.import_legacy(results_dir)
+        if n:
+            print(f"✓ 导入 {n} 个逐单元结果文件到 {store.root}")
+    return store.read(table, columns=columns, latest=latest, **filters)
+
+
+def _matches(value: str, condition) -> bool:
+    """分区值是否满足过滤条件"""
+    if condition is None:
+        return True
+    values = condition if isinstance(condition, (list, tuple, set)) else [condition]
+    return value in {str(v) for v in values}
+
+
+def _write_table(df: pd.DataFrame, path: Path):
+    """写入一个列式文件（临时文件 + 重命名，读取方不会看到写了一半的文件）"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 数值列统一为64位，合并读取时各文件的类型一致
+    df = df.astype({col: np.float64 if df[col].dtype.kind == 'f' else np.int64
+                    for col in df.columns if df[col].dtype.kind in 'fiu'})
+    tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp{path.suffix}")
+    if path.suffix == '.parquet':
+        df.to_parquet(tmp, index=False)
+    else:
+        columns = {}
+        for col in df.columns:
+            values = df[col].to_numpy()
+            columns[str(col)] = values.astype(str) if values.dtype == object else values
+        with open(tmp, 'wb') as f:
+            np.savez(f, **columns)
+    os.replace(tmp, path)
+
+
+def _read_table(path: Path, columns: List[str] = None) -> pd.DataFrame:
+    """读取一个列式文件（只加载需要的列）"""
+    if path.suffix == '.parquet':
+        df = pd.read_parquet(path)
+        return df if columns is None else df[[c for c in columns if c in df.columns]]
+    with np.load(path, allow_pickle=False) as data:
+        names = data.files if columns is None else [c for c in columns if c in data.files]
+        return pd.DataFrame({name: data[name] for name in names})
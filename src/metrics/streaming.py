@@ -0,0 +1,194 @@
+"""流式统计工具
+
+内存固定、单次更新O(1)、可合并（并行worker的部分结果直接相加）：
+- RunningStats: Welford均值/方差（合并使用Chan等人的并行公式）
+- QuantileSketch: 相对误差有界的对数分桶分位数草图（DDSketch思路，支持正负值）
+- wilson_interval: 比例的Wilson置信区间
+"""
+
+import math
+from typing import Dict, Tuple
+
+
+class RunningStats:
+    """Welford在线均值/方差"""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        """初始化空统计"""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        """记录一个值
+
+        Args:
+            value: 数值
+        """
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'RunningStats'):
+        """合并另一个统计
+
+        Args:
+            other: 另一个RunningStats
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        """样本方差（n-1）"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        """样本标准差"""
+        return math.sqrt(self.variance)
+
+    def mean_interval(self, z: float = 1.96) -> Tuple[float, float]:
+        """均值的正态近似置信区间
+
+        Args:
+            z: 正态分位数（1.96对应95%）
+
+        Returns:
+            (下界, 上界)
+        """
+        if self.count == 0:
+            return 0.0, 0.0
+        half = z * self.std / math.sqrt(self.count)
+        return self.mean - half, self.mean + half
+
+
+class QuantileSketch:
+    """对数分桶的分位数草图
+
+    值x落入桶ceil(log_gamma(|x|))，正负值分开计数，分位数的相对误差不超过relative_accuracy。
+    桶数只与数值的动态范围有关（与样本数无关）。
+    """
+
+    __slots__ = ('relative_accuracy', 'gamma', '_log_gamma', 'positive', 'negative', 'zero_count', 'count')
+
+    # 绝对值小于该值视为0
+    MIN_VALUE = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """初始化
+
+        Args:
+            relative_accuracy: 分位数的相对误差上界
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        """记录一个值
+
+        Args:
+            value: 数值
+        """
+        value = float(value)
+        self.count += 1
+        if abs(value) < self.MIN_VALUE:
+            self.zero_count += 1
+            return
+        store = self.positive if value > 0 else self.negative
+        key = math.ceil(math.log(abs(value)) / self._log_gamma)
+        store[key] = store.get(key, 0) + 1
+
+    def merge(self, other: 'QuantileSketch'):
+        """合并另一个草图（需相同的relative_accuracy）
+
+        Args:
+            other: 另一个QuantileSketch
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("只能合并相同精度的QuantileSketch")
+        for key, c in other.positive.items():
+            self.positive[key] = self.positive.get(key, 0) + c
+        for key, c in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + c
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def _value(self, key: int) -> float:
+        """桶的代表值（使相对误差最小）"""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        """估计分位数
+
+        Args:
+            q: 分位数（0-1）
+
+        Returns:
+            分位数估计，无数据时返回0
+        """
+        if self.count == 0:
+            return 0.0
+
+        rank = q * (self.count - 1)
+        cumulative = 0
+        # 从最小值开始：负值按绝对值从大到小，然后0，再正值从小到大
+        for key in sorted(self.negative, reverse=True):
+            cumulative += self.negative[key]
+            if cumulative > rank:
+                return -self._value(key)
+        cumulative += self.zero_count
+        if cumulative > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            cumulative += self.positive[key]
+            if cumulative > rank:
+                return self._value(key)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+
+def wilson_interval(successes: int, n: int, z: float = 1.96) -> Tuple[float, float]:
+    """比例的Wilson置信区间
+
+    Args:
+        successes: 成功次数
+        n: 总次数
+        z: 正态分位数（1.96对应95%）
+
+    Returns:
+        (下界, 上界)，取值0-1
+    """
+    if n == 0:
+        return 0.0, 0.0
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
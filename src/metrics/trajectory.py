@@ -0,0 +1,333 @@
+"""逐步轨迹记录（内存映射的二进制列文件）
+
+每一步记录自车与邻车运动学（完整观测矩阵）、执行动作、策略原始动作（Safety Shield修正前）、
+奖励及奖励分量、违规和碰撞标志。目录布局：
+
+    {path}/meta.json               字段定义、已写入行数
+    {path}/steps/{field}.bin       每步一行，按chunk_steps行整块预分配的np.memmap
+    {path}/episodes/{field}.bin    episode索引：episode编号、起始行、长度、种子、结果
+
+每个episode先写入该槽位的内存缓冲（每步只是几次数组赋值），结束时整段追加到memmap，
+因此向量化评测中交错运行的episode在文件中仍是连续的。TrajectoryReader按索引只映射
+所需的行，读取单个episode不需要加载整个文件。
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..env.overtaking_env import REWARD_COMPONENTS
+
+FORMAT_VERSION = 1
+
+# episode索引字段
+EPISODE_FIELDS = {
+    'episode': ('int64', ()),
+    'start': ('int64', ()),
+    'length': ('int32', ()),
+    'seed': ('int64', ()),
+    'total_reward': ('float32', ()),
+    'collision': ('bool', ()),
+    'success': ('bool', ()),
+}
+
+
+def step_fields(obs_shape: Tuple[int, ...]) -> Dict[str, Tuple[str, Tuple[int, ...]]]:
+    """每步记录的字段 {名称: (dtype, 每行形状)}
+
+    Args:
+        obs_shape: 观测形状（kinematics观测为(车辆数, 特征数)，第0行为自车）
+    """
+    return {
+        'episode': ('int32', ()),
+        'step': ('int32', ()),
+        'obs': ('float32', tuple(obs_shape)),
+        'action': ('int16', ()),
+        'policy_action': ('int16', ()),
+        'shield_corrected': ('bool', ()),
+        'reward': ('float32', ()),
+        'reward_components': ('float32', (len(REWARD_COMPONENTS),)),
+        'violation': ('bool', ()),
+        'crashed': ('bool', ()),
+    }
+
+
+class _MemmapColumns:
+    """一组按行追加的memmap列文件，容量按chunk_rows整块增长"""
+
+    def __init__(self, directory: Path, fields: Dict[str, Tuple[str, Tuple[int, ...]]],
+                 chunk_rows: int):
+        self.directory = directory
+        self.fields = fields
+        self.chunk_rows = chunk_rows
+        self.n_rows = 0
+        self.capacity = 0
+        self.arrays: Dict[str, np.memmap] = {}
+        directory.mkdir(parents=True, exist_ok=True)
+        self._grow(chunk_rows)
+
+    def _grow(self, min_capacity: int):
+        """把所有列文件扩展到至少min_capacity行（按chunk_rows取整）"""
+        capacity = -(-min_capacity // self.chunk_rows) * self.chunk_rows
+        for name, (dtype, shape) in self.fields.items():
+            if name in self.arrays:
+                self.arrays[name].flush()
+                del self.arrays[name]
+            path = self.directory / f"{name}.bin"
+            row_bytes = np.dtype(dtype).itemsize * int(np.prod(shape, dtype=np.int64))
+            with open(path, 'ab') as f:
+                f.truncate(capacity * row_bytes)
+            self.arrays[name] = np.memmap(path, dtype=dtype, mode='r+', shape=(capacity, *shape))
+        self.capacity = capacity
+
+    def append(self, columns: Dict[str, np.ndarray], n: int) -> int:
+        """追加n行，返回起始行号"""
+        start = self.n_rows
+        if start + n > self.capacity:
+            self._grow(start + n)
+        for name, values in columns.items():
+            self.arrays[name][start:start + n] = values
+        self.n_rows = start + n
+        return start
+
+    def flush(self):
+        for array in self.arrays.values():
+            array.flush()
+
+    def schema(self) -> Dict[str, Any]:
+        return {
+            'n_rows': self.n_rows,
+            'capacity': self.capacity,
+            'fields': {name: {'dtype': dtype, 'shape': list(shape)} for name, (dtype, shape) in self.fields.items()},
+        }
+
+
+class _EpisodeBuffer:
+    """一个槽位正在运行的episode的内存缓冲"""
+
+    def __init__(self, fields: Dict[str, Tuple[str, Tuple[int, ...]]], capacity: int):
+        self.fields = fields
+        self.arrays = {name: np.zeros((capacity, *shape), dtype=dtype) for name, (dtype, shape) in fields.items()}
+        self.length = 0
+
+    def next_row(self) -> int:
+        """返回下一行的位置（缓冲已满时容量翻倍）"""
+        if self.length == len(self.arrays['step']):
+            self.arrays = {name: np.concatenate([array, np.zeros_like(array)])
+                           for name, array in self.arrays.items()}
+        self.length += 1
+        return self.length - 1
+
+
+class TrajectoryRecorder:
+    """逐步轨迹记录器
+
+    用法（evaluate_policy / evaluate_policy_vectorized 的 recorder 参数）::
+
+        recorder.begin_episode(slot)
+        recorder.record_step(slot, obs, action, policy_action, reward, reward_components, violation, crashed)
+        recorder.end_episode(slot, episode, seed, total_reward, collision, success)
+        recorder.close()
+    """
+
+    def __init__(self, path, chunk_steps: int = 65536, metadata: Dict[str, Any] = None,
+                 flush_every: int = 100):
+        """初始化
+
+        Args:
+            path: 输出目录（已存在时覆盖）
+            chunk_steps: 每步数据文件每次预分配的行数
+            metadata: 写入meta.json的附加信息（如评测配置、缓存键）
+            flush_every: 每多少个episode把数据和meta.json刷新到磁盘
+        """
+        self.path = Path(path)
+        self.chunk_steps = chunk_steps
+        self.metadata = metadata or {}
+        self.flush_every = flush_every
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        for table in ('steps', 'episodes'):
+            for old in (self.path / table).glob('*.bin'):
+                old.unlink()
+        (self.path / 'meta.json').unlink(missing_ok=True)
+
+        self.steps: _MemmapColumns = None  # 第一次记录时按观测形状创建
+        self.episodes = _MemmapColumns(self.path / 'episodes', EPISODE_FIELDS, chunk_rows=1024)
+        self._buffers: Dict[int, _EpisodeBuffer] = {}
+        self._nan_components = np.full(len(REWARD_COMPONENTS), np.nan, dtype=np.float32)
+
+    def begin_episode(self, slot: int = 0):
+        """开始一个episode（丢弃该槽位未结束的记录）"""
+        buffer = self._buffers.get(slot)
+        if buffer is not None:
+            buffer.length = 0
+
+    def record_step(self, slot: int, obs, action, policy_action=None, reward: float = 0.0,
+                    reward_components=None, violation: bool = False, crashed: bool = False):
+        """记录一步
+
+        Args:
+            slot: 槽位（逐个评测时为0，向量化评测时为环境编号）
+            obs: 执行动作前的观测
+            action: 执行的动作
+            policy_action: 策略原始动作（Safety Shield修正前，默认等于action）
+            reward: 奖励
+            reward_components: 奖励分量（按REWARD_COMPONENTS顺序；精简info时为None，记录NaN）
+            violation: 是否违规
+            crashed: 是否碰撞
+        """
+        buffer = self._buffers.get(slot)
+        if buffer is None:
+            buffer = self._buffers[slot] = _EpisodeBuffer(step_fields(np.shape(obs)), capacity=256)
+        row = buffer.next_row()
+        arrays = buffer.arrays
+        action = int(action)
+        policy_action = action if policy_action is None else int(policy_action)
+        arrays['step'][row] = row
+        arrays['obs'][row] = obs
+        arrays['action'][row] = action
+        arrays['policy_action'][row] = policy_action
+        arrays['shield_corrected'][row] = action != policy_action
+        arrays['reward'][row] = reward
+        arrays['reward_components'][row] = self._nan_components if reward_components is None else reward_components
+        arrays['violation'][row] = violation
+        arrays['crashed'][row] = crashed
+
+    def end_episode(self, slot: int, episode: int, seed: int = None, total_reward: float = 0.0,
+                    collision: bool = False, success: bool = False):
+        """结束episode：把缓冲整段追加到文件并写入索引
+
+        Args:
+            slot: 槽位
+            episode: episode编号
+            seed: reset种子（无种子时为-1）
+            total_reward: 总奖励
+            collision: 是否碰撞
+            success: 是否超车成功
+        """
+        buffer = self._buffers.get(slot)
+        length = buffer.length if buffer is not None else 0
+        start = 0
+        if length:
+            if self.steps is None:
+                self.steps = _MemmapColumns(self.path / 'steps', buffer.fields, self.chunk_steps)
+            buffer.arrays['episode'][:length] = episode
+            start = self.steps.append({name: array[:length] for name, array in buffer.arrays.items()}, length)
+            buffer.length = 0
+
+        self.episodes.append({
+            'episode': episode, 'start': start, 'length': length,
+            'seed': -1 if seed is None else seed, 'total_reward': total_reward,
+            'collision': collision, 'success': success,
+        }, 1)
+        if self.episodes.n_rows % self.flush_every == 0:
+            self.flush()
+
+    def discard_episode(self, slot: int):
+        """丢弃槽位中未结束的episode（如自适应评测提前停止）"""
+        self.begin_episode(slot)
+
+    def flush(self):
+        """把数据刷新到磁盘并更新meta.json"""
+        if self.steps is not None:
+            self.steps.flush()
+        self.episodes.flush()
+        meta = {
+            'version': FORMAT_VERSION,
+            'reward_components': list(REWARD_COMPONENTS),
+            'steps': self.steps.schema() if self.steps is not None else None,
+            'episodes': self.episodes.schema(),
+            'metadata': self.metadata,
+        }
+        tmp = self.path / f".meta.json.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(tmp, self.path / 'meta.json')
+
+    def close(self):
+        """丢弃未结束的episode，刷新并释放内存映射"""
+        for slot in self._buffers:
+            self.discard_episode(slot)
+        self.flush()
+        self._buffers.clear()
+
+
+class TrajectoryReader:
+    """读取TrajectoryRecorder写出的轨迹（只映射文件，按需读取）"""
+
+    def __init__(self, path):
+        """初始化
+
+        Args:
+            path: 轨迹目录
+        """
+        self.path = Path(path)
+        with open(self.path / 'meta.json', 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"不支持的轨迹格式版本: {self.meta['version']}")
+
+        self.episodes = self._open('episodes')
+        self.steps = self._open('steps') if self.meta['steps'] is not None else {}
+        self._rows = {int(e): i for i, e in enumerate(self.episodes['episode'])}
+
+    def _open(self, table: str) -> Dict[str, np.ndarray]:
+        """只读映射一个表的已写入行"""
+        schema = self.meta[table]
+        n_rows = schema['n_rows']
+        arrays = {}
+        for name, field in schema['fields'].items():
+            shape = (schema['capacity'], *field['shape'])
+            arrays[name] = np.memmap(self.path / table / f"{name}.bin", dtype=field['dtype'],
+                                     mode='r', shape=shape)[:n_rows]
+        return arrays
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """记录时的附加信息"""
+        return self.meta.get('metadata', {})
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def index(self) -> pd.DataFrame:
+        """episode索引（每个episode一行）"""
+        return pd.DataFrame({name: np.asarray(array) for name, array in self.episodes.items()})
+
+    def episode(self, episode: int) -> Dict[str, np.ndarray]:
+        """读取一个episode的逐步数据
+
+        Args:
+            episode: episode编号
+
+        Returns:
+            {字段名: 数组}（memmap视图，只读取该episode的行）
+        """
+        if episode not in self._rows:
+            raise KeyError(f"轨迹中没有episode {episode}")
+        row = self._rows[episode]
+        start = int(self.episodes['start'][row])
+        length = int(self.episodes['length'][row])
+        return {name: array[start:start + length] for name, array in self.steps.items()}
+
+    def __iter__(self) -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+        """按episode编号顺序遍历 (episode, 数据)"""
+        for episode in sorted(self._rows):
+            yield episode, self.episode(episode)
+
+
+def read_trajectory_metadata(path) -> Dict[str, Any]:
+    """读取轨迹目录记录时的附加信息（目录或meta.json不存在时返回None）
+
+    Args:
+        path: 轨迹目录
+    """
+    meta_file = Path(path) / 'meta.json'
+    if not meta_file.exists():
+        return None
+    with open(meta_file, 'r', encoding='utf-8') as f:
+        return json.load(f).get('metadata', {})
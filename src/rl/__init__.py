@@ -1,7 +1,24 @@
-"""强化学习模块"""
+"""强化学习模块
 
-from .train import train_ppo
-from .evaluate import evaluate_rl
-from .safety_shield import SafetyShield
+子模块按需导入：NumPy推理（numpy_policy）不会因为导入本包而加载torch/SB3。
+"""
 
-__all__ = ['train_ppo', 'evaluate_rl', 'SafetyShield']
+_EXPORTS = {
+    'train_ppo': '.train',
+    'evaluate_rl': '.evaluate',
+    'SafetyShield': '.safety_shield',
+    'NumpyPolicy': '.numpy_policy',
+    'export_policy': '.numpy_policy',
+    'load_policy': '.numpy_policy',
+    'evaluate_paired': '.paired_eval',
+    'MaskedShieldPolicy': '.action_mask',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        import importlib
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,99 @@
+"""Safety Shield动作掩码
+
+SafetyShield.action_mask一次求出一批观测下所有动作是否安全，用于：
+- 训练：ActionMaskWrapper / VecActionMaskWrapper（src/rl/vec_env.py）提供action_masks()，
+  sb3_contrib的MaskablePPO只在安全动作中采样，不再把采样浪费在Shield会否决的转移上
+- 评测：MaskedShieldPolicy在策略logits上做掩码argmax（被屏蔽时选次优的安全动作，而不是统一改为IDLE）
+"""
+
+import gymnasium as gym
+import numpy as np
+
+from .safety_shield import SafetyShield
+
+# MaskablePPO查找的方法名
+ACTION_MASKS_METHOD = 'action_masks'
+
+
+class ActionMaskWrapper(gym.Wrapper):
+    """单个环境的动作掩码包装器（action_masks()返回当前观测下的安全掩码）"""
+
+    def __init__(self, env: gym.Env, shield: SafetyShield):
+        """初始化
+
+        Args:
+            env: 环境
+            shield: Safety Shield
+        """
+        super().__init__(env)
+        self.shield = shield
+        self._obs = None
+
+    def reset(self, **kwargs):
+        obs, info = self.env.reset(**kwargs)
+        self._obs = obs
+        return obs, info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        self._obs = obs
+        return obs, reward, terminated, truncated, info
+
+    def action_masks(self) -> np.ndarray:
+        """当前观测下各动作是否安全 (n_actions,)"""
+        return self.shield.action_mask(self._obs)
+
+
+def policy_logits(model, obs: np.ndarray) -> np.ndarray:
+    """策略的动作logits
+
+    Args:
+        model: NumpyPolicy（及其压缩变体）或SB3的PPO/MaskablePPO模型
+        obs: 单个观测或一批观测
+
+    Returns:
+        logits，形状(n_actions,)或(batch, n_actions)
+    """
+    if hasattr(model, 'logits'):
+        return model.logits(obs)
+
+    import torch
+
+    obs_tensor, vectorized = model.policy.obs_to_tensor(obs)
+    with torch.no_grad():
+        logits = model.policy.get_distribution(obs_tensor).distribution.logits.cpu().numpy()
+    return logits if vectorized else logits[0]
+
+
+class MaskedShieldPolicy:
+    """掩码推理：在Safety Shield允许的动作中选择策略logits最大的动作
+
+    与SafetyShieldWrapper（先选动作再把不安全的改为IDLE）相比，被屏蔽时选择策略次优的安全动作。
+    支持一批观测（evaluate_policy_vectorized）：一次批量计算logits和掩码。
+    """
+
+    batched = True
+
+    def __init__(self, model, shield: SafetyShield, seed: int = None):
+        """初始化
+
+        Args:
+            model: NumpyPolicy或SB3模型
+            shield: Safety Shield（干预统计记录在其中）
+            seed: 非确定性推理时Gumbel采样的随机种子
+        """
+        self.model = model
+        self.shield = shield
+        self.rng = np.random.default_rng(seed)
+        self.last_policy_action = None  # 不加掩码时的动作（轨迹记录用）
+
+    def predict(self, obs, deterministic=True):
+        logits = policy_logits(self.model, obs)
+        if not deterministic:
+            # Gumbel-max：在掩码后的softmax分布中采样
+            logits = logits - np.log(-np.log(self.rng.random(logits.shape)))
+        self.last_policy_action = np.argmax(logits, axis=-1)
+        return self.shield.masked_argmax(logits, obs), None
+
+    def reset(self):
+        pass
@@ -0,0 +1,250 @@
+"""训练期间的进程外评估
+
+训练进程只把策略参数快照放入队列（不等待），独立的评估进程用
+evaluate_policy计算成功率/碰撞率/违规率等指标后把结果送回；训练进程在
+后续步骤中非阻塞地读取结果，记录日志并保存best_model。
+"""
+
+import queue as queue_module
+from pathlib import Path
+from types import SimpleNamespace
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from typing import Any, Callable, Dict, Optional
+
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper
+
+
+def _eval_worker(env_config: Dict[str, Any], policy_fn_wrapper: CloudpickleWrapper,
+                 n_episodes: int, seed: int, task_queue, result_queue, action_mask: bool = False):
+    """评估进程：取快照 -> evaluate_policy -> 回传指标"""
+    from src.env.overtaking_env import create_overtaking_env
+    from src.metrics import evaluate_policy
+    from src.rl.action_mask import MaskedShieldPolicy
+    from src.rl.safety_shield import SafetyShield
+    from src.utils.headless import enable_headless
+
+    enable_headless()
+    torch.set_num_threads(1)
+
+    env = create_overtaking_env({**env_config, 'headless': True, 'lean_info': True})
+    policy = policy_fn_wrapper.var()
+    policy.set_training_mode(False)
+    # 掩码训练时与训练采样一致，只在Safety Shield允许的动作中选择（MaskedShieldPolicy需要model.policy）
+    eval_policy = MaskedShieldPolicy(SimpleNamespace(policy=policy), SafetyShield(env_config)) \
+        if action_mask else policy
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        eval_id, num_timesteps, state_dict = task
+        policy.load_state_dict(state_dict)
+        evaluator, _ = evaluate_policy(env, eval_policy, n_episodes=n_episodes, deterministic=True, seed=seed)
+        metrics = {k: float(v) for k, v in evaluator.compute_metrics().items()}
+        result_queue.put((eval_id, num_timesteps, metrics))
+
+    env.close()
+
+
+class AsyncPolicyEvaluator:
+    """进程外策略评估器
+
+    submit()把当前策略参数的快照交给评估进程；评估进程忙时只保留最新一份
+    待评估快照（旧的直接丢弃），因此训练吞吐与评估频率无关。
+    poll()非阻塞地处理已完成的评估：记录日志，并按平均奖励保存best_model。
+    """
+
+    def __init__(self, model, env_config: Dict[str, Any], n_episodes: int = 10,
+                 best_model_save_path: Optional[str] = None, experiment_logger=None,
+                 seed: int = 0, verbose: int = 1, action_mask: bool = False):
+        """初始化并启动评估进程
+
+        Args:
+            model: 训练中的SB3模型
+            env_config: 评估环境配置
+            n_episodes: 每次评估的episode数
+            best_model_save_path: best_model保存目录（None表示不保存）
+            experiment_logger: ExperimentLogger（可选，指标写入log_metrics）
+            seed: 评估种子（所有快照使用相同场景，结果可比）
+            verbose: 是否打印评估结果
+            action_mask: 是否用Safety Shield动作掩码评估（MaskablePPO训练时开启）
+        """
+        self.model = model
+        self.best_model_save_path = best_model_save_path
+        self.experiment_logger = experiment_logger
+        self.verbose = verbose
+
+        self.best_mean_reward = -np.inf
+        self.last_metrics: Dict[str, float] = {}
+        self.n_submitted = 0
+        self.n_completed = 0
+        self._snapshots: Dict[int, Dict[str, torch.Tensor]] = {}
+
+        policy = model.policy
+        policy_class = type(policy)
+        policy_kwargs = dict(model.policy_kwargs)
+        observation_space, action_space = model.observation_space, model.action_space
+        policy_fn: Callable = lambda: policy_class(observation_space, action_space, lambda _: 0.0, **policy_kwargs)
+
+        start_method = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+        ctx = mp.get_context(start_method)
+        self._tasks = ctx.Queue(maxsize=1)
+        self._results = ctx.Queue()
+        self._process = ctx.Process(
+            target=_eval_worker,
+            args=(env_config, CloudpickleWrapper(policy_fn), n_episodes, seed, self._tasks, self._results,
+                  action_mask),
+            daemon=True,
+        )
+        self._process.start()
+
+    def submit(self, num_timesteps: int):
+        """提交当前策略参数的快照（不阻塞）
+
+        Args:
+            num_timesteps: 当前训练步数
+        """
+        state_dict = {k: v.detach().cpu().clone() for k, v in self.model.policy.state_dict().items()}
+        eval_id = self.n_submitted
+        self.n_submitted += 1
+
+        try:
+            self._tasks.put_nowait((eval_id, num_timesteps, state_dict))
+        except queue_module.Full:
+            # 评估进程还没取走上一份快照：用最新的替换
+            try:
+                stale_id = self._tasks.get_nowait()[0]
+                self._snapshots.pop(stale_id, None)
+            except queue_module.Empty:
+                pass
+            try:
+                self._tasks.put_nowait((eval_id, num_timesteps, state_dict))
+            except queue_module.Full:
+                return
+        self._snapshots[eval_id] = state_dict
+
+    def poll(self, block: bool = False, timeout: float = None) -> int:
+        """处理已完成的评估结果
+
+        Args:
+            block: 是否等待至少一个结果
+            timeout: 等待超时（秒）
+
+        Returns:
+            本次处理的结果数
+        """
+        handled = 0
+        while True:
+            try:
+                if block and handled == 0:
+                    result = self._results.get(timeout=timeout)
+                else:
+                    result = self._results.get_nowait()
+            except queue_module.Empty:
+                return handled
+            self._handle_result(*result)
+            handled += 1
+
+    def _handle_result(self, eval_id: int, num_timesteps: int, metrics: Dict[str, float]):
+        """记录一次评估结果并更新best_model"""
+        self.n_completed += 1
+        self.last_metrics = metrics
+        snapshot = self._snapshots.pop(eval_id, None)
+
+        for key in ('avg_reward', 'success_rate', 'collision_rate', 'violation_rate', 'avg_episode_length'):
+            if key in metrics:
+                self.model.logger.record(f"eval/{key}", metrics[key])
+        self.model.logger.record("eval/timesteps", num_timesteps)
+
+        if self.experiment_logger is not None:
+            self.experiment_logger.log_metrics({f"eval_{k}": v for k, v in metrics.items()}, step=num_timesteps,
+                                               category='eval')
+
+        if self.verbose:
+            print(f"[评估] 步数 {num_timesteps}: 平均奖励 {metrics.get('avg_reward', 0):.2f}, "
+                  f"成功率 {metrics.get('success_rate', 0):.1f}%, 碰撞率 {metrics.get('collision_rate', 0):.1f}%")
+
+        mean_reward = metrics.get('avg_reward', -np.inf)
+        if mean_reward > self.best_mean_reward:
+            self.best_mean_reward = mean_reward
+            if self.best_model_save_path is not None and snapshot is not None:
+                self._save_snapshot(snapshot, Path(self.best_model_save_path) / "best_model")
+                if self.verbose:
+                    print(f"[评估] 新的最佳模型（平均奖励 {mean_reward:.2f}）")
+
+    def _save_snapshot(self, snapshot: Dict[str, torch.Tensor], path: Path):
+        """用快照参数保存模型（保存后恢复当前参数）"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        policy = self.model.policy
+        current = {k: v.detach().clone() for k, v in policy.state_dict().items()}
+        policy.load_state_dict(snapshot)
+        try:
+            self.model.save(path)
+        finally:
+            policy.load_state_dict(current)
+
+    def close(self, wait: bool = True, timeout: float = 600.0):
+        """停止评估进程
+
+        Args:
+            wait: 是否等待已提交的评估完成并处理结果
+            timeout: 等待超时（秒）
+        """
+        if wait:
+            while self._snapshots and self._process.is_alive():
+                if self.poll(block=True, timeout=timeout) == 0:
+                    break
+        self._tasks.put(None)
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
+
+
+class AsyncEvalCallback(BaseCallback):
+    """EvalCallback的非阻塞替代：每eval_freq步提交一次快照，每步非阻塞地读取结果"""
+
+    def __init__(self, env_config: Dict[str, Any], eval_freq: int, n_eval_episodes: int = 10,
+                 best_model_save_path: Optional[str] = None, experiment_logger=None,
+                 seed: int = 0, verbose: int = 1, action_mask: bool = False):
+        """初始化
+
+        Args:
+            env_config: 评估环境配置
+            eval_freq: 评估频率（每个环境的步数，与EvalCallback一致）
+            n_eval_episodes: 每次评估的episode数
+            best_model_save_path: best_model保存目录
+            experiment_logger: ExperimentLogger（可选）
+            seed: 评估种子
+            verbose: 是否打印评估结果
+            action_mask: 是否用Safety Shield动作掩码评估
+        """
+        super().__init__(verbose)
+        self.env_config = env_config
+        self.eval_freq = eval_freq
+        self.n_eval_episodes = n_eval_episodes
+        self.best_model_save_path = best_model_save_path
+        self.experiment_logger = experiment_logger
+        self.seed = seed
+        self.action_mask = action_mask
+        self.evaluator: Optional[AsyncPolicyEvaluator] = None
+
+    def _init_callback(self):
+        self.evaluator = AsyncPolicyEvaluator(
+            self.model, self.env_config, self.n_eval_episodes,
+            self.best_model_save_path, self.experiment_logger, self.seed, self.verbose,
+            action_mask=self.action_mask,
+        )
+
+    def _on_step(self) -> bool:
+        if self.eval_freq > 0 and self.n_calls % self.eval_freq == 0:
+            self.evaluator.submit(self.num_timesteps)
+        self.evaluator.poll()
+        return True
+
+    def _on_training_end(self):
+        if self.evaluator is not None:
+            self.evaluator.close(wait=True)
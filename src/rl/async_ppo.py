@@ -0,0 +1,408 @@
+"""异步actor/learner PPO训练
+
+actor进程持续用（略微过时的）策略副本采集rollout，learner进程同时执行PPO更新：
+- 策略权重通过共享内存中的扁平参数向量广播，用序号锁（seqlock）保证读取完整
+- 行为策略与learner策略之间的偏差用V-trace截断重要性权重修正（IMPALA），
+  PPO裁剪以更新开始时的learner策略为锚点（IMPACT）
+"""
+
+import os
+import time
+from collections import deque
+from pathlib import Path
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+from typing import Any, Callable, Dict, List, Optional
+
+from stable_baselines3.common.logger import configure
+from stable_baselines3.common.utils import obs_as_tensor
+from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper
+
+from src.rl.vec_env import assign_cpus
+
+
+class SharedPolicyWeights:
+    """共享内存中的策略参数（单写多读）
+
+    写入时版本号先变为奇数、写完再变为偶数；读取方在版本号为偶数且
+    读取前后一致时才接受这份参数。
+    """
+
+    def __init__(self, policy: torch.nn.Module, ctx):
+        """初始化
+
+        Args:
+            policy: learner的策略网络
+            ctx: multiprocessing上下文
+        """
+        self.flat = parameters_to_vector(policy.parameters()).detach().cpu().clone().share_memory_()
+        self.version = ctx.RawValue('q', 0)
+
+    def publish(self, policy: torch.nn.Module):
+        """learner写入新参数"""
+        self.version.value += 1
+        self.flat.copy_(parameters_to_vector(policy.parameters()).detach().cpu())
+        self.version.value += 1
+
+    def pull(self, policy: torch.nn.Module, known_version: int) -> int:
+        """actor读取参数（版本未变化时不复制）
+
+        Args:
+            policy: actor的策略副本
+            known_version: actor当前持有的版本
+
+        Returns:
+            读取后持有的版本
+        """
+        while True:
+            before = self.version.value
+            if before == known_version:
+                return known_version
+            if before % 2:
+                time.sleep(0)
+                continue
+            snapshot = self.flat.clone()
+            if self.version.value == before:
+                vector_to_parameters(snapshot, policy.parameters())
+                return before
+
+
+def _actor_loop(actor_id: int, env_fns_wrapper: CloudpickleWrapper, policy_fn_wrapper: CloudpickleWrapper,
+                weights: SharedPolicyWeights, queue, stop_event, rollout_steps: int,
+                gamma: float, cpu: Optional[int]):
+    """actor进程：采集rollout并放入队列"""
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    torch.set_num_threads(1)
+
+    env = DummyVecEnv(env_fns_wrapper.var)
+    policy = policy_fn_wrapper.var()
+    policy.set_training_mode(False)
+    version = weights.pull(policy, -1)
+
+    n_envs = env.num_envs
+    obs = env.reset()
+
+    while not stop_event.is_set():
+        version = weights.pull(policy, version)
+
+        obs_buf = np.zeros((rollout_steps, n_envs) + obs.shape[1:], dtype=np.float32)
+        actions_buf = np.zeros((rollout_steps, n_envs), dtype=np.int64)
+        log_probs_buf = np.zeros((rollout_steps, n_envs), dtype=np.float32)
+        rewards_buf = np.zeros((rollout_steps, n_envs), dtype=np.float32)
+        dones_buf = np.zeros((rollout_steps, n_envs), dtype=np.float32)
+        episodes = []
+
+        for t in range(rollout_steps):
+            with torch.no_grad():
+                actions, _, log_probs = policy(obs_as_tensor(obs, policy.device))
+            actions = actions.cpu().numpy()
+
+            new_obs, rewards, dones, infos = env.step(actions)
+
+            # 时间截断：用行为策略的价值函数自举（与SB3 PPO的处理一致）
+            for i, (done, info) in enumerate(zip(dones, infos)):
+                if done and info.get('TimeLimit.truncated', False):
+                    terminal_obs = obs_as_tensor(info['terminal_observation'][None], policy.device)
+                    with torch.no_grad():
+                        rewards[i] += gamma * policy.predict_values(terminal_obs)[0, 0].item()
+                if 'episode' in info:
+                    episodes.append((info['episode']['r'], info['episode']['l']))
+
+            obs_buf[t] = obs
+            actions_buf[t] = actions
+            log_probs_buf[t] = log_probs.cpu().numpy()
+            rewards_buf[t] = rewards
+            dones_buf[t] = dones
+            obs = new_obs
+
+        batch = {
+            'actor_id': actor_id,
+            'version': version,
+            'obs': obs_buf,
+            'actions': actions_buf,
+            'behaviour_log_probs': log_probs_buf,
+            'rewards': rewards_buf,
+            'dones': dones_buf,
+            'last_obs': obs.astype(np.float32),
+            'episodes': episodes,
+        }
+
+        while not stop_event.is_set():
+            try:
+                queue.put(batch, timeout=0.5)
+                break
+            except Exception:
+                continue
+
+    env.close()
+
+
+def vtrace(behaviour_log_probs: torch.Tensor, target_log_probs: torch.Tensor,
+           rewards: torch.Tensor, dones: torch.Tensor, values: torch.Tensor,
+           bootstrap_value: torch.Tensor, gamma: float, lam: float = 1.0,
+           rho_bar: float = 1.0, c_bar: float = 1.0):
+    """V-trace价值目标与策略梯度优势（IMPALA, Espeholt et al. 2018）
+
+    所有输入形状为 (T, B)，bootstrap_value为 (B,)。
+
+    Returns:
+        (vs, pg_advantages, rhos)
+    """
+    rhos = torch.exp(target_log_probs - behaviour_log_probs)
+    clipped_rhos = torch.clamp(rhos, max=rho_bar)
+    cs = lam * torch.clamp(rhos, max=c_bar)
+    discounts = gamma * (1.0 - dones)
+
+    values_tp1 = torch.cat([values[1:], bootstrap_value[None]], dim=0)
+    deltas = clipped_rhos * (rewards + discounts * values_tp1 - values)
+
+    acc = torch.zeros_like(bootstrap_value)
+    vs_minus_v = torch.zeros_like(values)
+    for t in reversed(range(values.shape[0])):
+        acc = deltas[t] + discounts[t] * cs[t] * acc
+        vs_minus_v[t] = acc
+    vs = vs_minus_v + values
+
+    vs_tp1 = torch.cat([vs[1:], bootstrap_value[None]], dim=0)
+    pg_advantages = clipped_rhos * (rewards + discounts * vs_tp1 - values)
+
+    return vs, pg_advantages, rhos
+
+
+def train_async_ppo(model, env_fns: List[Callable], train_config: Dict[str, Any],
+                    model_dir: Path, log_dir: Path, experiment_logger=None,
+                    policy_evaluator=None):
+    """异步actor/learner PPO训练
+
+    Args:
+        model: 已构建的SB3 PPO模型（learner，使用其策略、优化器和超参数）
+        env_fns: 所有actor环境的创建函数（下标即rank，按顺序分给各actor）
+        train_config: 训练配置（async_ppo段为异步参数）
+        model_dir: 模型保存目录
+        log_dir: 日志目录
+        experiment_logger: ExperimentLogger（可选）
+        policy_evaluator: AsyncPolicyEvaluator（可选，每eval_freq × n_envs步提交一次快照）
+
+    Returns:
+        训练后的模型
+    """
+    async_config = train_config.get('async_ppo', {})
+    ppo_config = train_config['ppo']
+    total_timesteps = train_config['total_timesteps']
+
+    n_actors = min(async_config.get('n_actors', 4), len(env_fns))
+    rollout_steps = async_config.get('rollout_steps', 256)
+    batches_per_update = async_config.get('batches_per_update', n_actors)
+    max_policy_lag = async_config.get('max_policy_lag', 4)
+    rho_bar = async_config.get('rho_bar', 1.0)
+    c_bar = async_config.get('c_bar', 1.0)
+
+    gamma = ppo_config['gamma']
+    lam = ppo_config['gae_lambda']
+    clip_range = ppo_config['clip_range']
+    n_epochs = ppo_config['n_epochs']
+    batch_size = ppo_config['batch_size']
+    ent_coef = ppo_config['ent_coef']
+    vf_coef = ppo_config['vf_coef']
+    max_grad_norm = ppo_config['max_grad_norm']
+    save_freq = train_config.get('save_freq', 0)
+    eval_interval = train_config.get('eval_freq', 0) * len(env_fns)
+
+    policy = model.policy
+    device = policy.device
+    formats = ['stdout', 'tensorboard'] if train_config['output'].get('tensorboard') else ['stdout']
+    sb3_logger = configure(str(log_dir / 'async_ppo'), formats)
+    model.set_logger(sb3_logger)
+
+    # actor进程
+    start_method = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+    ctx = mp.get_context(start_method)
+    weights = SharedPolicyWeights(policy, ctx)
+    queue = ctx.Queue(maxsize=max(n_actors, batches_per_update))
+    stop_event = ctx.Event()
+
+    policy_class = type(policy)
+    policy_kwargs = dict(model.policy_kwargs)
+    observation_space, action_space = model.observation_space, model.action_space
+    policy_fn = lambda: policy_class(observation_space, action_space, lambda _: 0.0, **policy_kwargs)
+
+    actor_env_fns = [env_fns[i::n_actors] for i in range(n_actors)]
+    cpus = assign_cpus(n_actors) if train_config.get('pin_cpus', True) else [None] * n_actors
+    actors = []
+    for actor_id in range(n_actors):
+        process = ctx.Process(
+            target=_actor_loop,
+            args=(actor_id, CloudpickleWrapper(actor_env_fns[actor_id]), CloudpickleWrapper(policy_fn),
+                  weights, queue, stop_event, rollout_steps, gamma, cpus[actor_id]),
+            daemon=True,
+        )
+        process.start()
+        actors.append(process)
+
+    # actor占用的CPU之外留给learner的梯度计算
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) - n_actors))
+
+    print(f"✓ 异步训练: {n_actors} 个actor, 每批 {rollout_steps} 步, 每次更新 {batches_per_update} 批")
+
+    episode_rewards = deque(maxlen=100)
+    episode_lengths = deque(maxlen=100)
+    version = 0
+    n_updates = 0
+    next_save = save_freq
+    next_eval = eval_interval
+    start_time = time.perf_counter()
+
+    try:
+        while model.num_timesteps < total_timesteps:
+            batches = []
+            while len(batches) < batches_per_update:
+                batch = _get_batch(queue, actors)
+                for r, l in batch['episodes']:
+                    episode_rewards.append(r)
+                    episode_lengths.append(l)
+                # 过时太久的批次直接丢弃
+                if version - batch['version'] <= 2 * max_policy_lag:
+                    batches.append(batch)
+
+            stats = _learner_update(
+                policy, batches, gamma, lam, rho_bar, c_bar, clip_range,
+                n_epochs, batch_size, ent_coef, vf_coef, max_grad_norm, device,
+            )
+            weights.publish(policy)
+            version = weights.version.value
+            n_updates += 1
+
+            n_samples = sum(b['actions'].size for b in batches)
+            model.num_timesteps += n_samples
+            elapsed = time.perf_counter() - start_time
+
+            lags = [(version - 2 - b['version']) // 2 for b in batches]
+            if policy_evaluator is not None:
+                if eval_interval and model.num_timesteps >= next_eval:
+                    policy_evaluator.submit(model.num_timesteps)
+                    next_eval += eval_interval
+                policy_evaluator.poll()
+
+            sb3_logger.record('time/fps', int(model.num_timesteps / elapsed))
+            sb3_logger.record('time/total_timesteps', model.num_timesteps)
+            sb3_logger.record('train/n_updates', n_updates)
+            sb3_logger.record('train/policy_lag', float(np.mean(lags)))
+            for key, value in stats.items():
+                sb3_logger.record(f'train/{key}', value)
+            if episode_rewards:
+                sb3_logger.record('rollout/ep_rew_mean', float(np.mean(episode_rewards)))
+                sb3_logger.record('rollout/ep_len_mean', float(np.mean(episode_lengths)))
+            sb3_logger.dump(model.num_timesteps)
+
+            if save_freq and model.num_timesteps >= next_save:
+                model.save(model_dir / f"ppo_highway_{model.num_timesteps}_steps")
+                next_save += save_freq
+
+    finally:
+        stop_event.set()
+        # 清空队列，避免actor阻塞在put上
+        while any(p.is_alive() for p in actors):
+            try:
+                queue.get(timeout=0.1)
+            except Exception:
+                pass
+            for p in actors:
+                p.join(timeout=0.1)
+
+    elapsed = time.perf_counter() - start_time
+    message = f"异步训练: {model.num_timesteps} 步, 用时 {elapsed:.1f} s ({model.num_timesteps / elapsed:.1f} steps/s)"
+    print(f"✓ {message}")
+    if experiment_logger is not None:
+        experiment_logger.log(message)
+
+    return model
+
+
+def _get_batch(queue, actors: List, timeout: float = 1.0) -> Dict[str, Any]:
+    """从队列取一个批次；所有actor都已退出时报错而不是永久阻塞"""
+    while True:
+        try:
+            return queue.get(timeout=timeout)
+        except Exception:
+            if not any(p.is_alive() for p in actors):
+                raise RuntimeError("所有actor进程都已退出")
+
+
+def _learner_update(policy, batches: List[Dict[str, Any]], gamma: float, lam: float,
+                    rho_bar: float, c_bar: float, clip_range: float, n_epochs: int,
+                    batch_size: int, ent_coef: float, vf_coef: float,
+                    max_grad_norm: float, device) -> Dict[str, float]:
+    """用一组actor批次执行一次PPO更新（V-trace目标 + 截断重要性权重）"""
+    obs = np.concatenate([b['obs'] for b in batches], axis=1)                     # (T, B, ...)
+    actions = np.concatenate([b['actions'] for b in batches], axis=1)              # (T, B)
+    behaviour = np.concatenate([b['behaviour_log_probs'] for b in batches], axis=1)
+    rewards = np.concatenate([b['rewards'] for b in batches], axis=1)
+    dones = np.concatenate([b['dones'] for b in batches], axis=1)
+    last_obs = np.concatenate([b['last_obs'] for b in batches], axis=0)            # (B, ...)
+
+    T, B = actions.shape
+    flat_obs = torch.as_tensor(obs.reshape((T * B,) + obs.shape[2:]), device=device)
+    flat_actions = torch.as_tensor(actions.reshape(-1), device=device)
+
+    policy.set_training_mode(False)
+    with torch.no_grad():
+        values, old_log_probs, _ = policy.evaluate_actions(flat_obs, flat_actions)
+        bootstrap = policy.predict_values(torch.as_tensor(last_obs, device=device)).flatten()
+
+        vs, pg_advantages, rhos = vtrace(
+            torch.as_tensor(behaviour, device=device),
+            old_log_probs.reshape(T, B),
+            torch.as_tensor(rewards, device=device),
+            torch.as_tensor(dones, device=device),
+            values.reshape(T, B),
+            bootstrap,
+            gamma, lam, rho_bar, c_bar,
+        )
+
+    returns = vs.reshape(-1)
+    advantages = pg_advantages.reshape(-1)
+    advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
+    old_log_probs = old_log_probs.reshape(-1)
+
+    policy.set_training_mode(True)
+    policy_losses, value_losses, entropy_losses, clip_fractions = [], [], [], []
+    n_samples = T * B
+
+    for _ in range(n_epochs):
+        permutation = torch.randperm(n_samples, device=device)
+        for start in range(0, n_samples, batch_size):
+            idx = permutation[start:start + batch_size]
+
+            new_values, log_prob, entropy = policy.evaluate_actions(flat_obs[idx], flat_actions[idx])
+            ratio = torch.exp(log_prob - old_log_probs[idx])
+            adv = advantages[idx]
+            policy_loss = -torch.min(adv * ratio, adv * torch.clamp(ratio, 1 - clip_range, 1 + clip_range)).mean()
+            value_loss = torch.nn.functional.mse_loss(returns[idx], new_values.flatten())
+            entropy_loss = -torch.mean(entropy) if entropy is not None else -torch.mean(-log_prob)
+
+            loss = policy_loss + ent_coef * entropy_loss + vf_coef * value_loss
+
+            policy.optimizer.zero_grad()
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(policy.parameters(), max_grad_norm)
+            policy.optimizer.step()
+
+            policy_losses.append(policy_loss.item())
+            value_losses.append(value_loss.item())
+            entropy_losses.append(entropy_loss.item())
+            clip_fractions.append(torch.mean((torch.abs(ratio - 1) > clip_range).float()).item())
+
+    policy.set_training_mode(False)
+
+    return {
+        'policy_gradient_loss': float(np.mean(policy_losses)),
+        'value_loss': float(np.mean(value_losses)),
+        'entropy_loss': float(np.mean(entropy_losses)),
+        'clip_fraction': float(np.mean(clip_fractions)),
+        'importance_weight': float(rhos.mean().item()),
+        'importance_weight_clipped': float(torch.mean((rhos > rho_bar).float()).item()),
+    }
@@ -1,34 +1,45 @@
 """RL策略评测脚本"""
 
-import os
 import sys
 from pathlib import Path
 import argparse
+import multiprocessing as mp
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from stable_baselines3 import PPO
 import numpy as np
 
-from src.env.overtaking_env import create_overtaking_env
-from src.metrics import evaluate_policy
+from src.metrics.cache import EvalResultCache, print_cache_report
+from src.metrics.grid import evaluate_cell, grid_cells, run_eval_grid
+from src.metrics.results_store import ResultsStore, new_run_id
 from src.utils.config_loader import load_all_configs
-from src.utils.seed_utils import set_seed
+from src.utils.headless import enable_headless
+from src.rl.numpy_policy import load_policy, resolve_policy_file
 from src.rl.safety_shield import SafetyShield
+from src.rl.action_mask import MaskedShieldPolicy
 
 
 class SafetyShieldWrapper:
     """Safety Shield包装器，用于兼容evaluate_policy接口"""
 
+    # 支持一批观测（evaluate_policy_vectorized）：模型批量推理，Shield逐个检查
+    batched = True
+
     def __init__(self, model, shield: SafetyShield):
         self.model = model
         self.shield = shield
+        self.last_policy_action = None  # 修正前的模型动作（轨迹记录用）
 
     def predict(self, obs, deterministic=True):
         # 获取模型预测
         action, _ = self.model.predict(obs, deterministic=deterministic)
+        self.last_policy_action = action
+
+        if np.ndim(action) == 1:
+            corrected = [self.shield.check_and_correct(o, a)[0] for o, a in zip(obs, action)]
+            return np.asarray(corrected), None
 
         # Safety Shield检查
         corrected_action, was_corrected = self.shield.check_and_correct(obs, action)
@@ -39,20 +50,112 @@ class SafetyShieldWrapper:
         pass
 
 
+# 评测进程内的状态（由_init_worker设置，每个进程只加载一次模型）
+_worker = {}
+
+
+def _init_worker(model_path: str, env_config, eval_config, use_safety_shield: bool,
+                 n_episodes: int, render: bool, results_dir: str, force: bool = False,
+                 run_id: str = None, action_mask: bool = False):
+    """初始化评测进程：加载模型并创建Safety Shield"""
+    if env_config.get('headless', False):
+        enable_headless()
+
+    model = load_policy(model_path)
+    if mp.parent_process() is not None and 'torch' in sys.modules:
+        # 进程池中每个进程只用一个线程，避免多个进程争抢CPU
+        sys.modules['torch'].set_num_threads(1)
+
+    shield = None
+    if action_mask:
+        shield = SafetyShield(env_config)
+        policy = MaskedShieldPolicy(model, shield)
+    elif use_safety_shield:
+        shield = SafetyShield(env_config)
+        policy = SafetyShieldWrapper(model, shield)
+    else:
+        policy = model
+
+    _worker.update(
+        env_config=env_config,
+        eval_config=eval_config,
+        method=rl_method(use_safety_shield, action_mask),
+        n_episodes=n_episodes,
+        render=render,
+        results_dir=results_dir,
+        policy=policy,
+        shield=shield,
+        model_file=str(resolve_policy_file(model_path)),
+        cache=EvalResultCache(Path(results_dir) / '.cache') if eval_config['output'].get('cache', True) else None,
+        force=force,
+        store=ResultsStore(Path(results_dir) / 'store') if eval_config['output'].get('results_store', True) else None,
+        run_id=run_id,
+    )
+
+
+def rl_method(use_safety_shield: bool, action_mask: bool = False) -> str:
+    """方法名（结果文件前缀）：rl / rl_safety（Shield修正动作）/ rl_masked（Shield掩码推理）"""
+    if action_mask:
+        return 'rl_masked'
+    return 'rl_safety' if use_safety_shield else 'rl'
+
+
+def rl_code_files(model_file: str, method: str):
+    """计入缓存键的策略代码文件
+
+    Args:
+        model_file: 实际加载的模型文件（resolve_policy_file的结果）
+        method: rl_method返回的方法名
+    """
+    code_files = []
+    if method != 'rl':
+        code_files.append('src/rl/safety_shield.py')
+    if method == 'rl_masked':
+        code_files.append('src/rl/action_mask.py')
+    if model_file.endswith('.npz'):
+        code_files.append('src/rl/numpy_policy.py')
+    return code_files
+
+
+def _evaluate_cell(density: str, seed: int):
+    """评测一个(密度, 种子)单元并保存结果
+
+    Returns:
+        (metrics, {'cached': 是否命中缓存, 'shield': 该单元的Safety Shield统计或None})
+    """
+    method = _worker['method']
+    return evaluate_cell(
+        _worker['policy'], method, density, seed,
+        _worker['env_config'], _worker['eval_config'], _worker['n_episodes'], _worker['results_dir'],
+        render=_worker['render'], cache=_worker['cache'], force=_worker['force'], store=_worker['store'],
+        run_id=_worker['run_id'], model_file=_worker['model_file'],
+        code_files=rl_code_files(_worker['model_file'], method), shield=_worker['shield'],
+    )
+
+
 def evaluate_rl(model_path: str, config_dir: str = "configs", output_dir: str = "outputs",
-                use_safety_shield: bool = False, n_episodes: int = 50, render: bool = False):
+                use_safety_shield: bool = False, n_episodes: int = 50, render: bool = False,
+                headless: bool = False, n_workers: int = None, force: bool = False,
+                action_mask: bool = False):
     """评测RL策略
 
     Args:
-        model_path: 模型路径
+        model_path: 模型路径（SB3的.zip或export_policy导出的.npz；.zip旁有同名.npz时使用NumPy推理）
         config_dir: 配置文件目录
         output_dir: 输出目录
         use_safety_shield: 是否使用Safety Shield
         n_episodes: 评测轮数
         render: 是否渲染
+        headless: 无界面模式（不创建任何渲染，与render互斥）
+        n_workers: 并行评测的进程数（默认读取eval_config的n_workers；渲染时固定为1）
+        force: 忽略缓存，重新评测所有单元
+        action_mask: 使用Safety Shield掩码推理（只在安全动作中取logits最大的动作，结果前缀rl_masked）
     """
     print("\n" + "=" * 60)
-    print(f"评测RL策略 {'(with Safety Shield)' if use_safety_shield else ''}")
+    if action_mask:
+        print("评测RL策略 (with Safety Shield action mask)")
+    else:
+        print(f"评测RL策略 {'(with Safety Shield)' if use_safety_shield else ''}")
     print("=" * 60 + "\n")
 
     # 加载配置
@@ -60,71 +163,39 @@ def evaluate_rl(model_path: str, config_dir: str = "configs", output_dir: str =
     env_config = configs['env']
     eval_config = configs['eval']
 
-    # 加载模型
-    print(f"加载模型: {model_path}")
-    model = PPO.load(model_path)
-    print("✓ 模型加载完成\n")
+    if headless or env_config.get('headless', False):
+        enable_headless()
+        env_config['headless'] = True
 
-    # 创建Safety Shield（如果需要）
-    shield = None
-    if use_safety_shield:
-        shield = SafetyShield(env_config)
-        policy = SafetyShieldWrapper(model, shield)
-    else:
-        policy = model
+    if n_workers is None:
+        n_workers = eval_config.get('n_workers', 1)
+    if render:
+        n_workers = 1
 
     # 创建结果目录
     results_dir = Path(output_dir) / eval_config['output']['results_dir']
     results_dir.mkdir(parents=True, exist_ok=True)
 
-    # 评测不同密度
-    all_results = {}
-
-    for density in eval_config['scenarios']['traffic_densities']:
-        print(f"\n{'=' * 60}")
-        print(f"评测场景: {density.upper()} 密度")
-        print(f"{'=' * 60}\n")
-
-        env_config['traffic_density'] = density
-
-        # 评测不同随机种子
-        for seed in eval_config['scenarios']['seeds']:
-            print(f"\n随机种子: {seed}")
-            print("-" * 40)
-
-            set_seed(seed)
-
-            # 创建环境
-            env = create_overtaking_env(
-                env_config,
-                render_mode='human' if render else None
-            )
-
-            # 评测
-            evaluator, episodes = evaluate_policy(
-                env=env,
-                policy=policy,
-                n_episodes=n_episodes,
-                deterministic=True,
-                render=render,
-                seed=seed,
-            )
-
-            # 保存结果
-            prefix = f"rl{'_safety' if use_safety_shield else ''}_{density}_seed{seed}_"
-            metrics = evaluator.save_results(str(results_dir), prefix)
-
-            # 打印摘要
-            evaluator.print_summary()
-
-            # 记录结果
-            result_key = f"{density}_seed{seed}"
-            all_results[result_key] = metrics
-
-            env.close()
-
-    # Safety Shield统计
-    if use_safety_shield and shield:
+    # 评测密度×种子网格（每个进程加载一次模型）
+    print(f"加载模型: {model_path}")
+    results = run_eval_grid(
+        grid_cells(eval_config), _evaluate_cell, n_workers,
+        initializer=_init_worker,
+        initargs=(model_path, env_config, eval_config, use_safety_shield, n_episodes, render,
+                  str(results_dir), force or render, new_run_id(), action_mask),
+    )
+    if eval_config['output'].get('results_store', True):
+        # 所有进程写完后合并各分区的小文件
+        ResultsStore(results_dir / 'store').compact()
+    all_results = {key: metrics for key, (metrics, _) in results.items()}
+    if eval_config['output'].get('cache', True):
+        print_cache_report({key: extra['cached'] for key, (_, extra) in results.items()})
+
+    # Safety Shield统计（合并各单元）
+    if use_safety_shield or action_mask:
+        shield = SafetyShield(env_config)
+        for _, extra in results.values():
+            shield.merge_statistics(extra['shield'])
         shield.print_statistics()
 
     print("\n" + "=" * 60)
@@ -136,14 +207,23 @@ def evaluate_rl(model_path: str, config_dir: str = "configs", output_dir: str =
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="评测RL超车策略")
-    parser.add_argument("--model", type=str, required=True, help="模型路径")
+    parser.add_argument("--model", type=str, required=True, help="模型路径（.zip或导出的.npz）")
     parser.add_argument("--config-dir", type=str, default="configs", help="配置文件目录")
     parser.add_argument("--output-dir", type=str, default="outputs", help="输出目录")
     parser.add_argument("--safety-shield", action="store_true", help="使用Safety Shield")
+    parser.add_argument("--action-mask", action="store_true",
+                        help="使用Safety Shield掩码推理（在安全动作中取logits最大的动作）")
     parser.add_argument("--n-episodes", type=int, default=50, help="评测轮数")
     parser.add_argument("--render", action="store_true", help="渲染环境")
+    parser.add_argument("--headless", action="store_true", help="无界面模式（不创建任何渲染）")
+    parser.add_argument("--n-workers", type=int, default=None, help="并行评测进程数（默认读取eval_config）")
+    parser.add_argument("--force", action="store_true", help="忽略缓存，重新评测所有单元")
 
     args = parser.parse_args()
+    if args.render and args.headless:
+        parser.error("--render 与 --headless 不能同时使用")
+    if args.safety_shield and args.action_mask:
+        parser.error("--safety-shield 与 --action-mask 不能同时使用")
 
     evaluate_rl(
         model_path=args.model,
@@ -152,4 +232,8 @@ if __name__ == "__main__":
         use_safety_shield=args.safety_shield,
         n_episodes=args.n_episodes,
         render=args.render,
+        headless=args.headless,
+        n_workers=args.n_workers,
+        force=args.force,
+        action_mask=args.action_mask,
     )
@@ -0,0 +1,366 @@
+"""不依赖torch的PPO策略推理
+
+把SB3保存的PPO模型（ppo_highway_*.zip / best_model.zip）导出为.npz权重文件，
+NumpyPolicy只用NumPy完成前向计算，接口与PPO.predict一致。
+评测/演示只需要动作输出，不需要导入torch和SB3：启动更快，单步推理为微秒级。
+
+导出时会在同一批观测上对比两者的logits和动作，确保结果一致，并在.npz中记录源.zip的内容哈希：
+同名.zip重新训练或被覆盖（如异步评估更新best_model.zip）后，.npz视为过期，自动改用.zip。
+"""
+
+import hashlib
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+
+# 支持的激活函数（SB3 PPO的MlpPolicy默认Tanh）
+ACTIVATIONS = {
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'identity': lambda x: x,
+}
+
+
+class NumpyPolicy:
+    """纯NumPy实现的PPO离散动作策略"""
+
+    # predict可以一次处理一批观测（evaluate_policy_vectorized据此每步只调用一次）
+    batched = True
+
+    def __init__(self, weights, biases, action_weight: np.ndarray, action_bias: np.ndarray,
+                 obs_shape: Tuple[int, ...], activation: str = 'tanh', seed: Optional[int] = None):
+        """初始化
+
+        Args:
+            weights: 隐藏层权重列表，形状(in, out)
+            biases: 隐藏层偏置列表
+            action_weight: 动作头权重，形状(hidden, n_actions)
+            action_bias: 动作头偏置
+            obs_shape: 单个观测的形状
+            activation: 激活函数名（tanh/relu/identity）
+            seed: 随机采样（deterministic=False）使用的种子
+        """
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"不支持的激活函数: {activation}")
+
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.action_weight = np.ascontiguousarray(action_weight, dtype=np.float32)
+        self.action_bias = np.ascontiguousarray(action_bias, dtype=np.float32)
+        self.obs_shape = tuple(int(d) for d in obs_shape)
+        self.obs_dim = int(np.prod(self.obs_shape))
+        self.n_actions = self.action_bias.shape[0]
+        self.activation = activation
+        self._activation_fn = ACTIVATIONS[activation]
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], seed: Optional[int] = None) -> 'NumpyPolicy':
+        """从export_policy导出的.npz文件加载
+
+        Args:
+            path: .npz文件路径
+            seed: 随机采样种子
+
+        Returns:
+            NumpyPolicy
+        """
+        with np.load(path, allow_pickle=False) as data:
+            n_layers = int(data['n_layers'])
+            return cls(
+                weights=[data[f'w{i}'] for i in range(n_layers)],
+                biases=[data[f'b{i}'] for i in range(n_layers)],
+                action_weight=data['w_action'],
+                action_bias=data['b_action'],
+                obs_shape=tuple(data['obs_shape']),
+                activation=str(data['activation']),
+                seed=seed,
+            )
+
+    def save(self, path: Union[str, Path], source_sha256: Optional[str] = None):
+        """保存为.npz文件
+
+        Args:
+            path: 文件路径
+            source_sha256: 导出来源.zip的内容哈希（resolve_policy_file据此判断.npz是否过期）
+        """
+        arrays = {f'w{i}': w for i, w in enumerate(self.weights)}
+        arrays.update({f'b{i}': b for i, b in enumerate(self.biases)})
+        if source_sha256 is not None:
+            arrays['source_sha256'] = np.asarray(source_sha256)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            n_layers=np.int64(len(self.weights)),
+            w_action=self.action_weight,
+            b_action=self.action_bias,
+            obs_shape=np.asarray(self.obs_shape, dtype=np.int64),
+            activation=np.asarray(self.activation),
+            **arrays,
+        )
+
+    def logits(self, obs: np.ndarray) -> np.ndarray:
+        """计算动作logits（动作头的原始输出）
+
+        Args:
+            obs: 单个观测或一批观测
+
+        Returns:
+            logits，形状(n_actions,)或(batch, n_actions)
+        """
+        x = np.asarray(obs, dtype=np.float32)
+        batched = x.ndim > len(self.obs_shape)
+        x = x.reshape(-1, self.obs_dim) if batched else x.reshape(self.obs_dim)
+
+        activation = self._activation_fn
+        for w, b in zip(self.weights, self.biases):
+            x = activation(x @ w + b)
+        return x @ self.action_weight + self.action_bias
+
+    def predict(self, observation: np.ndarray, state: Any = None, episode_start: Any = None,
+                deterministic: bool = False) -> Tuple[np.ndarray, None]:
+        """选择动作（与PPO.predict接口一致）
+
+        Args:
+            observation: 单个观测或一批观测
+            state: 未使用（兼容SB3接口）
+            episode_start: 未使用（兼容SB3接口）
+            deterministic: 是否取概率最大的动作，否则按softmax概率采样
+
+        Returns:
+            (action, None)
+        """
+        logits = self.logits(observation)
+        if deterministic:
+            return np.argmax(logits, axis=-1), None
+
+        # Gumbel-max采样，等价于按softmax(logits)采样
+        gumbel = -np.log(-np.log(self.rng.random(logits.shape)))
+        return np.argmax(logits + gumbel, axis=-1), None
+
+    def reset(self):
+        """兼容策略接口（无状态）"""
+        pass
+
+
+def _torch_policy_to_numpy(model) -> NumpyPolicy:
+    """从SB3 PPO模型中提取权重"""
+    import torch
+
+    policy = model.policy
+    activation_names = {torch.nn.Tanh: 'tanh', torch.nn.ReLU: 'relu', torch.nn.Identity: 'identity'}
+    activation = activation_names.get(policy.activation_fn)
+    if activation is None:
+        raise ValueError(f"不支持的激活函数: {policy.activation_fn}")
+    if not hasattr(model.action_space, 'n'):
+        raise ValueError(f"只支持离散动作空间: {model.action_space}")
+
+    weights, biases = [], []
+    for layer in policy.mlp_extractor.policy_net:
+        if isinstance(layer, torch.nn.Linear):
+            weights.append(layer.weight.detach().cpu().numpy().T)
+            biases.append(layer.bias.detach().cpu().numpy())
+        elif not isinstance(layer, policy.activation_fn):
+            raise ValueError(f"不支持的网络层: {layer}")
+
+    return NumpyPolicy(
+        weights, biases,
+        action_weight=policy.action_net.weight.detach().cpu().numpy().T,
+        action_bias=policy.action_net.bias.detach().cpu().numpy(),
+        obs_shape=model.observation_space.shape,
+        activation=activation,
+    )
+
+
+def _verification_observations(observation_space, n: int, seed: int = 0) -> np.ndarray:
+    """生成校验用观测：有界维度在取值范围内均匀采样，无界维度在[-1, 1]内采样"""
+    rng = np.random.default_rng(seed)
+    low = np.where(np.isfinite(observation_space.low), observation_space.low, -1.0)
+    high = np.where(np.isfinite(observation_space.high), observation_space.high, 1.0)
+    return rng.uniform(low, high, size=(n,) + observation_space.shape).astype(np.float32)
+
+
+def verify_policy(model, numpy_policy: NumpyPolicy, observations: np.ndarray,
+                  atol: float = 1e-4) -> Dict[str, float]:
+    """对比torch策略与NumPy策略的输出
+
+    Args:
+        model: SB3 PPO模型
+        numpy_policy: 导出的NumPy策略
+        observations: 一批观测
+        atol: logits允许的最大绝对误差
+
+    Returns:
+        校验结果（max_logit_error, action_agreement, passed）
+    """
+    import torch
+
+    policy = model.policy
+    with torch.no_grad():
+        obs_tensor = torch.as_tensor(observations, dtype=torch.float32, device=policy.device)
+        features = policy.extract_features(obs_tensor, policy.pi_features_extractor)
+        torch_logits = policy.action_net(policy.mlp_extractor.forward_actor(features)).cpu().numpy()
+    torch_actions, _ = model.predict(observations, deterministic=True)
+
+    numpy_logits = numpy_policy.logits(observations)
+    numpy_actions, _ = numpy_policy.predict(observations, deterministic=True)
+
+    max_error = float(np.max(np.abs(torch_logits - numpy_logits)))
+    agreement = float(np.mean(torch_actions == numpy_actions))
+
+    # 最大两个logits相差小于误差范围时，argmax不同不算错误
+    top2 = np.sort(torch_logits, axis=-1)[:, -2:]
+    ambiguous = (top2[:, 1] - top2[:, 0]) <= 2 * atol
+    mismatched = (torch_actions != numpy_actions) & ~ambiguous
+
+    return {
+        'n_observations': len(observations),
+        'max_logit_error': max_error,
+        'action_agreement': agreement,
+        'passed': bool(max_error <= atol and not mismatched.any()),
+    }
+
+
+def benchmark_predict(policy, observation: np.ndarray, n_calls: int = 1000) -> float:
+    """单个观测的平均推理耗时（微秒）
+
+    Args:
+        policy: 具有predict(obs, deterministic=True)的策略
+        observation: 单个观测
+        n_calls: 调用次数
+
+    Returns:
+        平均耗时（微秒）
+    """
+    policy.predict(observation, deterministic=True)
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        policy.predict(observation, deterministic=True)
+    return (time.perf_counter() - start) / n_calls * 1e6
+
+
+def export_policy(model_path: Union[str, Path], output_path: Optional[Union[str, Path]] = None,
+                  n_verify: int = 1000, verify_observations: Optional[np.ndarray] = None,
+                  atol: float = 1e-4) -> Tuple[Path, Dict[str, float]]:
+    """把SB3 PPO模型导出为NumPy权重文件并校验
+
+    Args:
+        model_path: 模型路径（.zip，可省略扩展名）
+        output_path: 输出路径（默认与模型同名的.npz）
+        n_verify: 随机生成的校验观测数
+        verify_observations: 额外的校验观测（如真实环境中采集的观测）
+        atol: logits允许的最大绝对误差
+
+    Returns:
+        (输出路径, 校验结果)
+
+    Raises:
+        ValueError: 导出的策略与原策略输出不一致
+    """
+    from stable_baselines3 import PPO
+
+    model_path = Path(model_path)
+    model = PPO.load(model_path, device='cpu')
+    numpy_policy = _torch_policy_to_numpy(model)
+
+    observations = _verification_observations(model.observation_space, n_verify)
+    if verify_observations is not None:
+        extra = np.asarray(verify_observations, dtype=np.float32).reshape((-1,) + model.observation_space.shape)
+        observations = np.concatenate([observations, extra])
+
+    report = verify_policy(model, numpy_policy, observations, atol=atol)
+    if not report['passed']:
+        raise ValueError(f"导出的策略与原策略不一致: {report}")
+
+    report['torch_predict_us'] = benchmark_predict(model, observations[0])
+    report['numpy_predict_us'] = benchmark_predict(numpy_policy, observations[0])
+
+    if output_path is None:
+        output_path = model_path.with_suffix('.npz')
+    output_path = Path(output_path)
+    numpy_policy.save(output_path, source_sha256=_file_sha256(model_path.with_suffix('.zip')))
+    return output_path, report
+
+
+def _file_sha256(path: Path) -> str:
+    """文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_stale_export(npz_path: Path, zip_path: Path) -> bool:
+    """同名.npz是否不是由当前.zip导出（未记录来源哈希的旧导出同样视为过期）"""
+    with np.load(npz_path, allow_pickle=False) as data:
+        if 'source_sha256' not in data.files:
+            return True
+        source_sha256 = str(data['source_sha256'])
+    return source_sha256 != _file_sha256(zip_path)
+
+
+def resolve_policy_file(model_path: Union[str, Path], prefer_numpy: bool = True) -> Path:
+    """load_policy实际加载的文件
+
+    Args:
+        model_path: 模型路径（.npz或.zip，可省略扩展名）
+        prefer_numpy: 存在同名.npz时是否使用NumPy策略（.npz不是由当前.zip导出时仍使用.zip）
+
+    Returns:
+        .npz或.zip文件路径
+    """
+    model_path = Path(model_path)
+    if model_path.suffix == '.npz':
+        return model_path
+
+    # 与PPO.load一致：省略扩展名时补.zip
+    zip_path = model_path if model_path.suffix == '.zip' else model_path.with_name(model_path.name + '.zip')
+    npz_path = model_path.with_suffix('.npz')
+    if prefer_numpy and npz_path.exists():
+        if not zip_path.exists():
+            return npz_path
+        if not _is_stale_export(npz_path, zip_path):
+            return npz_path
+        print(f"⚠ {npz_path} 不是由当前的 {zip_path.name} 导出（已过期），改用.zip；"
+              f"重新导出: python -m src.rl.numpy_policy --model {zip_path}")
+
+    return zip_path
+
+
+def load_policy(model_path: Union[str, Path], prefer_numpy: bool = True):
+    """加载策略：.npz直接用NumpyPolicy，否则优先使用同名的.npz，最后退回PPO.load
+
+    Args:
+        model_path: 模型路径（.npz或.zip，可省略扩展名）
+        prefer_numpy: 存在同名.npz时是否使用NumPy策略
+
+    Returns:
+        具有predict(obs, deterministic)接口的策略
+    """
+    policy_file = resolve_policy_file(model_path, prefer_numpy)
+    if policy_file.suffix == '.npz':
+        return NumpyPolicy.load(policy_file)
+
+    from stable_baselines3 import PPO
+    return PPO.load(policy_file)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="导出不依赖torch的NumPy策略")
+    parser.add_argument("--model", type=str, required=True, help="SB3模型路径（.zip）")
+    parser.add_argument("--output", type=str, default=None, help="输出路径（默认与模型同名的.npz）")
+    parser.add_argument("--n-verify", type=int, default=1000, help="校验观测数")
+    args = parser.parse_args()
+
+    output_path, report = export_policy(args.model, args.output, n_verify=args.n_verify)
+    print(f"✓ 已导出: {output_path}")
+    print(f"  校验观测数: {report['n_observations']}")
+    print(f"  最大logit误差: {report['max_logit_error']:.2e}")
+    print(f"  动作一致率: {report['action_agreement'] * 100:.2f}%")
+    print(f"  单步推理: torch {report['torch_predict_us']:.1f} µs -> NumPy {report['numpy_predict_us']:.1f} µs")
@@ -0,0 +1,157 @@
+"""配对评测：各方法在相同场景上运行并比较差值
+
+每个(密度, 种子)单元中，规则基线、RL、RL+Safety都用CommonRandomNumbersEnv按seed + episode_idx
+回放相同的场景（初始交通指纹逐个检查），再用paired_comparison逐episode求差值。
+方法间的差异不再混入场景之间的差异，达到同样的置信区间宽度需要的episode数少得多
+（variance_reduction列给出倍数）。
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.baseline import RuleBasedPolicy
+from src.env.crn import CommonRandomNumbersEnv
+from src.env.overtaking_env import create_overtaking_env
+from src.metrics import MetricsEvaluator, evaluate_policy
+from src.metrics.paired import paired_comparison
+from src.rl.evaluate import SafetyShieldWrapper
+from src.rl.numpy_policy import load_policy
+from src.rl.safety_shield import SafetyShield
+from src.utils.config_loader import load_all_configs
+from src.utils.headless import enable_headless
+from src.utils.seed_utils import set_seed
+
+METHODS = ('baseline', 'rl', 'rl_safety')
+
+
+def build_policies(model_path: str, env_config, methods: Sequence[str] = METHODS) -> Dict:
+    """创建各方法的策略
+
+    Args:
+        model_path: RL模型路径（只评测baseline时可为None）
+        env_config: 环境配置
+        methods: 方法列表
+
+    Returns:
+        {方法名: 策略}
+    """
+    unknown = set(methods) - set(METHODS)
+    if unknown:
+        raise ValueError(f"未知的方法: {sorted(unknown)}（可选: {METHODS}）")
+
+    model = load_policy(model_path) if {'rl', 'rl_safety'} & set(methods) else None
+    policies = {}
+    for method in methods:
+        if method == 'baseline':
+            policies[method] = RuleBasedPolicy(env_config)
+        elif method == 'rl':
+            policies[method] = model
+        else:
+            policies[method] = SafetyShieldWrapper(model, SafetyShield(env_config))
+    return policies
+
+
+def evaluate_paired(model_path: str, config_dir: str = "configs", output_dir: str = "outputs",
+                    n_episodes: int = 20, methods: Sequence[str] = METHODS) -> pd.DataFrame:
+    """在密度×种子网格上做配对评测
+
+    Args:
+        model_path: RL模型路径（.zip或导出的.npz）
+        config_dir: 配置文件目录
+        output_dir: 输出目录
+        n_episodes: 每个(密度, 种子)的场景数
+        methods: 比较的方法
+
+    Returns:
+        配对比较表（density为'all'的行汇总全部场景）
+    """
+    configs = load_all_configs(config_dir)
+    env_config = configs['env']
+    eval_config = configs['eval']
+    enable_headless()
+    env_config['headless'] = True
+
+    policies = build_policies(model_path, env_config, methods)
+    episodes: Dict[str, Dict[str, List[Dict]]] = {}  # {密度: {方法: 记录}}
+
+    for density in eval_config['scenarios']['traffic_densities']:
+        env_config['traffic_density'] = density
+        episodes[density] = {method: [] for method in methods}
+        for seed in eval_config['scenarios']['seeds']:
+            scenario_ids = {}
+            for method, policy in policies.items():
+                set_seed(seed)
+                env = CommonRandomNumbersEnv(create_overtaking_env(env_config))
+                # 配对比较需要逐episode记录
+                _, records = evaluate_policy(env, policy, n_episodes=n_episodes, deterministic=True, seed=seed,
+                                             evaluator=MetricsEvaluator(store_episodes=True))
+                scenario_ids[method] = env.scenario_ids
+                env.close()
+                for record in records:
+                    record['seed'] = seed
+                episodes[density][method].extend(records)
+
+            # 所有方法必须在相同的初始交通上运行
+            reference = scenario_ids[methods[0]]
+            for method, ids in scenario_ids.items():
+                if ids != reference:
+                    raise RuntimeError(f"{density} / seed {seed}: {method} 的场景与 {methods[0]} 不一致")
+            print(f"  {density} / seed {seed} 完成（{n_episodes} 个场景 × {len(methods)} 个方法）")
+
+    tables = []
+    for density, by_method in episodes.items():
+        tables.append(paired_comparison(by_method).assign(density=density))
+    pooled = {method: [e for by_method in episodes.values() for e in by_method[method]] for method in methods}
+    tables.append(paired_comparison(pooled).assign(density='all'))
+    table = pd.concat(tables, ignore_index=True)
+    table = table[['density', *[c for c in table.columns if c != 'density']]]
+
+    results_dir = Path(output_dir) / eval_config['output']['results_dir']
+    results_dir.mkdir(parents=True, exist_ok=True)
+    table.to_csv(results_dir / 'paired_comparison.csv', index=False, encoding='utf-8-sig')
+    print(f"✓ 保存配对比较: {results_dir / 'paired_comparison.csv'}")
+    return table
+
+
+def print_paired_summary(table: pd.DataFrame, metrics: Sequence[str] = ('success_rate', 'collision_rate', 'avg_reward')):
+    """打印汇总（density='all'）的配对差值
+
+    Args:
+        table: evaluate_paired返回的比较表
+        metrics: 打印的指标
+    """
+    print("\n" + "=" * 60)
+    print("配对比较（差值 = B - A，95% CI）")
+    print("=" * 60)
+    rows = table[(table['density'] == 'all') & table['metric'].isin(metrics)]
+    for _, row in rows.iterrows():
+        mark = '*' if row['significant'] else ' '
+        print(f"{row['method_b']:>10} - {row['method_a']:<10} {row['metric']:<16} "
+              f"{row['diff']:+8.2f}  [{row['ci_low']:+.2f}, {row['ci_high']:+.2f}]{mark}  "
+              f"独立样本 [{row['unpaired_ci_low']:+.2f}, {row['unpaired_ci_high']:+.2f}]  "
+              f"方差缩减 {row['variance_reduction']:.1f}x")
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="公共随机数配对评测（基线 / RL / RL+Safety）")
+    parser.add_argument("--model", type=str, default=None, help="模型路径（.zip或导出的.npz）")
+    parser.add_argument("--config-dir", type=str, default="configs", help="配置文件目录")
+    parser.add_argument("--output-dir", type=str, default="outputs", help="输出目录")
+    parser.add_argument("--n-episodes", type=int, default=20, help="每个(密度, 种子)的场景数")
+    parser.add_argument("--methods", type=str, nargs="+", default=list(METHODS), help="比较的方法")
+    args = parser.parse_args()
+    if args.model is None and {'rl', 'rl_safety'} & set(args.methods):
+        parser.error("评测RL方法需要 --model")
+
+    table = evaluate_paired(args.model, args.config_dir, args.output_dir, args.n_episodes, args.methods)
+    print_paired_summary(table)
@@ -0,0 +1,251 @@
+"""策略压缩变体：int8量化与剪枝
+
+在NumpyPolicy的基础上派生：
+- int8: 权重按输出通道对称量化为int8（每列一个缩放系数），存储约为1/4。NumPy没有int8矩阵乘法内核，
+  推理时在创建时一次反量化为float32、按全精度路径计算，因此只用于评估量化误差对精度的影响，
+  对比表中不报告其延迟
+- prune{比例}: 按幅值剪除隐藏层中L2范数最小的神经元（结构化剪枝），矩阵实际变小，推理更快
+
+compare_variants()在eval_config的密度×种子网格上用evaluate_policy评测每个变体，
+统计单次决策延迟（p50/p99，int8变体除外）、参数内存，以及成功率/碰撞率相对全精度模型的变化，
+用于判断哪个变体能满足单步延迟预算。
+"""
+
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.rl.numpy_policy import NumpyPolicy, _torch_policy_to_numpy
+from src.utils.profiler import StreamingHistogram
+
+
+class QuantizedNumpyPolicy(NumpyPolicy):
+    """int8权重量化的NumPy策略（仅用于评估精度）
+
+    保存int8权重和每列缩放系数，创建时一次反量化为float32，前向计算与NumpyPolicy相同
+    （激活保持float32）。计算本身不是int8推理，延迟与同结构的全精度策略相同。
+    """
+
+    # compare_variants只评测其精度，不报告延迟
+    accuracy_only = True
+
+    def __init__(self, policy: NumpyPolicy):
+        """由全精度策略量化得到
+
+        Args:
+            policy: 全精度NumpyPolicy
+        """
+        self.q_weights, self.scales = [], []
+        for w in policy.weights + [policy.action_weight]:
+            q, scale = quantize_int8(w)
+            self.q_weights.append(q)
+            self.scales.append(scale)
+        dequantized = [q.astype(np.float32) * scale for q, scale in zip(self.q_weights, self.scales)]
+        super().__init__(dequantized[:-1], policy.biases, dequantized[-1], policy.action_bias,
+                         policy.obs_shape, policy.activation)
+
+
+def quantize_int8(weight: np.ndarray):
+    """按输出通道（列）对称量化为int8
+
+    Args:
+        weight: 权重，形状(in, out)
+
+    Returns:
+        (int8权重, 每列缩放系数)
+    """
+    scale = np.abs(weight).max(axis=0) / 127.0
+    scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+    q = np.clip(np.round(weight / scale), -127, 127).astype(np.int8)
+    return q, scale
+
+
+def prune_policy(policy: NumpyPolicy, ratio: float) -> NumpyPolicy:
+    """结构化剪枝：每个隐藏层去掉输入权重L2范数最小的ratio比例神经元
+
+    Args:
+        policy: 全精度NumpyPolicy
+        ratio: 剪枝比例（0-1）
+
+    Returns:
+        剪枝后的NumpyPolicy（隐藏层变窄）
+    """
+    weights = [w.copy() for w in policy.weights] + [policy.action_weight.copy()]
+    biases = [b.copy() for b in policy.biases]
+
+    for i in range(len(biases)):
+        n_units = biases[i].shape[0]
+        n_keep = max(1, int(round(n_units * (1 - ratio))))
+        norms = np.linalg.norm(weights[i], axis=0)
+        keep = np.sort(np.argsort(norms)[-n_keep:])
+        weights[i] = weights[i][:, keep]
+        biases[i] = biases[i][keep]
+        weights[i + 1] = weights[i + 1][keep, :]
+
+    return NumpyPolicy(weights[:-1], biases, weights[-1], policy.action_bias,
+                       policy.obs_shape, policy.activation)
+
+
+def policy_nbytes(policy: NumpyPolicy) -> int:
+    """策略参数占用的内存（字节）"""
+    if isinstance(policy, QuantizedNumpyPolicy):
+        arrays = policy.q_weights + policy.scales + policy.biases + [policy.action_bias]
+    else:
+        arrays = policy.weights + policy.biases + [policy.action_weight, policy.action_bias]
+    return int(sum(a.nbytes for a in arrays))
+
+
+class TimedPolicy:
+    """记录每次决策耗时的策略包装器"""
+
+    def __init__(self, policy):
+        """初始化
+
+        Args:
+            policy: 具有predict接口的策略
+        """
+        self.policy = policy
+        self.latency = StreamingHistogram()
+
+    def predict(self, obs, deterministic=True):
+        start = perf_counter()
+        result = self.policy.predict(obs, deterministic=deterministic)
+        self.latency.add(perf_counter() - start)
+        return result
+
+    def reset(self):
+        pass
+
+
+def load_numpy_policy(model_path: str) -> NumpyPolicy:
+    """加载全精度NumPy策略（.npz直接加载，.zip从SB3模型中提取）"""
+    model_path = Path(model_path)
+    if model_path.suffix == '.npz':
+        return NumpyPolicy.load(model_path)
+
+    from stable_baselines3 import PPO
+    return _torch_policy_to_numpy(PPO.load(model_path, device='cpu'))
+
+
+def build_variants(policy: NumpyPolicy, prune_ratios: Sequence[float] = (0.25, 0.5),
+                   quantize: bool = True) -> Dict[str, NumpyPolicy]:
+    """生成各压缩变体
+
+    Args:
+        policy: 全精度策略
+        prune_ratios: 剪枝比例
+        quantize: 是否生成int8变体（包括剪枝后再量化）
+
+    Returns:
+        {变体名: 策略}，第一个为全精度fp32
+    """
+    variants = {'fp32': policy}
+    if quantize:
+        variants['int8'] = QuantizedNumpyPolicy(policy)
+    for ratio in prune_ratios:
+        pruned = prune_policy(policy, ratio)
+        variants[f'prune{int(ratio * 100)}'] = pruned
+        if quantize:
+            variants[f'prune{int(ratio * 100)}_int8'] = QuantizedNumpyPolicy(pruned)
+    return variants
+
+
+def compare_variants(model_path: str, config_dir: str = "configs", output_dir: str = "outputs",
+                     n_episodes: int = 20, prune_ratios: Sequence[float] = (0.25, 0.5),
+                     quantize: bool = True, latency_budget_us: Optional[float] = None) -> pd.DataFrame:
+    """在密度×种子网格上评测各变体
+
+    Args:
+        model_path: 模型路径（.zip或导出的.npz）
+        config_dir: 配置文件目录
+        output_dir: 输出目录
+        n_episodes: 每个(密度, 种子)的评测轮数
+        prune_ratios: 剪枝比例
+        quantize: 是否评测int8变体
+        latency_budget_us: 单步延迟预算（微秒，按p99判断，可选）
+
+    Returns:
+        每个变体一行的对比表
+    """
+    from src.env.overtaking_env import create_overtaking_env
+    from src.metrics import evaluate_policy
+    from src.utils.config_loader import load_all_configs
+    from src.utils.headless import enable_headless
+
+    configs = load_all_configs(config_dir)
+    env_config = configs['env']
+    eval_config = configs['eval']
+    enable_headless()
+    env_config['headless'] = True
+
+    policy = load_numpy_policy(model_path)
+    hidden_sizes = [b.shape[0] for b in policy.biases]
+    net_arch = configs['train']['network']['net_arch']
+    if hidden_sizes != list(net_arch):
+        print(f"⚠ 模型隐藏层 {hidden_sizes} 与 train_config.yaml 中的 net_arch {net_arch} 不一致")
+
+    variants = build_variants(policy, prune_ratios, quantize)
+    timed = {name: TimedPolicy(p) for name, p in variants.items()}
+    outcomes = {name: [] for name in variants}
+
+    for density in eval_config['scenarios']['traffic_densities']:
+        env_config['traffic_density'] = density
+        env = create_overtaking_env({**env_config, 'lean_info': True})
+        for seed in eval_config['scenarios']['seeds']:
+            for name, timed_policy in timed.items():
+                evaluator, _ = evaluate_policy(env, timed_policy, n_episodes=n_episodes,
+                                               deterministic=True, seed=seed)
+                metrics = evaluator.compute_metrics()
+                outcomes[name].append((metrics['success_rate'], metrics['collision_rate']))
+            print(f"  {density} / seed {seed} 完成")
+        env.close()
+
+    rows = []
+    for name, timed_policy in timed.items():
+        success, collision = np.mean(outcomes[name], axis=0)
+        # int8变体按float32计算，延迟没有意义，只报告精度
+        accuracy_only = getattr(variants[name], 'accuracy_only', False)
+        rows.append({
+            'variant': name,
+            'params_kb': policy_nbytes(variants[name]) / 1024,
+            'p50_us': np.nan if accuracy_only else timed_policy.latency.percentile(50) * 1e6,
+            'p99_us': np.nan if accuracy_only else timed_policy.latency.percentile(99) * 1e6,
+            'success_rate': success,
+            'collision_rate': collision,
+        })
+    table = pd.DataFrame(rows)
+    table['delta_success'] = table['success_rate'] - table.loc[0, 'success_rate']
+    table['delta_collision'] = table['collision_rate'] - table.loc[0, 'collision_rate']
+    if latency_budget_us is not None:
+        table['within_budget'] = (table['p99_us'] <= latency_budget_us).where(table['p99_us'].notna())
+
+    results_dir = Path(output_dir) / eval_config['output']['results_dir']
+    results_dir.mkdir(parents=True, exist_ok=True)
+    table.to_csv(results_dir / 'policy_variants.csv', index=False, encoding='utf-8-sig')
+    return table
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="评测量化/剪枝策略变体的精度与延迟")
+    parser.add_argument("--model", type=str, required=True, help="模型路径（.zip或导出的.npz）")
+    parser.add_argument("--config-dir", type=str, default="configs", help="配置文件目录")
+    parser.add_argument("--output-dir", type=str, default="outputs", help="输出目录")
+    parser.add_argument("--n-episodes", type=int, default=20, help="每个(密度, 种子)的评测轮数")
+    parser.add_argument("--prune", type=float, nargs="*", default=[0.25, 0.5], help="剪枝比例")
+    parser.add_argument("--no-int8", action="store_true", help="不评测int8变体")
+    parser.add_argument("--budget-us", type=float, default=None, help="单步延迟预算（微秒，按p99判断）")
+    args = parser.parse_args()
+
+    table = compare_variants(args.model, args.config_dir, args.output_dir, args.n_episodes,
+                             args.prune, not args.no_int8, args.budget_us)
+    print("\n" + table.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
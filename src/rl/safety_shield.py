@@ -1,11 +1,16 @@
 """Safety Shield - 安全约束层
 
-对RL策略输出的动作进行安全检查和修正
+对RL策略输出的动作进行安全检查和修正：
+- check_and_correct: 检查策略已选的动作，不安全时改为IDLE
+- action_mask: 一次求出一批观测下所有动作是否安全（掩码训练/推理用）
+- masked_argmax: 只在安全动作中取logits最大的动作
 """
 
 import numpy as np
 from typing import Tuple, Dict
 
+from ..env.neighbourhood import Neighbourhood, SLOT_INDEX, less_than, neighbourhood, safe_lane_change
+
 
 class SafetyShield:
     """安全约束层，用于过滤/修正不安全的动作"""
@@ -61,25 +66,24 @@ class SafetyShield:
         try:
             ego = obs[0]
             ego_vx = ego[3]
-            vehicles = obs[1:]
 
             # 检查左换道
             if action == self.ACTIONS['LANE_LEFT']:
-                if not self._is_safe_lane_change(vehicles, 'left', ego_vx):
+                if not self._is_safe_lane_change(neighbourhood(obs), 'left', ego_vx):
                     self.total_interventions += 1
                     self.intervention_reasons['unsafe_lane_change_left'] += 1
                     return self.ACTIONS['IDLE'], True
 
             # 检查右换道
             elif action == self.ACTIONS['LANE_RIGHT']:
-                if not self._is_safe_lane_change(vehicles, 'right', ego_vx):
+                if not self._is_safe_lane_change(neighbourhood(obs), 'right', ego_vx):
                     self.total_interventions += 1
                     self.intervention_reasons['unsafe_lane_change_right'] += 1
                     return self.ACTIONS['IDLE'], True
 
             # 检查加速（是否会导致距离过近）
             elif action == self.ACTIONS['FASTER']:
-                front = self._find_vehicle(vehicles, 'front', 'same')
+                front = neighbourhood(obs).get('front')
                 if front is not None:
                     distance = front[1]
                     if distance < self.min_safe_distance * 1.5:  # 留出余量
@@ -94,11 +98,68 @@ class SafetyShield:
             # 解析失败，保持安全
             return self.ACTIONS['IDLE'], True
 
-    def _is_safe_lane_change(self, vehicles: np.ndarray, direction: str, ego_vx: float) -> bool:
+    def action_mask(self, obs: np.ndarray) -> np.ndarray:
+        """所有动作的安全掩码
+
+        判定与check_and_correct相同：换道要求目标车道安全，加速要求本车道前车距离不小于
+        1.5倍最小安全距离，IDLE和SLOWER总是安全。mask[a]为True当且仅当check_and_correct(obs, a)不修正。
+
+        Args:
+            obs: 观测 (vehicles_count, features) 或一批观测 (N, vehicles_count, features)
+
+        Returns:
+            布尔掩码 (5,) 或 (N, 5)，按动作ID排列
+        """
+        obs = np.asarray(obs)
+        neighbours = neighbourhood(obs)
+        ego_vx = obs[..., 0, 3]
+
+        mask = np.ones((*obs.shape[:-2], len(self.ACTIONS)), dtype=bool)
+        mask[..., self.ACTIONS['LANE_LEFT']] = safe_lane_change(
+            neighbours, 'left', ego_vx, self.min_safe_distance, self.min_time_headway)
+        mask[..., self.ACTIONS['LANE_RIGHT']] = safe_lane_change(
+            neighbours, 'right', ego_vx, self.min_safe_distance, self.min_time_headway)
+        front_distance = neighbours.vehicles[..., SLOT_INDEX['front'], 1]
+        mask[..., self.ACTIONS['FASTER']] = ~(neighbours.present[..., SLOT_INDEX['front']] &
+                                              less_than(front_distance, self.min_safe_distance * 1.5))
+        return mask
+
+    def masked_argmax(self, logits: np.ndarray, obs: np.ndarray) -> np.ndarray:
+        """在安全动作中选择logits最大的动作（计入干预统计）
+
+        与check_and_correct不同，被屏蔽的动作不是统一改为IDLE，而是换成策略认为次优的安全动作。
+        最终动作与不加掩码的argmax不同时记为一次干预，原因按被屏蔽的动作统计。
+
+        Args:
+            logits: 策略输出的动作logits (5,) 或 (N, 5)
+            obs: 对应的观测
+
+        Returns:
+            动作ID（单个观测为int，一批观测为(N,)）
+        """
+        logits = np.asarray(logits)
+        mask = self.action_mask(obs)
+        actions = np.where(mask, logits, -np.inf).argmax(axis=-1)
+        unmasked = logits.argmax(axis=-1)
+
+        changed = np.atleast_1d(actions != unmasked)
+        self.total_checks += changed.size
+        self.total_interventions += int(changed.sum())
+        reasons = {
+            self.ACTIONS['LANE_LEFT']: 'unsafe_lane_change_left',
+            self.ACTIONS['LANE_RIGHT']: 'unsafe_lane_change_right',
+            self.ACTIONS['FASTER']: 'too_close_front',
+        }
+        for action in np.atleast_1d(unmasked)[changed]:
+            self.intervention_reasons[reasons[int(action)]] += 1
+
+        return int(actions) if actions.ndim == 0 else actions
+
+    def _is_safe_lane_change(self, neighbours: Neighbourhood, direction: str, ego_vx: float) -> bool:
         """检查换道是否安全
 
         Args:
-            vehicles: 车辆数组
+            neighbours: 观测的邻域描述
             direction: 'left' or 'right'
             ego_vx: 自车速度
 
@@ -106,8 +167,8 @@ class SafetyShield:
             是否安全
         """
         # 找到目标车道的前后车
-        front = self._find_vehicle(vehicles, 'front', direction)
-        rear = self._find_vehicle(vehicles, 'rear', direction)
+        front = neighbours.get(f'{direction}_front')
+        rear = neighbours.get(f'{direction}_rear')
 
         # 检查前车
         if front is not None:
@@ -130,48 +191,6 @@ class SafetyShield:
 
         return True
 
-    def _find_vehicle(self, vehicles: np.ndarray, position: str, lane: str) -> np.ndarray:
-        """找到指定位置和车道的车辆
-
-        Args:
-            vehicles: 车辆数组
-            position: 'front' or 'rear'
-            lane: 'same', 'left', 'right'
-
-        Returns:
-            车辆向量或None
-        """
-        candidates = []
-
-        for v in vehicles:
-            if v[0] < 0.5:  # presence
-                continue
-
-            x = v[1]  # 纵向
-            y = v[2]  # 横向
-
-            # 位置过滤
-            if position == 'front' and x < 0:
-                continue
-            if position == 'rear' and x > 0:
-                continue
-
-            # 车道过滤
-            if lane == 'same' and abs(y) > 0.1:
-                continue
-            if lane == 'left' and y < 0.1:
-                continue
-            if lane == 'right' and y > -0.1:
-                continue
-
-            candidates.append((abs(x), v))
-
-        if not candidates:
-            return None
-
-        candidates.sort(key=lambda x: x[0])
-        return candidates[0][1]
-
     def get_statistics(self) -> Dict:
         """获取统计信息
 
@@ -187,6 +206,17 @@ class SafetyShield:
             'intervention_reasons': self.intervention_reasons.copy(),
         }
 
+    def merge_statistics(self, stats: Dict):
+        """累加另一份统计（如并行评测中各单元的get_statistics结果）
+
+        Args:
+            stats: get_statistics返回的统计字典
+        """
+        self.total_checks += stats['total_checks']
+        self.total_interventions += stats['total_interventions']
+        for reason, count in stats['intervention_reasons'].items():
+            self.intervention_reasons[reason] = self.intervention_reasons.get(reason, 0) + count
+
     def print_statistics(self):
         """打印统计信息"""
         stats = self.get_statistics()
@@ -0,0 +1,181 @@
+"""训练吞吐统计回调
+
+按固定步数间隔统计环境吞吐、rollout/更新耗时占比、单步延迟、内存和CPU占用，
+写入TensorBoard（SB3 logger）和ExperimentLogger.log_metrics，
+用于确定n_envs/n_steps以及发现版本间的性能回退。
+"""
+
+import os
+import time
+from typing import Dict
+
+from stable_baselines3.common.callbacks import BaseCallback
+
+from src.utils.profiler import StreamingHistogram
+
+try:
+    import psutil
+except ImportError:  # 可选依赖：没有psutil时只统计主进程
+    psutil = None
+
+
+class _ProcessStats:
+    """进程内存与CPU时间（安装psutil时包含子进程，如subproc worker）"""
+
+    def __init__(self):
+        self._process = psutil.Process(os.getpid()) if psutil is not None else None
+
+    def _processes(self):
+        processes = [self._process]
+        try:
+            processes += self._process.children(recursive=True)
+        except psutil.Error:
+            pass
+        return processes
+
+    def rss_mb(self) -> float:
+        """常驻内存（MB）"""
+        if self._process is None:
+            return _self_rss_mb()
+        total = 0
+        for p in self._processes():
+            try:
+                total += p.memory_info().rss
+            except psutil.Error:
+                pass
+        return total / 1024 / 1024
+
+    def cpu_seconds(self) -> float:
+        """累计CPU时间（秒）"""
+        if self._process is None:
+            return time.process_time()
+        total = 0.0
+        for p in self._processes():
+            try:
+                times = p.cpu_times()
+                total += times.user + times.system
+            except psutil.Error:
+                pass
+        return total
+
+
+def _self_rss_mb() -> float:
+    """当前进程常驻内存（MB），读取/proc，其他平台退回峰值内存"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        from src.utils.headless import _peak_rss_mb
+        return _peak_rss_mb()
+
+
+class ThroughputCallback(BaseCallback):
+    """训练吞吐统计
+
+    记录的指标（每log_freq个环境步一次，区间统计）：
+    - steps_per_second: 环境步/秒（所有子环境合计）
+    - rollout_fraction / update_fraction: 采集与PPO更新占用的时间比例
+    - vec_step_p50_ms / vec_step_p95_ms: 一次向量步（含策略推理）的延迟
+    - env_step_ms: 平均到单个环境的步延迟
+    - rss_mb / cpu_percent: 内存和CPU占用（100%为一个核）
+    """
+
+    def __init__(self, log_freq: int = 2048, experiment_logger=None, verbose: int = 0):
+        """初始化
+
+        Args:
+            log_freq: 记录间隔（环境步）
+            experiment_logger: ExperimentLogger（可选，写入log_metrics）
+            verbose: 是否打印
+        """
+        super().__init__(verbose)
+        self.log_freq = log_freq
+        self.experiment_logger = experiment_logger
+        self.history = []
+
+        self._stats = _ProcessStats()
+        self._next_log = log_freq
+        self._last_step_time = None
+        # 当前阶段：None（训练开始前）/ 'rollout' / 'update'，及其起点
+        self._phase = None
+        self._phase_start = 0.0
+        self._reset_interval()
+
+    def _reset_interval(self):
+        """开始新的统计区间"""
+        self._interval_start = time.perf_counter()
+        self._interval_cpu = self._stats.cpu_seconds()
+        self._interval_steps = 0
+        self._phase_time = {'rollout': 0.0, 'update': 0.0}
+        self._step_latency = StreamingHistogram()
+
+    def _switch_phase(self, phase: str) -> float:
+        """结束当前阶段并进入下一阶段，返回当前时间"""
+        now = time.perf_counter()
+        if self._phase is not None:
+            self._phase_time[self._phase] += now - self._phase_start
+        self._phase = phase
+        self._phase_start = now
+        return now
+
+    def _on_training_start(self):
+        self._next_log = self.num_timesteps + self.log_freq
+        self._reset_interval()
+
+    def _on_rollout_start(self):
+        # 上一次rollout结束到本次开始之间是PPO更新（含日志/回调）
+        self._last_step_time = self._switch_phase('rollout')
+
+    def _on_step(self) -> bool:
+        now = time.perf_counter()
+        self._step_latency.add(now - self._last_step_time)
+        self._last_step_time = now
+        self._interval_steps += self.training_env.num_envs
+
+        if self.num_timesteps >= self._next_log:
+            self._log_interval()
+            self._next_log += self.log_freq
+        return True
+
+    def _on_rollout_end(self):
+        self._switch_phase('update')
+
+    def _log_interval(self) -> Dict[str, float]:
+        """统计并记录当前区间
+
+        Returns:
+            本区间的指标
+        """
+        # 把进行中的阶段截断到当前时刻计入本区间
+        self._switch_phase(self._phase)
+        elapsed = max(self._phase_start - self._interval_start, 1e-9)
+        cpu_seconds = self._stats.cpu_seconds()
+        n_envs = self.training_env.num_envs
+        latency = self._step_latency
+
+        metrics = {
+            'steps_per_second': self._interval_steps / elapsed,
+            'rollout_fraction': self._phase_time['rollout'] / elapsed,
+            'update_fraction': self._phase_time['update'] / elapsed,
+            'vec_step_p50_ms': latency.percentile(50) * 1e3,
+            'vec_step_p95_ms': latency.percentile(95) * 1e3,
+            'env_step_ms': latency.total / max(latency.count, 1) / n_envs * 1e3,
+            'rss_mb': self._stats.rss_mb(),
+            'cpu_percent': (cpu_seconds - self._interval_cpu) / elapsed * 100,
+            'n_envs': n_envs,
+        }
+
+        for key, value in metrics.items():
+            self.logger.record(f"throughput/{key}", value)
+        if self.experiment_logger is not None:
+            self.experiment_logger.log_metrics(metrics, step=self.num_timesteps, category='throughput')
+        if self.verbose:
+            print(f"[吞吐] 步数 {self.num_timesteps}: {metrics['steps_per_second']:.1f} steps/s, "
+                  f"采集 {metrics['rollout_fraction'] * 100:.0f}% / 更新 {metrics['update_fraction'] * 100:.0f}%, "
+                  f"内存 {metrics['rss_mb']:.0f} MB, CPU {metrics['cpu_percent']:.0f}%")
+
+        self.history.append({'step': self.num_timesteps, **metrics})
+        self._reset_interval()
+        self._interval_start = self._phase_start
+        return metrics
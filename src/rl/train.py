@@ -1,7 +1,7 @@
 """PPO训练脚本"""
 
-import os
 import sys
+import time
 from pathlib import Path
 
 # 添加项目根目录到路径
@@ -9,32 +9,47 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+from stable_baselines3.common.vec_env import DummyVecEnv, VecMonitor
 from stable_baselines3.common.callbacks import CheckpointCallback, EvalCallback
 from stable_baselines3.common.monitor import Monitor
 
-from src.env.overtaking_env import create_overtaking_env
+from src.env.overtaking_env import create_overtaking_env, create_vector_overtaking_env
+from src.rl.async_eval import AsyncEvalCallback, AsyncPolicyEvaluator
+from src.rl.async_ppo import train_async_ppo
+from src.rl.throughput import ThroughputCallback
+from src.rl.action_mask import ActionMaskWrapper
+from src.rl.safety_shield import SafetyShield
+from src.rl.vec_env import VecActionMaskWrapper, VectorEnvAdapter, make_vec_env, resolve_vec_env_type
 from src.utils.config_loader import load_all_configs
+from src.utils.headless import enable_headless
 from src.utils.logger import create_logger
 from src.utils.seed_utils import set_seed
 
+try:
+    from sb3_contrib import MaskablePPO
+    from sb3_contrib.common.maskable.callbacks import MaskableEvalCallback
+except ImportError:  # 可选依赖：动作掩码训练（action_mask: true）需要sb3-contrib
+    MaskablePPO = None
+
 
 def make_env(env_config, rank=0, seed=0):
     """创建环境的辅助函数（用于并行）"""
     def _init():
-        env = create_overtaking_env(env_config)
+        # 训练只消费奖励和episode统计，使用精简info减少每步的dict分配
+        env = create_overtaking_env({**env_config, 'lean_info': True})
         env = Monitor(env)
         env.reset(seed=seed + rank)
         return env
     return _init
 
 
-def train_ppo(config_dir: str = "configs", output_dir: str = "outputs"):
+def train_ppo(config_dir: str = "configs", output_dir: str = "outputs", headless: bool = False):
     """训练PPO模型
 
     Args:
         config_dir: 配置文件目录
         output_dir: 输出目录
+        headless: 无界面模式（不创建任何渲染）
     """
     print("\n" + "=" * 60)
     print("开始PPO训练")
@@ -45,6 +60,10 @@ def train_ppo(config_dir: str = "configs", output_dir: str = "outputs"):
     env_config = configs['env']
     train_config = configs['train']
 
+    if headless or env_config.get('headless', False):
+        enable_headless()
+        env_config['headless'] = True
+
     # 设置随机种子
     set_seed(env_config.get('seeds', [42])[0])
 
@@ -65,15 +84,47 @@ def train_ppo(config_dir: str = "configs", output_dir: str = "outputs"):
     n_envs = train_config.get('n_envs', 4)
     print(f"创建 {n_envs} 个并行环境...")
 
-    env_fns = [make_env(env_config, i, seed=42) for i in range(n_envs)]
-    env = DummyVecEnv(env_fns)
+    backend = env_config.get('backend', 'highway_env')
+    use_async = train_config.get('async_ppo', {}).get('enabled', False)
+    if use_async and backend == 'vectorized':
+        raise ValueError("异步PPO不支持vectorized仿真后端，请关闭async_ppo或使用highway_env后端")
+    use_action_mask = train_config.get('action_mask', False)
+    if use_action_mask:
+        if MaskablePPO is None:
+            raise ImportError("动作掩码训练需要sb3-contrib（pip install sb3-contrib）")
+        if use_async:
+            raise ValueError("异步PPO不支持动作掩码训练，请关闭async_ppo或action_mask")
+
+    if backend == 'vectorized':
+        # NumPy批量仿真后端：一个VectorEnv同时推进所有子环境
+        env = VecMonitor(VectorEnvAdapter(create_vector_overtaking_env(env_config, n_envs)))
+        env.seed(42)
+    elif use_async:
+        # 异步actor/learner：环境在actor进程中创建，这里只需一个环境提供观测/动作空间
+        env = DummyVecEnv([make_env(env_config, 0, seed=42)])
+    else:
+        # dummy：单进程串行；subproc：每个环境一个进程，观测走共享内存
+        vec_env_type = resolve_vec_env_type(train_config.get('vec_env', 'auto'), n_envs)
+        print(f"  VecEnv: {vec_env_type}")
+        env_fns = [make_env(env_config, i, seed=42) for i in range(n_envs)]
+        env = make_vec_env(env_fns, vec_env_type, pin_cpus=train_config.get('pin_cpus', True))
 
     # 可选：环境归一化
     # env = VecNormalize(env, norm_obs=True, norm_reward=True)
 
-    # 创建评估环境
-    eval_env = create_overtaking_env(env_config)
-    eval_env = Monitor(eval_env)
+    if use_action_mask:
+        # Safety Shield动作掩码：每步对所有环境一次计算掩码，MaskablePPO只在安全动作中采样
+        env = VecActionMaskWrapper(env, SafetyShield(env_config))
+
+    # 创建评估环境（进程外评估时由评估进程自行创建）
+    use_async_eval = train_config.get('async_eval', True)
+    eval_seed = env_config.get('seeds', [42])[0]
+    eval_env = None
+    if not use_async_eval:
+        eval_env = create_overtaking_env(env_config)
+        eval_env = Monitor(eval_env)
+        if use_action_mask:
+            eval_env = ActionMaskWrapper(eval_env, SafetyShield(env_config))
 
     print("✓ 环境创建完成\n")
 
@@ -81,7 +132,8 @@ def train_ppo(config_dir: str = "configs", output_dir: str = "outputs"):
     ppo_config = train_config['ppo']
     network_config = train_config['network']
 
-    model = PPO(
+    model_class = MaskablePPO if use_action_mask else PPO
+    model = model_class(
         policy=network_config['policy_type'],
         env=env,
         learning_rate=ppo_config['learning_rate'],
@@ -102,11 +154,40 @@ def train_ppo(config_dir: str = "configs", output_dir: str = "outputs"):
         device=train_config.get('device', 'auto'),
     )
 
-    print("✓ PPO模型创建完成")
+    print(f"✓ {model_class.__name__}模型创建完成")
     print(f"  网络结构: {network_config['net_arch']}")
     print(f"  学习率: {ppo_config['learning_rate']}")
     print(f"  设备: {train_config.get('device', 'auto')}\n")
 
+    if use_async:
+        logger.log("异步训练开始")
+        policy_evaluator = None
+        try:
+            if use_async_eval:
+                policy_evaluator = AsyncPolicyEvaluator(
+                    model, env_config, train_config['eval_episodes'],
+                    best_model_save_path=str(model_dir / 'best'),
+                    experiment_logger=logger, seed=eval_seed,
+                )
+            env_fns = [make_env(env_config, i, seed=42) for i in range(n_envs)]
+            train_async_ppo(model, env_fns, train_config, model_dir, log_dir, logger,
+                            policy_evaluator=policy_evaluator)
+
+            final_model_path = model_dir / "ppo_highway_final"
+            model.save(final_model_path)
+            logger.log(f"最终模型已保存: {final_model_path}")
+            print(f"✓ 最终模型已保存: {final_model_path}.zip\n")
+        except KeyboardInterrupt:
+            logger.log("训练被用户中断", level="WARNING")
+            model.save(model_dir / "ppo_highway_interrupted")
+        finally:
+            if policy_evaluator is not None:
+                policy_evaluator.close()
+            env.close()
+            if eval_env is not None:
+                eval_env.close()
+        return model
+
     # 创建回调
     callbacks = []
 
@@ -120,22 +201,41 @@ def train_ppo(config_dir: str = "configs", output_dir: str = "outputs"):
     )
     callbacks.append(checkpoint_callback)
 
-    # 评估回调
-    eval_callback = EvalCallback(
-        eval_env,
-        best_model_save_path=str(model_dir / 'best'),
-        log_path=str(log_dir),
-        eval_freq=train_config['eval_freq'],
-        n_eval_episodes=train_config['eval_episodes'],
-        deterministic=True,
-        render=False,
-    )
+    # 评估回调（默认在独立进程中评估，训练不等待评估结果）
+    if use_async_eval:
+        eval_callback = AsyncEvalCallback(
+            env_config,
+            eval_freq=train_config['eval_freq'],
+            n_eval_episodes=train_config['eval_episodes'],
+            best_model_save_path=str(model_dir / 'best'),
+            experiment_logger=logger,
+            seed=eval_seed,
+            action_mask=use_action_mask,
+        )
+    else:
+        # 掩码训练时评估也使用动作掩码
+        eval_callback_class = MaskableEvalCallback if use_action_mask else EvalCallback
+        eval_callback = eval_callback_class(
+            eval_env,
+            best_model_save_path=str(model_dir / 'best'),
+            log_path=str(log_dir),
+            eval_freq=train_config['eval_freq'],
+            n_eval_episodes=train_config['eval_episodes'],
+            deterministic=True,
+            render=False,
+        )
     callbacks.append(eval_callback)
 
+    # 吞吐统计回调（写入TensorBoard和ppo_training_throughput_metrics.csv）
+    throughput_log_freq = train_config.get('throughput_log_freq', 2048)
+    if throughput_log_freq > 0:
+        callbacks.append(ThroughputCallback(throughput_log_freq, experiment_logger=logger))
+
     print("开始训练...\n")
     logger.log("训练开始")
 
     # 训练
+    start_time = time.perf_counter()
     try:
         model.learn(
             total_timesteps=train_config['total_timesteps'],
@@ -143,8 +243,10 @@ def train_ppo(config_dir: str = "configs", output_dir: str = "outputs"):
             progress_bar=False,  # 禁用进度条（后台运行时不需要）
         )
 
-        logger.log("训练完成")
+        steps_per_second = model.num_timesteps / (time.perf_counter() - start_time)
+        logger.log(f"训练完成，平均吞吐 {steps_per_second:.1f} steps/s")
         print("\n✓ 训练完成！")
+        print(f"  平均吞吐: {steps_per_second:.1f} steps/s（{n_envs} 个环境）")
 
         # 保存最终模型
         final_model_path = model_dir / "ppo_highway_final"
@@ -160,7 +262,8 @@ def train_ppo(config_dir: str = "configs", output_dir: str = "outputs"):
 
     finally:
         env.close()
-        eval_env.close()
+        if eval_env is not None:
+            eval_env.close()
 
     print("=" * 60)
     print("训练结束")
@@ -175,7 +278,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="训练PPO超车策略")
     parser.add_argument("--config-dir", type=str, default="configs", help="配置文件目录")
     parser.add_argument("--output-dir", type=str, default="outputs", help="输出目录")
+    parser.add_argument("--headless", action="store_true", help="无界面模式（不创建任何渲染）")
 
     args = parser.parse_args()
 
-    train_ppo(args.config_dir, args.output_dir)
+    train_ppo(args.config_dir, args.output_dir, headless=args.headless)
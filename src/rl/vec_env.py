@@ -0,0 +1,430 @@
+"""向量化环境
+
+- VectorEnvAdapter: 将gymnasium VectorEnv（SAME_STEP自动重置）适配为SB3的VecEnv接口
+- SharedMemoryVecEnv: 每个子环境一个进程，观测通过共享内存返回
+- make_vec_env: 按配置选择dummy / subproc / auto
+- VecActionMaskWrapper: 为MaskablePPO提供Safety Shield动作掩码（一次计算所有子环境）
+"""
+
+import os
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional
+
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnvWrapper
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnv
+
+from src.rl.action_mask import ACTION_MASKS_METHOD
+from src.rl.safety_shield import SafetyShield
+
+
+def unbatch_infos(infos: Dict[str, Any], num_envs: int) -> List[Dict[str, Any]]:
+    """将gymnasium批量info（值数组 + `_key`掩码）拆分为每个子环境一个dict
+
+    Args:
+        infos: 批量info字典
+        num_envs: 子环境数量
+
+    Returns:
+        长度为num_envs的info列表
+    """
+    result = [{} for _ in range(num_envs)]
+
+    for key, value in infos.items():
+        if key.startswith('_'):
+            continue
+        mask = infos.get(f'_{key}', np.ones(num_envs, dtype=bool))
+
+        if isinstance(value, dict):
+            nested = unbatch_infos(value, num_envs)
+            for i in np.flatnonzero(mask):
+                result[i][key] = nested[i]
+        else:
+            for i in np.flatnonzero(mask):
+                item = value[i]
+                result[i][key] = item.item() if isinstance(item, np.generic) else item
+
+    return result
+
+
+class VectorEnvAdapter(VecEnv):
+    """gymnasium VectorEnv -> SB3 VecEnv
+
+    终止子环境的最后观测写入info['terminal_observation']，
+    时间截断写入info['TimeLimit.truncated']，与SB3的约定一致。
+    """
+
+    def __init__(self, venv):
+        """初始化适配器
+
+        Args:
+            venv: 使用SAME_STEP自动重置的gymnasium VectorEnv
+        """
+        self.venv = venv
+        super().__init__(venv.num_envs, venv.single_observation_space, venv.single_action_space)
+        self._actions = None
+
+    def reset(self):
+        seeds = None if all(seed is None for seed in self._seeds) else self._seeds
+        obs, infos = self.venv.reset(seed=seeds)
+        self.reset_infos = unbatch_infos(infos, self.num_envs)
+        self._reset_seeds()
+        self._reset_options()
+        return obs
+
+    def step_async(self, actions: np.ndarray):
+        self._actions = actions
+
+    def step_wait(self):
+        obs, rewards, terminations, truncations, infos = self.venv.step(self._actions)
+        dones = terminations | truncations
+
+        if 'final_info' in infos:
+            step_infos = unbatch_infos(infos['final_info'], self.num_envs)
+            current_infos = unbatch_infos(
+                {k: v for k, v in infos.items() if not k.startswith(('final_', '_final_'))},
+                self.num_envs,
+            )
+            for i in range(self.num_envs):
+                if not dones[i]:
+                    step_infos[i] = current_infos[i]
+        else:
+            step_infos = unbatch_infos(infos, self.num_envs)
+
+        for i in np.flatnonzero(dones):
+            step_infos[i]['terminal_observation'] = infos['final_obs'][i]
+            step_infos[i]['TimeLimit.truncated'] = bool(truncations[i] and not terminations[i])
+
+        return obs, rewards.astype(np.float32), dones, step_infos
+
+    def close(self):
+        self.venv.close()
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        value = getattr(self.venv, attr_name)
+        return [value for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None):
+        setattr(self.venv, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        result = getattr(self.venv, method_name)(*method_args, **method_kwargs)
+        return [result for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+
+class VecActionMaskWrapper(VecEnvWrapper):
+    """SB3 VecEnv的动作掩码包装器
+
+    保存最近一次reset/step返回的一批观测（自动重置后即新episode的第一个观测），
+    action_masks()对所有子环境一次计算掩码。MaskablePPO通过env_method/get_attr/has_attr
+    访问action_masks，这里直接在包装器中应答，不转发到子环境（子进程）。
+    """
+
+    def __init__(self, venv: VecEnv, shield: SafetyShield):
+        """初始化
+
+        Args:
+            venv: SB3 VecEnv
+            shield: Safety Shield
+        """
+        super().__init__(venv)
+        self.shield = shield
+        self._obs = None
+
+    def reset(self):
+        self._obs = self.venv.reset()
+        return self._obs
+
+    def step_wait(self):
+        obs, rewards, dones, infos = self.venv.step_wait()
+        self._obs = obs
+        return obs, rewards, dones, infos
+
+    def action_masks(self) -> np.ndarray:
+        """各子环境当前观测下的安全掩码 (num_envs, n_actions)"""
+        return self.shield.action_mask(self._obs)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        if method_name == ACTION_MASKS_METHOD:
+            masks = self.action_masks()
+            return [masks[i] for i in self._get_indices(indices)]
+        return self.venv.env_method(method_name, *method_args, indices=indices, **method_kwargs)
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        if attr_name == ACTION_MASKS_METHOD:
+            return [self.action_masks for _ in self._get_indices(indices)]
+        return self.venv.get_attr(attr_name, indices)
+
+    def has_attr(self, attr_name: str) -> bool:
+        return attr_name == ACTION_MASKS_METHOD or self.venv.has_attr(attr_name)
+
+
+def _available_cpus() -> List[int]:
+    """当前进程可用的CPU编号"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def assign_cpus(n_envs: int) -> List[Optional[int]]:
+    """为每个worker分配CPU
+
+    worker数少于CPU数时把第一个CPU留给主进程（PPO更新），其余按轮转分配；
+    平台不支持设置亲和性时全部返回None。
+
+    Args:
+        n_envs: worker数量
+
+    Returns:
+        每个worker绑定的CPU编号
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return [None] * n_envs
+
+    cpus = _available_cpus()
+    if len(cpus) > 1 and n_envs < len(cpus):
+        cpus = cpus[1:]
+    return [cpus[i % len(cpus)] for i in range(n_envs)]
+
+
+def _shm_worker(remote, parent_remote, env_fn_wrapper: CloudpickleWrapper, cpu: Optional[int]):
+    """SharedMemoryVecEnv的worker进程
+
+    与SB3 SubprocVecEnv的worker协议一致，但step/reset的观测写入共享内存，
+    管道中只传输奖励、done和info。
+    """
+    from stable_baselines3.common.env_util import is_wrapped
+
+    parent_remote.close()
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+
+    env = env_fn_wrapper.var()
+    buffer = None
+    obs_view = None
+
+    while True:
+        try:
+            cmd, data = remote.recv()
+            if cmd == 'step':
+                obs, reward, terminated, truncated, info = env.step(data)
+                done = terminated or truncated
+                info['TimeLimit.truncated'] = truncated and not terminated
+                reset_info = {}
+                if done:
+                    info['terminal_observation'] = obs
+                    obs, reset_info = env.reset()
+                obs_view[...] = obs
+                remote.send((reward, done, info, reset_info))
+            elif cmd == 'reset':
+                maybe_options = {'options': data[1]} if data[1] else {}
+                obs, reset_info = env.reset(seed=data[0], **maybe_options)
+                obs_view[...] = obs
+                remote.send(reset_info)
+            elif cmd == 'attach':
+                name, shape, dtype, index = data
+                buffer = shared_memory.SharedMemory(name=name)
+                obs_view = np.ndarray(shape, dtype=dtype, buffer=buffer.buf)[index]
+                remote.send(None)
+            elif cmd == 'render':
+                remote.send(env.render())
+            elif cmd == 'close':
+                env.close()
+                obs_view = None
+                if buffer is not None:
+                    buffer.close()
+                remote.close()
+                break
+            elif cmd == 'get_spaces':
+                remote.send((env.observation_space, env.action_space))
+            elif cmd == 'env_method':
+                method = env.get_wrapper_attr(data[0])
+                remote.send(method(*data[1], **data[2]))
+            elif cmd == 'get_attr':
+                remote.send(env.get_wrapper_attr(data))
+            elif cmd == 'has_attr':
+                try:
+                    env.get_wrapper_attr(data)
+                    remote.send(True)
+                except AttributeError:
+                    remote.send(False)
+            elif cmd == 'set_attr':
+                remote.send(setattr(env, data[0], data[1]))
+            elif cmd == 'is_wrapped':
+                remote.send(is_wrapped(env, data))
+            else:
+                raise NotImplementedError(f"worker不支持的命令: {cmd}")
+        except (EOFError, KeyboardInterrupt):
+            break
+
+
+class SharedMemoryVecEnv(SubprocVecEnv):
+    """共享内存观测缓冲的多进程VecEnv
+
+    每个子环境运行在独立进程中（可选绑定CPU），观测直接写入主进程分配的
+    (n_envs, *obs_shape) 共享内存，避免每步序列化观测数组。
+    其余接口（get_attr / env_method等）沿用SubprocVecEnv。
+    """
+
+    def __init__(self, env_fns: List[Callable], start_method: Optional[str] = None,
+                 pin_cpus: bool = True):
+        """初始化
+
+        Args:
+            env_fns: 创建环境的函数列表（下标即rank）
+            start_method: 进程启动方式（默认forkserver，不可用时spawn）
+            pin_cpus: 是否把worker绑定到CPU
+        """
+        self.waiting = False
+        self.closed = False
+        n_envs = len(env_fns)
+
+        if start_method is None:
+            start_method = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+        ctx = mp.get_context(start_method)
+
+        cpus = assign_cpus(n_envs) if pin_cpus else [None] * n_envs
+        self.cpus = cpus
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        for work_remote, remote, env_fn, cpu in zip(self.work_remotes, self.remotes, env_fns, cpus):
+            args = (work_remote, remote, CloudpickleWrapper(env_fn), cpu)
+            process = ctx.Process(target=_shm_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        self.remotes[0].send(('get_spaces', None))
+        observation_space, action_space = self.remotes[0].recv()
+        VecEnv.__init__(self, n_envs, observation_space, action_space)
+
+        # 观测缓冲：主进程分配，worker按下标写入
+        shape = (n_envs,) + observation_space.shape
+        dtype = np.dtype(observation_space.dtype)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        self._obs = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+        for index, remote in enumerate(self.remotes):
+            remote.send(('attach', (self._shm.name, shape, dtype.str, index)))
+        for remote in self.remotes:
+            remote.recv()
+
+    def step_wait(self):
+        results = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        rewards, dones, infos, self.reset_infos = zip(*results)
+        return self._obs.copy(), np.array(rewards, dtype=np.float32), np.array(dones), list(infos)
+
+    def reset(self):
+        for env_idx, remote in enumerate(self.remotes):
+            remote.send(('reset', (self._seeds[env_idx], self._options[env_idx])))
+        self.reset_infos = [remote.recv() for remote in self.remotes]
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        self._obs = None
+        self._shm.close()
+        self._shm.unlink()
+
+
+def resolve_vec_env_type(vec_env_type: str, n_envs: int) -> str:
+    """解析vec_env类型
+
+    auto：多个环境且有多个可用CPU时使用subproc，否则dummy
+
+    Args:
+        vec_env_type: 'dummy' / 'subproc' / 'auto'
+        n_envs: 环境数量
+
+    Returns:
+        'dummy' 或 'subproc'
+    """
+    if vec_env_type == 'auto':
+        return 'subproc' if n_envs > 1 and len(_available_cpus()) > 1 else 'dummy'
+    if vec_env_type not in ('dummy', 'subproc'):
+        raise ValueError(f"未知的vec_env类型: {vec_env_type}")
+    return vec_env_type
+
+
+def make_vec_env(env_fns: List[Callable], vec_env_type: str = 'auto', pin_cpus: bool = True) -> VecEnv:
+    """按类型创建VecEnv
+
+    Args:
+        env_fns: 创建环境的函数列表（下标即rank，种子由函数自身处理）
+        vec_env_type: 'dummy' / 'subproc' / 'auto'
+        pin_cpus: subproc时是否绑定CPU
+
+    Returns:
+        VecEnv实例
+    """
+    if resolve_vec_env_type(vec_env_type, len(env_fns)) == 'subproc':
+        return SharedMemoryVecEnv(env_fns, pin_cpus=pin_cpus)
+    return DummyVecEnv(env_fns)
+
+
+def measure_steps_per_second(venv: VecEnv, n_steps: int = 100, warmup: int = 5) -> float:
+    """测量VecEnv在随机动作下的吞吐（环境步/秒，所有子环境合计）
+
+    Args:
+        venv: VecEnv实例
+        n_steps: 计时的向量步数
+        warmup: 预热步数
+
+    Returns:
+        环境步/秒
+    """
+    venv.reset()
+    actions = lambda: np.array([venv.action_space.sample() for _ in range(venv.num_envs)])
+    for _ in range(warmup):
+        venv.step(actions())
+
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        venv.step(actions())
+    elapsed = time.perf_counter() - start
+
+    return n_steps * venv.num_envs / elapsed
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+    from src.rl.train import make_env
+    from src.utils.config_loader import load_all_configs
+    from src.utils.headless import enable_headless
+
+    parser = argparse.ArgumentParser(description="对比dummy / subproc VecEnv的环境吞吐")
+    parser.add_argument("--config-dir", type=str, default="configs", help="配置文件目录")
+    parser.add_argument("--n-envs", type=int, nargs='+', default=[4], help="环境数量（可多个）")
+    parser.add_argument("--n-steps", type=int, default=100, help="计时的向量步数")
+    parser.add_argument("--no-pin", action="store_true", help="不绑定CPU")
+
+    args = parser.parse_args()
+
+    enable_headless()
+    configs = load_all_configs(args.config_dir)
+    env_config = {**configs['env'], 'headless': True}
+    env_config['traffic_density'] = configs['train'].get('traffic_density', 'medium')
+
+    print(f"可用CPU: {len(_available_cpus())}")
+    for n_envs in args.n_envs:
+        for vec_env_type in ('dummy', 'subproc'):
+            venv = make_vec_env([make_env(env_config, i, seed=42) for i in range(n_envs)],
+                                vec_env_type, pin_cpus=not args.no_pin)
+            sps = measure_steps_per_second(venv, args.n_steps)
+            venv.close()
+            print(f"n_envs={n_envs:<4} {vec_env_type:<8} {sps:8.1f} steps/s")
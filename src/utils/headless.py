@@ -0,0 +1,135 @@
+"""无界面（headless）运行支持
+
+训练和批量评测不需要任何画面输出。headless模式下：
+- 环境以render_mode=None创建，不会创建渲染窗口或离屏画布
+- SDL/matplotlib切换到无显示后端，首次render()时才按需创建离屏渲染
+- 只有使用向量化后端（backend: vectorized）时才完全不加载渲染模块：该后端不导入highway-env。
+  highway_env后端导入highway-env时会无条件加载pygame和matplotlib.pyplot（其图形模块在导入时
+  就继承pygame.Surface），headless模式在这里只避免创建窗口和画布，不减少启动时间和内存
+"""
+
+import os
+import sys
+import json
+import subprocess
+from typing import Dict, Any, List
+
+
+# highway-env在导入时会连带加载的渲染相关模块
+RENDERING_MODULES = ('pygame', 'matplotlib.pyplot')
+
+
+def enable_headless():
+    """切换到无显示后端
+
+    必须在导入highway-env（及pygame/matplotlib）之前调用，已有的环境变量不会被覆盖。
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+
+def loaded_rendering_modules() -> List[str]:
+    """当前进程已加载的渲染相关模块"""
+    return [name for name in RENDERING_MODULES if name in sys.modules]
+
+
+def _peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存（MB），平台不支持时返回NaN"""
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS为字节
+    if sys.platform == 'darwin':
+        return rss / 1024 / 1024
+    return rss / 1024
+
+
+# 在全新子进程中执行：导入 -> 创建环境 -> 首次reset
+_PROBE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from src.utils.headless import enable_headless, loaded_rendering_modules, _peak_rss_mb
+if {headless!r}:
+    enable_headless()
+from src.env.overtaking_env import create_overtaking_env, create_vector_overtaking_env
+from src.utils.config_loader import load_yaml
+config = load_yaml({config_path!r})
+config['headless'] = {headless!r}
+config['backend'] = {backend!r}
+if {backend!r} == 'vectorized':
+    env = create_vector_overtaking_env(config, 1)
+else:
+    env = create_overtaking_env(config)
+env.reset(seed=0)
+print(json.dumps({{
+    'startup_s': time.perf_counter() - start,
+    'rss_mb': _peak_rss_mb(),
+    'rendering_modules': loaded_rendering_modules(),
+}}))
+"""
+
+
+def measure_worker_startup(config_path: str = "configs/env_config.yaml", headless: bool = True,
+                           backend: str = 'highway_env', repeats: int = 3) -> Dict[str, Any]:
+    """测量单个worker进程的启动时间和常驻内存
+
+    每次在全新的Python子进程中导入项目、创建环境并reset一次。
+
+    Args:
+        config_path: 环境配置文件
+        headless: 是否使用headless模式
+        backend: 仿真后端（'highway_env' / 'vectorized'）
+        repeats: 重复次数（取中位数）
+
+    Returns:
+        {'startup_s', 'rss_mb', 'rendering_modules'}
+    """
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    script = _PROBE_SCRIPT.format(
+        root=root, headless=headless, backend=backend, config_path=config_path
+    )
+
+    # 子进程不继承当前进程的headless环境变量，保证对照公平
+    env = {k: v for k, v in os.environ.items()
+           if k not in ('SDL_VIDEODRIVER', 'SDL_AUDIODRIVER', 'MPLBACKEND')}
+
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True,
+            check=True, cwd=root, env=env,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    runs.sort(key=lambda r: r['startup_s'])
+    median = runs[len(runs) // 2]
+    return {
+        'startup_s': median['startup_s'],
+        'rss_mb': sorted(r['rss_mb'] for r in runs)[len(runs) // 2],
+        'rendering_modules': median['rendering_modules'],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="测量worker启动时间和内存（headless对比）")
+    parser.add_argument("--config", type=str, default="configs/env_config.yaml", help="环境配置文件")
+    parser.add_argument("--repeats", type=int, default=3, help="重复次数")
+
+    args = parser.parse_args()
+
+    # 只有vectorized后端的headless worker不加载渲染模块；highway_env一行仅作对照
+    # （该后端无论是否headless都会随highway-env加载pygame/matplotlib，启动时间和内存相同）
+    print(f"{'模式':<28}{'启动时间(s)':>12}{'内存(MB)':>12}  渲染模块")
+    for backend, headless in [('highway_env', False), ('vectorized', True)]:
+        result = measure_worker_startup(args.config, headless, backend, args.repeats)
+        label = f"{backend}{' + headless' if headless else ''}"
+        modules = ', '.join(result['rendering_modules']) or '-'
+        print(f"{label:<28}{result['startup_s']:>12.2f}{result['rss_mb']:>12.1f}  {modules}")
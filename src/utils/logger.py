@@ -44,19 +44,24 @@ class ExperimentLogger:
         with open(self.log_file, 'a', encoding='utf-8') as f:
             f.write(log_entry + '\n')
 
-    def log_metrics(self, metrics: dict, step: int = None):
+    def log_metrics(self, metrics: dict, step: int = None, category: str = None):
         """记录指标
 
         Args:
             metrics: 指标字典
             step: 步数（可选）
+            category: 指标类别（可选），如"eval"、"throughput"；
+                不同类别的列不同，分别写入{experiment_name}_{category}_metrics.csv
         """
         metrics_with_step = {"step": step, **metrics} if step is not None else metrics
 
         # 写入CSV
-        file_exists = self.metrics_file.exists()
+        metrics_file = self.metrics_file
+        if category is not None:
+            metrics_file = self.log_dir / f"{self.experiment_name}_{category}_metrics.csv"
+        file_exists = metrics_file.exists()
 
-        with open(self.metrics_file, 'a', newline='', encoding='utf-8') as f:
+        with open(metrics_file, 'a', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=metrics_with_step.keys())
             if not file_exists:
                 writer.writeheader()
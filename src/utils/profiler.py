@@ -0,0 +1,165 @@
+"""分阶段耗时统计
+
+对数分桶的流式直方图：内存固定，单次记录O(1)，可合并，
+分位数的相对误差约为桶宽的一半（每10倍20个桶，约6%）。
+"""
+
+import math
+from time import perf_counter
+from typing import Dict, Iterable, Optional
+
+
+class StreamingHistogram:
+    """对数分桶的耗时直方图（单位：秒）"""
+
+    MIN_EXP = -7          # 最小桶下界 1e-7 s
+    MAX_EXP = 2           # 最大桶上界 1e2 s
+    BINS_PER_DECADE = 20
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        """初始化空直方图"""
+        n_bins = (self.MAX_EXP - self.MIN_EXP) * self.BINS_PER_DECADE
+        self.counts = [0] * n_bins
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value: float):
+        """记录一次耗时
+
+        Args:
+            value: 耗时（秒）
+        """
+        if value > 0:
+            i = int((math.log10(value) - self.MIN_EXP) * self.BINS_PER_DECADE)
+            i = min(max(i, 0), len(self.counts) - 1)
+        else:
+            i = 0
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'StreamingHistogram'):
+        """合并另一个直方图
+
+        Args:
+            other: 另一个直方图
+        """
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """估计分位数
+
+        Args:
+            q: 分位数（0-100）
+
+        Returns:
+            耗时（秒），无数据时返回0
+        """
+        if self.count == 0:
+            return 0.0
+
+        rank = q / 100 * self.count
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            cumulative += c
+            if c and cumulative >= rank:
+                # 桶的几何中点，并限制在观测到的[min, max]内
+                mid = 10 ** (self.MIN_EXP + (i + 0.5) / self.BINS_PER_DECADE)
+                return min(max(mid, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """统计摘要（毫秒）"""
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1e3 if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1e3,
+            'p95_ms': self.percentile(95) * 1e3,
+            'p99_ms': self.percentile(99) * 1e3,
+            'max_ms': self.max * 1e3,
+        }
+
+
+class StepProfiler:
+    """按阶段名聚合耗时的分析器
+
+    用法（调用方在未启用时持有None，开销只有一次判空）：
+
+        t = perf_counter()
+        ...
+        t = profiler.lap('phase', t)
+    """
+
+    def __init__(self, phases: Optional[Iterable[str]] = None):
+        """初始化分析器
+
+        Args:
+            phases: 预先创建的阶段名（决定摘要中的顺序）
+        """
+        self.histograms: Dict[str, StreamingHistogram] = {}
+        for phase in phases or ():
+            self.histograms[phase] = StreamingHistogram()
+
+    def record(self, phase: str, seconds: float):
+        """记录一次阶段耗时
+
+        Args:
+            phase: 阶段名
+            seconds: 耗时（秒）
+        """
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = StreamingHistogram()
+        histogram.add(seconds)
+
+    def lap(self, phase: str, start: float) -> float:
+        """记录从start到现在的耗时，并返回当前时间作为下一阶段的起点
+
+        Args:
+            phase: 阶段名
+            start: 起始时间（perf_counter）
+
+        Returns:
+            当前时间（perf_counter）
+        """
+        now = perf_counter()
+        self.record(phase, now - start)
+        return now
+
+    def merge(self, other: 'StepProfiler'):
+        """合并另一个分析器（如多个子环境）
+
+        Args:
+            other: 另一个分析器
+        """
+        for phase, histogram in other.histograms.items():
+            if phase not in self.histograms:
+                self.histograms[phase] = StreamingHistogram()
+            self.histograms[phase].merge(histogram)
+
+    def reset(self):
+        """清空所有统计"""
+        for phase in self.histograms:
+            self.histograms[phase] = StreamingHistogram()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各阶段的统计摘要（毫秒）"""
+        return {
+            phase: histogram.summary()
+            for phase, histogram in self.histograms.items()
+            if histogram.count
+        }
@@ -11,6 +11,8 @@ from pathlib import Path
 import json
 from typing import List, Dict
 
+from src.metrics.results_store import load_results_table
+
 
 # 设置中文字体和样式
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
@@ -165,38 +167,25 @@ def generate_all_plots(results_dir: str, output_dir: str):
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # 收集所有结果
+    # 收集所有结果（汇总存储一次读取，按方法和密度对各seed取平均）
+    results = load_results_table(results_dir)
+    averages = pd.DataFrame()
+    if not results.empty:
+        numeric = results.select_dtypes('number').drop(columns=['seed', 'timestamp'])
+        averages = numeric.groupby([results['density'], results['method']]).mean()
+
     all_results = {}
     densities = ['low', 'medium', 'high']
     methods = ['baseline', 'rl', 'rl_safety']
-    seeds = [42, 123, 456]
 
     for density in densities:
         all_results[density] = {}
 
         for method in methods:
-            # 收集所有seed的结果并平均
-            method_results = []
-
-            for seed in seeds:
-                prefix = f"{method}_{density}_seed{seed}_"
-                try:
-                    result = load_results(results_dir, prefix)
-                    method_results.append(result)
-                except FileNotFoundError:
-                    print(f"  警告: 未找到 {prefix} 的结果文件")
-                    continue
-
-            if method_results:
-                # 计算平均值
-                avg_result = {}
-                for key in method_results[0].keys():
-                    if isinstance(method_results[0][key], (int, float)):
-                        avg_result[key] = np.mean([r[key] for r in method_results])
-                    else:
-                        avg_result[key] = method_results[0][key]
-
-                all_results[density][method] = avg_result
+            if (density, method) not in averages.index:
+                print(f"  警告: 未找到 {method}_{density} 的结果")
+                continue
+            all_results[density][method] = averages.loc[(density, method)].to_dict()
 
     # 生成图表
 
@@ -0,0 +1,57 @@
+"""评测网格测试
+
+验证多进程评测网格（n_workers > 1）与串行评测的结果相同
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pandas as pd
+
+from src.baseline.evaluate_baseline import _evaluate_cell, _init_worker
+from src.metrics.grid import run_eval_grid
+from src.utils.config_loader import load_all_configs
+
+CELLS = [('low', 42), ('high', 42), ('low', 7)]
+N_EPISODES = 4
+
+
+def _run_grid(n_workers: int, results_dir: Path):
+    """用基线策略在向量化后端上执行评测网格"""
+    configs = load_all_configs("configs")
+    env_config = {**configs['env'], 'backend': 'vectorized'}
+    eval_config = {**configs['eval'], 'n_envs': 2, 'adaptive': {'enabled': False}}
+    eval_config['output'] = {**eval_config['output'], 'cache': False, 'results_store': False}
+    return run_eval_grid(
+        CELLS, _evaluate_cell, n_workers,
+        initializer=_init_worker,
+        initargs=(env_config, eval_config, N_EPISODES, False, str(results_dir), True, 'test'),
+    )
+
+
+def test_parallel_grid_matches_serial():
+    """2个进程与串行执行的每个单元指标和episode明细都相同，结果按单元顺序返回"""
+    with tempfile.TemporaryDirectory() as serial_dir, tempfile.TemporaryDirectory() as parallel_dir:
+        serial = _run_grid(1, Path(serial_dir))
+        parallel = _run_grid(2, Path(parallel_dir))
+
+        expected_keys = [f"{density}_seed{seed}" for density, seed in CELLS]
+        assert list(serial) == expected_keys
+        assert list(parallel) == expected_keys
+
+        for key in expected_keys:
+            assert serial[key][0] == parallel[key][0], key
+            assert serial[key][0]['total_episodes'] == N_EPISODES
+
+        for density, seed in CELLS:
+            name = f"baseline_{density}_seed{seed}_episodes_detail.csv"
+            pd.testing.assert_frame_equal(pd.read_csv(Path(serial_dir) / name),
+                                          pd.read_csv(Path(parallel_dir) / name))
+    print(f"✓ {len(CELLS)} 个单元的并行结果与串行相同")
+
+
+if __name__ == "__main__":
+    test_parallel_grid_matches_serial()
+    print("✓ 所有测试通过")
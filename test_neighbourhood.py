@@ -0,0 +1,106 @@
+"""邻域描述测试
+
+验证neighbourhood的单个/批量计算与逐行查找一致，以及按观测内容缓存的行为
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from src.env import neighbourhood as nb
+from src.env.neighbourhood import SLOTS, neighbourhood
+
+
+def _reference(obs: np.ndarray):
+    """逐行查找各位置最近的车辆：{位置: 行号或None}"""
+    result = {}
+    for slot in SLOTS:
+        best, best_row = np.inf, None
+        for row, (presence, x, y) in enumerate(obs[1:, :3].tolist()):
+            if presence < 0.5:
+                continue
+            lane = {'left': y >= 0.1, 'right': y <= -0.1}.get(slot.split('_')[0], abs(y) <= 0.1)
+            side = x >= 0 if slot.endswith('front') else x <= 0
+            if lane and side and abs(x) < best:
+                best, best_row = abs(x), row
+        result[slot] = best_row
+    return result
+
+
+def _random_obs(rng, n: int = 8):
+    """随机观测：x、y取在边界附近的离散值，包含距离相同、刚好在车道边界和x=0的车辆"""
+    obs = np.zeros((n, 5), dtype=np.float32)
+    obs[0] = [1.0, 0.0, 0.0, 0.3, 0.0]
+    obs[1:, 0] = rng.random(n - 1) < 0.8
+    obs[1:, 1] = rng.choice([-0.2, -0.1, 0.0, 0.1, 0.2], size=n - 1)
+    obs[1:, 2] = rng.choice([-0.2, -0.1, -0.05, 0.0, 0.05, 0.1, 0.2], size=n - 1)
+    obs[1:, 3] = rng.normal(size=n - 1)
+    return obs
+
+
+def test_matches_row_scan():
+    """单个观测与一批观测的结果都与逐行查找相同"""
+    rng = np.random.default_rng(0)
+    batch = np.stack([_random_obs(rng) for _ in range(200)])
+    batched = neighbourhood(batch)
+
+    for i, obs in enumerate(batch):
+        expected = _reference(obs)
+        single = neighbourhood(obs)
+        for k, slot in enumerate(SLOTS):
+            row = expected[slot]
+            assert single.present[k] == (row is not None), (i, slot)
+            assert batched.present[i, k] == (row is not None), (i, slot)
+            if row is not None:
+                assert np.array_equal(single.get(slot), obs[1 + row])
+                assert np.array_equal(batched.vehicles[i, k], obs[1 + row])
+            else:
+                assert single.get(slot) is None
+    print("✓ 单个/批量邻域与逐行查找一致")
+
+
+def test_memo_by_content():
+    """相同内容的观测返回同一缓存对象；缓存结果不引用调用方的观测缓冲区"""
+    nb._memo.clear()
+    rng = np.random.default_rng(1)
+    obs = _random_obs(rng)
+
+    first = neighbourhood(obs)
+    assert neighbourhood(obs.copy()) is first
+    # dtype不同视为不同观测
+    assert neighbourhood(obs.astype(np.float64)) is not first
+
+    # VecEnv原地覆盖观测缓冲区：之前的结果不变，新内容重新计算
+    saved = first.vehicles.copy()
+    obs[1:, 1] = 0.05
+    assert np.array_equal(first.vehicles, saved)
+    assert neighbourhood(obs) is not first
+    print("✓ 按观测内容缓存")
+
+
+def test_memo_is_bounded_lru():
+    """缓存最多保留_MEMO_SIZE个观测，最近使用的不会被淘汰"""
+    nb._memo.clear()
+    rng = np.random.default_rng(2)
+    kept = _random_obs(rng)
+    kept_result = neighbourhood(kept)
+    for _ in range(nb._MEMO_SIZE * 2):
+        neighbourhood(_random_obs(rng))
+        assert neighbourhood(kept) is kept_result  # 每次访问移到最近使用
+    assert len(nb._memo) == nb._MEMO_SIZE
+
+    evicted = _random_obs(rng)
+    evicted_result = neighbourhood(evicted)
+    for _ in range(nb._MEMO_SIZE):
+        neighbourhood(_random_obs(rng))
+    assert neighbourhood(evicted) is not evicted_result
+    print("✓ 缓存大小有界（LRU）")
+
+
+if __name__ == "__main__":
+    test_matches_row_scan()
+    test_memo_by_content()
+    test_memo_is_bounded_lru()
+    print("✓ 所有测试通过")
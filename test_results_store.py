@@ -0,0 +1,104 @@
+"""结果存储测试
+
+验证ResultsStore的追加、最近一次运行筛选、分区过滤、compact和逐单元文件导入
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pandas as pd
+
+from src.metrics.results_store import ResultsStore, load_results_table
+
+
+def _metrics(success_rate: float):
+    return {'total_episodes': 10, 'success_rate': success_rate, 'collision_rate': 100.0 - success_rate}
+
+
+def _episodes(n: int):
+    return pd.DataFrame({'episode': range(n), 'total_reward': [float(i) for i in range(n)]})
+
+
+def _fill(store: ResultsStore):
+    """两次运行：run-b晚于run-a，只覆盖rl/low的seed 42"""
+    for method in ('baseline', 'rl'):
+        for density in ('low', 'high'):
+            for seed in (42, 7):
+                store.append(_metrics(10.0), _episodes(3), method, density, seed, 'run-a', timestamp=100.0)
+    store.append(_metrics(90.0), _episodes(5), 'rl', 'low', 42, 'run-b', timestamp=200.0)
+
+
+def test_latest_and_filters():
+    """latest只保留每个单元最近一次运行；分区和非分区条件都生效"""
+    with tempfile.TemporaryDirectory() as root:
+        store = ResultsStore(root)
+        _fill(store)
+
+        assert len(store.read(latest=False)) == 9
+        latest = store.read()
+        assert len(latest) == 8
+        cell = latest[(latest['method'] == 'rl') & (latest['density'] == 'low') & (latest['seed'] == 42)]
+        assert cell['run_id'].tolist() == ['run-b']
+        assert cell['success_rate'].tolist() == [90.0]
+
+        rl_low = store.read(method='rl', density=['low'])
+        assert sorted(rl_low['seed']) == [7, 42]
+        assert set(store.read(seed=7)['seed']) == {7}
+        assert len(store.read('episodes', method='rl', density='low', seed=42)) == 5
+        assert list(store.read(columns=['success_rate']).columns) == \
+            ['method', 'density', 'seed', 'run_id', 'timestamp', 'success_rate']
+    print("✓ 最近一次运行与过滤读取正确")
+
+
+def test_compact_keeps_rows():
+    """compact把每个分区合并为一个文件，读取结果不变"""
+    with tempfile.TemporaryDirectory() as root:
+        store = ResultsStore(root)
+        _fill(store)
+        key = ['method', 'density', 'seed', 'run_id']
+        before = {table: store.read(table, latest=False).sort_values(key).reset_index(drop=True)
+                  for table in ('metrics', 'episodes')}
+
+        store.compact()
+
+        for table in ('metrics', 'episodes'):
+            for partition in (Path(root) / table).glob('method=*/density=*'):
+                assert len(list(partition.iterdir())) == 1
+            after = store.read(table, latest=False).sort_values(key).reset_index(drop=True)
+            pd.testing.assert_frame_equal(before[table], after, check_like=True)
+    print("✓ compact后数据不变")
+
+
+def test_load_results_table_imports_newer_files():
+    """读取时导入比存储更新的逐单元文件，已导入或与存储同时写出的文件不重复导入"""
+    with tempfile.TemporaryDirectory() as results_dir:
+        results_dir = Path(results_dir)
+        store = ResultsStore(results_dir / 'store')
+
+        summary = results_dir / 'rl_low_seed42_metrics_summary.json'
+        summary.write_text(json.dumps(_metrics(30.0)), encoding='utf-8')
+        _episodes(2).to_csv(results_dir / 'rl_low_seed42_episodes_detail.csv', index=False)
+        assert load_results_table(results_dir)['success_rate'].tolist() == [30.0]
+
+        # 存储中的记录晚于文件：不导入
+        store.append(_metrics(60.0), None, 'rl', 'low', 42, 'run-a', timestamp=summary.stat().st_mtime + 10)
+        assert load_results_table(results_dir)['success_rate'].tolist() == [60.0]
+
+        # 未写入存储的新结果（如results_store关闭）：导入
+        summary.write_text(json.dumps(_metrics(80.0)), encoding='utf-8')
+        newer = summary.stat().st_mtime + 20
+        os.utime(summary, (newer, newer))
+        assert load_results_table(results_dir)['success_rate'].tolist() == [80.0]
+        assert load_results_table(results_dir, 'episodes')['episode'].tolist() == [0, 1]
+    print("✓ 逐单元文件按修改时间导入")
+
+
+if __name__ == "__main__":
+    test_latest_and_filters()
+    test_compact_keeps_rows()
+    test_load_results_table_imports_newer_files()
+    print("✓ 所有测试通过")
@@ -0,0 +1,91 @@
+"""规则基线策略测试
+
+验证BatchedRuleBasedPolicy对一批观测的决策与逐个环境运行RuleBasedPolicy完全相同
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from src.baseline import BatchedRuleBasedPolicy, RuleBasedPolicy
+from src.env import create_vector_overtaking_env
+from src.metrics import MetricsEvaluator, evaluate_policy_vectorized
+from src.utils.config_loader import load_all_configs
+
+N_ENVS = 6
+
+
+def _vectorized_config():
+    return {**load_all_configs("configs")['env'], 'backend': 'vectorized'}
+
+
+def test_batched_matches_scalar_on_rollout():
+    """向量化环境中逐步比较：批量决策与每个环境各自的RuleBasedPolicy相同（包括换道冷却和episode重置）"""
+    env_config = _vectorized_config()
+    venv = create_vector_overtaking_env(env_config, N_ENVS)
+    batched = BatchedRuleBasedPolicy(env_config)
+    scalars = [RuleBasedPolicy(env_config) for _ in range(N_ENVS)]
+
+    obs, _ = venv.reset(seed=0)
+    n_lane_changes = 0
+    for _ in range(150):
+        actions, _ = batched.predict(obs)
+        expected = [scalar.predict(o)[0] for scalar, o in zip(scalars, obs)]
+        assert np.array_equal(actions, expected)
+        n_lane_changes += np.isin(actions, [0, 2]).sum()
+
+        obs, _, terminations, truncations, _ = venv.step(actions)
+        done = np.flatnonzero(terminations | truncations)
+        batched.reset_envs(done)
+        for i in done:
+            scalars[i].reset()
+    venv.close()
+
+    assert n_lane_changes > 0
+    print(f"✓ 150步逐环境决策一致（{n_lane_changes} 次换道）")
+
+
+def test_batched_matches_scalar_near_thresholds():
+    """阈值附近的合成观测（float32）：批量决策与逐个决策相同"""
+    env_config = _vectorized_config()
+    policy = RuleBasedPolicy(env_config)
+    rng = np.random.default_rng(0)
+
+    obs = np.zeros((500, 5, 5), dtype=np.float32)
+    obs[:, :, 0] = 1.0
+    obs[:, 0, 2] = rng.choice([0.0, 0.1, 0.2], size=500)
+    obs[:, 0, 3] = rng.choice([policy.slow_vehicle_threshold, 25.0, 30.0, 35.0], size=500)
+    obs[:, 1:, 1] = rng.choice([-policy.min_safe_distance, -5.0, 5.0, policy.min_safe_distance, 50.0],
+                               size=(500, 4))
+    obs[:, 1:, 2] = rng.choice([-0.1, 0.0, 0.1, 0.2], size=(500, 4))
+    obs[:, 1:, 3] = rng.choice([policy.slow_vehicle_threshold, 20.0, 30.0], size=(500, 4))
+
+    batched = BatchedRuleBasedPolicy(env_config)
+    actions, _ = batched.predict(obs)
+    for o, action in zip(obs, actions):
+        policy.reset()
+        assert policy.predict(o)[0] == action
+    print("✓ 阈值附近的决策一致")
+
+
+def test_vectorized_evaluation_matches():
+    """向量化评测：批量策略与每个槽位一个RuleBasedPolicy副本的episode记录相同"""
+    env_config = _vectorized_config()
+    records = []
+    for policy in (BatchedRuleBasedPolicy(env_config), RuleBasedPolicy(env_config)):
+        venv = create_vector_overtaking_env(env_config, 4)
+        _, episodes = evaluate_policy_vectorized(venv, policy, n_episodes=8, seed=3,
+                                                 evaluator=MetricsEvaluator(store_episodes=True))
+        venv.close()
+        records.append(episodes)
+    assert records[0] == records[1]
+    print("✓ 向量化评测结果一致")
+
+
+if __name__ == "__main__":
+    test_batched_matches_scalar_on_rollout()
+    test_batched_matches_scalar_near_thresholds()
+    test_vectorized_evaluation_matches()
+    print("✓ 所有测试通过")
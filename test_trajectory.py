@@ -0,0 +1,119 @@
+"""轨迹记录测试
+
+验证TrajectoryRecorder写出的轨迹能被TrajectoryReader原样读回
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from src.baseline import BatchedRuleBasedPolicy
+from src.env import create_vector_overtaking_env
+from src.env.overtaking_env import REWARD_COMPONENTS
+from src.metrics import MetricsEvaluator, evaluate_policy_vectorized
+from src.metrics.trajectory import TrajectoryReader, TrajectoryRecorder
+from src.utils.config_loader import load_all_configs
+
+OBS_SHAPE = (5, 8)
+
+
+def _step(rng):
+    """一步随机记录：(obs, action, policy_action, reward, components)"""
+    obs = rng.normal(size=OBS_SHAPE).astype(np.float32)
+    action = int(rng.integers(5))
+    policy_action = action if rng.random() < 0.7 else int(rng.integers(5))
+    components = rng.normal(size=len(REWARD_COMPONENTS)).astype(np.float32)
+    return obs, action, policy_action, np.float32(rng.normal()), components
+
+
+def test_round_trip():
+    """交错记录的多个槽位、跨越预分配块的episode、未结束的episode都按原样读回"""
+    rng = np.random.default_rng(0)
+    lengths = {0: 11, 1: 3, 2: 20}  # episode -> 步数（chunk_steps=8，需要多次扩容）
+    expected = {episode: [] for episode in lengths}
+
+    with tempfile.TemporaryDirectory() as path:
+        recorder = TrajectoryRecorder(path, chunk_steps=8, metadata={'method': 'test'}, flush_every=1)
+        for slot in (0, 1):
+            recorder.begin_episode(slot)
+        # 槽位0和槽位1交错记录；槽位1先结束episode 1再开始episode 2
+        queue = {0: [0], 1: [1, 2]}
+        progress = {episode: 0 for episode in lengths}
+        while queue[0] or queue[1]:
+            for slot in (0, 1):
+                if not queue[slot]:
+                    continue
+                episode = queue[slot][0]
+                record = _step(rng)
+                components = None if episode == 1 else record[4]
+                recorder.record_step(slot, record[0], record[1], record[2], record[3], components,
+                                     violation=progress[episode] % 4 == 0, crashed=False)
+                expected[episode].append((*record[:4], components))
+                progress[episode] += 1
+                if progress[episode] == lengths[episode]:
+                    recorder.end_episode(slot, episode, seed=100 + episode, total_reward=float(episode),
+                                         collision=episode == 2, success=episode == 0)
+                    queue[slot].pop(0)
+                    recorder.begin_episode(slot)
+        # 槽位0开始了一个未结束的episode：关闭时丢弃
+        recorder.record_step(0, *_step(rng)[:4])
+        recorder.close()
+
+        reader = TrajectoryReader(path)
+        assert len(reader) == 3
+        assert reader.metadata == {'method': 'test'}
+        index = reader.index().set_index('episode')
+        assert index['length'].to_dict() == lengths
+        assert index['seed'].to_dict() == {0: 100, 1: 101, 2: 102}
+        assert index.loc[2, 'collision'] and index.loc[0, 'success']
+        assert len(reader.steps['step']) == sum(lengths.values())
+
+        for episode, data in reader:
+            records = expected[episode]
+            assert np.array_equal(data['episode'], np.full(len(records), episode))
+            assert np.array_equal(data['step'], np.arange(len(records)))
+            assert np.array_equal(data['obs'], np.stack([r[0] for r in records]))
+            assert np.array_equal(data['action'], [r[1] for r in records])
+            assert np.array_equal(data['policy_action'], [r[2] for r in records])
+            assert np.array_equal(data['shield_corrected'], [r[1] != r[2] for r in records])
+            assert np.array_equal(data['reward'], [r[3] for r in records])
+            if episode == 1:
+                assert np.isnan(data['reward_components']).all()
+            else:
+                assert np.array_equal(data['reward_components'], np.stack([r[4] for r in records]))
+            assert np.array_equal(data['violation'], np.arange(len(records)) % 4 == 0)
+    print("✓ 轨迹读写一致")
+
+
+def test_vectorized_evaluation_trajectory():
+    """向量化评测记录的轨迹与评测结果一致：每个episode的步数和总奖励"""
+    configs = load_all_configs("configs")
+    env_config = {**configs['env'], 'backend': 'vectorized'}
+    venv = create_vector_overtaking_env(env_config, 3)
+
+    with tempfile.TemporaryDirectory() as path:
+        recorder = TrajectoryRecorder(path)
+        evaluator, episodes = evaluate_policy_vectorized(
+            venv, BatchedRuleBasedPolicy(env_config), n_episodes=5, seed=0,
+            evaluator=MetricsEvaluator(store_episodes=True), recorder=recorder,
+        )
+        recorder.close()
+
+        reader = TrajectoryReader(path)
+        assert len(reader) == len(episodes) == 5
+        for record in episodes:
+            data = reader.episode(record['episode'])
+            assert len(data['step']) == record['episode_length']
+            assert np.isclose(data['reward'].sum(), record['total_reward'], rtol=1e-4)
+            assert data['crashed'][-1] == record['collision_occurred']
+    venv.close()
+    print("✓ 评测轨迹与评测结果一致")
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_vectorized_evaluation_trajectory()
+    print("✓ 所有测试通过")
@@ -0,0 +1,80 @@
+"""共享内存VecEnv测试
+
+验证SharedMemoryVecEnv与DummyVecEnv的结果逐步一致，关闭后释放共享内存
+"""
+
+import sys
+from multiprocessing import shared_memory
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from src.rl.train import make_env
+from src.rl.vec_env import SharedMemoryVecEnv
+from src.utils.config_loader import load_all_configs
+
+N_ENVS = 2
+N_STEPS = 20
+
+
+def _rollout(venv, actions):
+    """固定动作序列下的(观测, 奖励, done, 终止观测)"""
+    venv.seed(7)
+    observations = [venv.reset()]
+    rewards, dones, terminal = [], [], []
+    for step_actions in actions:
+        obs, reward, done, infos = venv.step(step_actions)
+        observations.append(obs)
+        rewards.append(reward)
+        dones.append(done)
+        terminal.extend(info['terminal_observation'] for info in infos if 'terminal_observation' in info)
+    return np.stack(observations), np.stack(rewards), np.stack(dones), terminal
+
+
+def test_shared_memory_matches_dummy():
+    """相同种子和动作下，共享内存VecEnv的观测、奖励、done与DummyVecEnv相同"""
+    env_config = load_all_configs("configs")['env']
+    env_fns = [make_env(env_config, rank) for rank in range(N_ENVS)]
+    actions = np.random.default_rng(0).integers(5, size=(N_STEPS, N_ENVS))
+
+    dummy = DummyVecEnv(env_fns)
+    expected = _rollout(dummy, actions)
+    dummy.close()
+
+    shared = SharedMemoryVecEnv(env_fns, pin_cpus=False)
+    try:
+        result = _rollout(shared, actions)
+    finally:
+        shared.close()
+
+    for name, a, b in zip(('observations', 'rewards', 'dones'), expected[:3], result[:3]):
+        assert np.array_equal(a, b), name
+    assert len(expected[3]) == len(result[3])
+    for a, b in zip(expected[3], result[3]):
+        assert np.array_equal(a, b)
+    print(f"✓ {N_STEPS} 步结果一致（{int(expected[2].sum())} 个episode结束）")
+
+
+def test_close_releases_shared_memory():
+    """close后共享内存段被删除，重复close不报错"""
+    env_config = load_all_configs("configs")['env']
+    venv = SharedMemoryVecEnv([make_env(env_config, rank) for rank in range(2)], pin_cpus=False)
+    name = venv._shm.name
+    venv.reset()
+    venv.close()
+    venv.close()
+
+    try:
+        shared_memory.SharedMemory(name=name).close()
+    except FileNotFoundError:
+        print("✓ 共享内存已释放")
+    else:
+        raise AssertionError(f"共享内存 {name} 未释放")
+
+
+if __name__ == "__main__":
+    test_shared_memory_matches_dummy()
+    test_close_releases_shared_memory()
+    print("✓ 所有测试通过")